@@ -2,21 +2,64 @@ from flask import Flask
 from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS 
-from flasgger import Swagger
+from app.apispec import SwaggerPrecompile
+from app.cache import Cache
+from app.hachage import Hacheur
+from app.metriques import Metriques
+from app import compression, jetons, journal, json_rapide, suivi_sql
+from app.versions import VersionsTables
 
 
 # Déclaration de l'instance SQLAlchemy
 db = SQLAlchemy()
+cache_donnees = Cache()  # Cache applicatif (backend mémoire ou Redis)
+cache_jetons = Cache()  # Versions des jetons d'accès par utilisateur
+versions_tables = VersionsTables()  # Versions par table pour les ETag
+metriques = Metriques()  # Métriques Prometheus (/metrics)
+hacheur = Hacheur()  # Hachage des mots de passe hors du thread de la requête
 
-def create_app():
+def create_app(demarrage_rapide=None):
+    """Construit l'application.
+
+    En démarrage rapide (``DEMARRAGE_RAPIDE`` ou ``demarrage_rapide=True``,
+    production), ni ``db.create_all()`` ni Flask-Migrate ne sont exécutés et
+    la spec Swagger est lue dans ``SWAGGER_SPEC_FICHIER`` si elle a été
+    pré-générée (``flask generer-spec``).
+    """
     app = Flask(__name__)
     app.config.from_object('config.Config')
     app.config["JWT_SECRET_KEY"] = "votre_cle_secrete"
-    Swagger(app)  # ✅ Initialisation ici avec l'app Flask
+    journal.init_app(app)
+    json_rapide.init_app(app)
+    if demarrage_rapide is None:
+        demarrage_rapide = app.config.get("DEMARRAGE_RAPIDE", False)
+
+    # ✅ Initialisation ici avec l'app Flask ; la spec n'est construite qu'à la première demande
+    SwaggerPrecompile(app, fichier_spec=app.config.get("SWAGGER_SPEC_FICHIER") if demarrage_rapide else None)
+
+    # Options du pool de connexions (DB_*), complétées par SQLALCHEMY_ENGINE_OPTIONS
+    from app.pool import options_moteur
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **options_moteur(app.config),
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
 
     # Initialiser SQLAlchemy et JWTManager
     db.init_app(app)  # ✅ Pas de redéclaration !
+    cache_donnees.init_app(app)
+    cache_jetons.init_app(app, CACHE_TAILLE_MAX=app.config.get("JETONS_CACHE_TAILLE", 10000))
+    versions_tables.init_app(app, db, cache_donnees)
+    suivi_sql.init_app(app)
+    metriques.init_app(app)
+    hacheur.init_app(app, metriques)
+    compression.init_app(app)
     jwt = JWTManager(app)
+    jetons.init_app(app, jwt, cache_jetons)
+
+    if not demarrage_rapide:
+        # Migrations : flask db upgrade (import d'Alembic évité en production)
+        from flask_migrate import Migrate
+        Migrate(app, db)
 
     # Configurer CORS
     CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}}, supports_credentials=True)
@@ -26,9 +69,14 @@ def create_app():
     from .routes import main
     app.register_blueprint(main)
 
-    # Créer les tables si elles n'existent pas
-    with app.app_context():
-        db.create_all()
+    # Commandes CLI (flask reconstruire-benefices, ...)
+    from .commands import register_commands
+    register_commands(app)
+
+    # Créer les tables si elles n'existent pas (en production : flask db upgrade)
+    if not demarrage_rapide:
+        with app.app_context():
+            db.create_all()
 
     return app
 
@@ -0,0 +1,35 @@
+"""Spec OpenAPI (Flasgger) pré-générée pour le démarrage rapide.
+
+Flasgger construit la spec en analysant les docstrings YAML de toutes les
+routes à la première requête sur ``/apispec_1.json``. En démarrage rapide,
+``SwaggerPrecompile`` sert à la place le fichier produit au déploiement par
+``flask generer-spec`` ; sans ce fichier, la spec est construite comme
+d'habitude, à la première demande.
+"""
+import json
+import os
+
+from flasgger import Swagger
+
+
+class SwaggerPrecompile(Swagger):
+    """``Swagger`` qui lit la spec dans ``fichier_spec`` s'il existe."""
+
+    def __init__(self, *args, fichier_spec=None, **kwargs):
+        self.fichier_spec = fichier_spec
+        super().__init__(*args, **kwargs)
+
+    def get_apispecs(self, endpoint=Swagger.DEFAULT_ENDPOINT):
+        if endpoint == Swagger.DEFAULT_ENDPOINT and endpoint not in self.apispecs and self.fichier_spec \
+                and os.path.exists(self.fichier_spec):
+            with open(self.fichier_spec, encoding="utf-8") as fichier:
+                self.apispecs[endpoint] = json.load(fichier)
+        return super().get_apispecs(endpoint)
+
+
+def ecrire_spec(swagger, fichier):
+    """Construit la spec à partir des docstrings et l'écrit dans ``fichier``."""
+    spec = Swagger.get_apispecs(swagger)
+    with open(fichier, "w", encoding="utf-8") as sortie:
+        json.dump(spec, sortie, ensure_ascii=False, sort_keys=True)
+    return spec
@@ -0,0 +1,187 @@
+"""Maintenance du cumul journalier des bénéfices (table benefices_journaliers).
+
+Les fonctions de ce module ne font jamais de commit : elles s'exécutent dans
+la transaction de la route appelante, qui reste seule responsable du commit
+ou du rollback.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app import calculs, db, dialecte
+from app.models import BeneficeJournalier, Beneficiaire, Fournisseur, Transaction, TransactionFournisseur
+
+# Nombre de liens transaction/fournisseur lus et calculés par lot lors d'une reconstruction
+TAILLE_LOT = 5000
+# Lignes par instruction INSERT ... ON CONFLICT (6 paramètres par ligne)
+TAILLE_LOT_UPSERT = 1000
+
+
+def contributions(fournisseur, resultat):
+    """Lignes de cumul d'un fournisseur à partir de sa ``calculs.Repartition``.
+
+    Renvoie un dictionnaire ``{nom_beneficiaire: (volume_USDT, benefice_FCFA,
+    part_FCFA)}`` où la clé ``''`` porte le volume, le bénéfice du fournisseur
+    et le bénéfice restant.
+    """
+    lignes = {nom: (Decimal(0), 0, d['benefice_FCFA']) for nom, d in resultat.beneficiaires.items()}
+    lignes[''] = (Decimal(fournisseur.quantite_USDT), resultat.benefice_total, resultat.benefice_restant)
+    return lignes
+
+
+def appliquer_transaction(transaction, fournisseurs, signe=1):
+    """Ajoute (signe=1) ou retire (signe=-1) une transaction du cumul."""
+    appliquer_transactions([(transaction, fournisseurs)], signe)
+
+
+def appliquer_transactions(transactions, signe=1):
+    """Ajoute ou retire du cumul une séquence de ``(transaction, fournisseurs)``.
+
+    Les contributions sont d'abord cumulées par clé, puis appliquées par un
+    seul upsert par lot de (jour, fournisseur, bénéficiaire).
+    """
+    transactions = [(t, f) for t, f in transactions if t.date_transaction is not None]
+    beneficiaires = beneficiaires_par_fournisseur(list({f.id for _, fs in transactions for f in fs}))
+
+    cumul = defaultdict(lambda: [Decimal(0), 0, 0])
+    _cumuler_lot(cumul, [
+        (transaction.taux_convenu, transaction.date_transaction, fournisseur, beneficiaires[fournisseur.id])
+        for transaction, fournisseurs in transactions
+        for fournisseur in fournisseurs
+    ])
+
+    _ajouter([
+        (jour, fournisseur_id, nom, signe * volume, signe * benefice, signe * part)
+        for (jour, fournisseur_id, nom), (volume, benefice, part) in cumul.items()
+    ])
+
+
+def recalculer_fournisseur(fournisseur_id):
+    """Recalcule toutes les lignes d'un fournisseur (taux ou bénéficiaires modifiés)."""
+    recalculer_fournisseurs([fournisseur_id])
+
+
+def recalculer_fournisseurs(fournisseur_ids):
+    """Recalcule toutes les lignes d'un ensemble de fournisseurs."""
+    fournisseur_ids = list(fournisseur_ids)
+    if not fournisseur_ids:
+        return
+
+    BeneficeJournalier.query.filter(
+        BeneficeJournalier.fournisseur_id.in_(fournisseur_ids)
+    ).delete(synchronize_session=False)
+
+    fournisseurs = {f.id: f for f in Fournisseur.query.filter(Fournisseur.id.in_(fournisseur_ids))}
+    beneficiaires = beneficiaires_par_fournisseur(list(fournisseurs))
+
+    liens = (
+        db.session.query(Transaction.taux_convenu, Transaction.date_transaction, TransactionFournisseur.fournisseur_id)
+        .join(TransactionFournisseur, TransactionFournisseur.transaction_id == Transaction.id)
+        .filter(TransactionFournisseur.fournisseur_id.in_(list(fournisseurs)))
+        .filter(Transaction.date_transaction.isnot(None))
+        .all()
+    )
+
+    cumul = defaultdict(lambda: [Decimal(0), 0, 0])
+    _cumuler_lot(cumul, [
+        (taux_convenu, date_transaction, fournisseurs[fournisseur_id], beneficiaires[fournisseur_id])
+        for taux_convenu, date_transaction, fournisseur_id in liens
+    ])
+    _inserer(cumul)
+
+
+def reconstruire():
+    """Vide et reconstruit entièrement la table de cumul. Renvoie le nombre de lignes."""
+    BeneficeJournalier.query.delete(synchronize_session=False)
+
+    fournisseurs = {f.id: f for f in Fournisseur.query.all()}
+    beneficiaires = beneficiaires_par_fournisseur()
+
+    liens = db.session.execute(
+        select(Transaction.taux_convenu, Transaction.date_transaction, TransactionFournisseur.fournisseur_id)
+        .join(TransactionFournisseur, TransactionFournisseur.transaction_id == Transaction.id)
+        .where(Transaction.date_transaction.isnot(None))
+        .execution_options(yield_per=TAILLE_LOT)
+    )
+
+    cumul = defaultdict(lambda: [Decimal(0), 0, 0])
+    for lot in liens.partitions():
+        _cumuler_lot(cumul, [
+            (taux_convenu, date_transaction, fournisseurs[fournisseur_id], beneficiaires[fournisseur_id])
+            for taux_convenu, date_transaction, fournisseur_id in lot
+            if fournisseur_id in fournisseurs
+        ])
+
+    _inserer(cumul)
+    return len(cumul)
+
+
+def beneficiaires_par_fournisseur(fournisseur_ids=None):
+    """Bénéficiaires groupés par fournisseur (tous si ``fournisseur_ids`` est None)."""
+    resultat = defaultdict(list)
+    if fournisseur_ids is not None and not fournisseur_ids:
+        return resultat
+
+    query = Beneficiaire.query.order_by(Beneficiaire.id)
+    if fournisseur_ids is not None:
+        query = query.filter(Beneficiaire.fournisseur_id.in_(fournisseur_ids))
+    for beneficiaire in query:
+        resultat[beneficiaire.fournisseur_id].append(beneficiaire)
+    return resultat
+
+
+def _cumuler_lot(cumul, lot):
+    """Ajoute au cumul un lot de ``(taux_convenu, date_transaction, fournisseur, beneficiaires)``."""
+    resultats = calculs.repartitions([(taux, fournisseur, benefs) for taux, _, fournisseur, benefs in lot])
+    for (_, date_transaction, fournisseur, _), resultat in zip(lot, resultats):
+        for nom, valeurs in contributions(fournisseur, resultat).items():
+            total = cumul[(date_transaction.date(), fournisseur.id, nom)]
+            for i, valeur in enumerate(valeurs):
+                total[i] += valeur
+
+
+def _inserer(cumul):
+    if cumul:
+        db.session.bulk_insert_mappings(BeneficeJournalier, [
+            {
+                'jour': jour,
+                'fournisseur_id': fournisseur_id,
+                'beneficiaire_nom': nom,
+                'volume_USDT': volume,
+                'benefice_FCFA': benefice,
+                'part_FCFA': part,
+            }
+            for (jour, fournisseur_id, nom), (volume, benefice, part) in cumul.items()
+        ])
+
+
+def _ajouter(lignes):
+    """Ajoute des deltas ``(jour, fournisseur_id, nom, volume, benefice, part)`` au cumul.
+
+    INSERT ... ON CONFLICT DO UPDATE SET x = x + excluded.x : la première
+    écriture d'une clé par deux workers à la fois ne viole pas
+    ``uq_benefices_journaliers_cle``, et aucune ligne n'est lue au préalable.
+    """
+    # Clés dans un ordre fixe : deux transactions concurrentes verrouillent les lignes dans le même ordre
+    lignes = sorted(lignes, key=lambda ligne: ligne[:3])
+    for debut in range(0, len(lignes), TAILLE_LOT_UPSERT):
+        stmt = dialecte.insert(BeneficeJournalier).values([
+            {
+                'jour': jour,
+                'fournisseur_id': fournisseur_id,
+                'beneficiaire_nom': nom,
+                'volume_USDT': volume,
+                'benefice_FCFA': benefice,
+                'part_FCFA': part,
+            }
+            for jour, fournisseur_id, nom, volume, benefice, part in lignes[debut:debut + TAILLE_LOT_UPSERT]
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['jour', 'fournisseur_id', 'beneficiaire_nom'],
+            set_={
+                colonne: getattr(BeneficeJournalier, colonne) + getattr(stmt.excluded, colonne)
+                for colonne in ('volume_USDT', 'benefice_FCFA', 'part_FCFA')
+            },
+        )
+        db.session.execute(stmt)
@@ -0,0 +1,302 @@
+"""Cache applicatif partagé par les routes (``/all/fourn``, ``/four/taux``, ETag)
+et par la vérification des jetons d'accès (``app.jetons``).
+
+Le cache délègue le stockage à un backend choisi par ``CACHE_BACKEND`` :
+
+- ``"memoire"`` (par défaut) : LRU avec durée de vie, propre à chaque
+  processus. Les versions des tags sont des fichiers de ``CACHE_VERSION_DIR``
+  partagés par tous les workers de la machine ;
+- ``"redis"`` : serveur parlant le protocole Redis (``CACHE_REDIS_URL``),
+  partagé par tous les workers et toutes les machines. Nécessite le paquet
+  ``redis`` (``pip install redis``).
+
+Chaque entrée porte des tags. Invalider un tag change sa version : une entrée
+n'est servie que si tous ses tags ont encore la version lue *avant* sa
+construction. Une écriture concurrente à la construction d'une entrée la rend
+donc immédiatement périmée. Une version est une valeur aléatoire, tirée aussi
+à la création du tag : un magasin de versions vidé (dossier effacé, Redis
+vidé ou redémarré) ne redonne jamais une version déjà servie, donc ni un ancien
+ETag ni un ancien corps compressé.
+
+Les valeurs doivent être sérialisables en JSON ; ``None`` n'est pas mis en cache.
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Clés (et tags) du cache
+FOURNISSEURS = "fournisseurs"  # /all/fourn : fournisseurs et bénéficiaires
+TAUX = "taux"                  # /four/taux : id, nom et taux du jour
+
+MEMOIRE = "memoire"
+REDIS = "redis"
+
+
+class Cache:
+    """Façade du cache : lecture avec construction, invalidation par tag, compteurs."""
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, **reglages):
+        """``reglages`` remplacent les ``CACHE_*`` de la configuration pour ce cache."""
+        self.backend = creer_backend({**app.config, **reglages})
+
+    def lire(self, cle, construire, tags=None):
+        """Valeur de ``cle``, construite par ``construire()`` si absente ou périmée.
+
+        ``tags`` vaut ``(cle,)`` par défaut.
+        """
+        tags = (cle,) if tags is None else tuple(tags)
+        versions = self.backend.versions(tags)
+        valeur = self.backend.get(cle)
+        if valeur is None:
+            valeur = construire()
+            self.backend.set(cle, valeur, tags, versions)
+        return valeur
+
+    def invalider(self, *tags):
+        """Périme toutes les entrées portant l'un de ``tags``, dans tous les workers.
+
+        À appeler après le commit de l'écriture.
+        """
+        self.backend.invalider_tag(*tags)
+
+    def versions(self, tags):
+        """Versions courantes de ``tags`` (changent à chaque invalidation)."""
+        return self.backend.versions(tuple(tags))
+
+    def stats(self):
+        return self.backend.stats()
+
+
+def creer_backend(config):
+    """Backend décrit par la configuration Flask (``CACHE_*``)."""
+    nom = config.get("CACHE_BACKEND", MEMOIRE)
+    duree_vie = config.get("CACHE_TTL", 300)
+    if nom == MEMOIRE:
+        return BackendMemoire(
+            taille_max=config.get("CACHE_TAILLE_MAX", 256),
+            duree_vie=duree_vie,
+            dossier=config.get("CACHE_VERSION_DIR"),
+        )
+    if nom == REDIS:
+        return BackendRedis(
+            url=config.get("CACHE_REDIS_URL", "redis://localhost:6379/0"),
+            prefixe=config.get("CACHE_PREFIXE", "crypto:"),
+            duree_vie=duree_vie,
+        )
+    raise ValueError(f"Backend de cache inconnu : {nom}")
+
+
+class BackendCache(ABC):
+    """Interface commune des backends et compteurs de succès / échecs (par processus).
+
+    ``get`` ne renvoie une valeur que si elle n'a pas expiré et si les versions
+    de ses tags n'ont pas changé depuis ``set``.
+    """
+
+    def __init__(self, duree_vie):
+        self.duree_vie = duree_vie
+        self._succes = 0
+        self._echecs = 0
+        self._verrou_stats = threading.Lock()
+
+    @abstractmethod
+    def get(self, cle):
+        """Valeur de ``cle``, ou ``None`` si absente, expirée ou périmée."""
+
+    @abstractmethod
+    def set(self, cle, valeur, tags=(), versions=None, duree_vie=None):
+        """Enregistre ``valeur``. ``versions`` : versions des tags lues avant sa construction."""
+
+    @abstractmethod
+    def versions(self, tags):
+        """Versions courantes de ``tags``, dans le même ordre."""
+
+    @abstractmethod
+    def invalider_tag(self, *tags):
+        """Périme les entrées portant l'un de ``tags``."""
+
+    def stats(self):
+        with self._verrou_stats:
+            total = self._succes + self._echecs
+            return {
+                "backend": self.nom,
+                "succes": self._succes,
+                "echecs": self._echecs,
+                "taux_succes": round(self._succes / total, 4) if total else None,
+            }
+
+    def _compter(self, trouve):
+        with self._verrou_stats:
+            if trouve:
+                self._succes += 1
+            else:
+                self._echecs += 1
+
+
+class BackendMemoire(BackendCache):
+    """LRU en mémoire ; versions des tags dans des fichiers partagés par la machine."""
+
+    nom = MEMOIRE
+
+    def __init__(self, taille_max=256, duree_vie=300, dossier=None):
+        super().__init__(duree_vie)
+        self.taille_max = taille_max
+        self.dossier = dossier or os.path.join(tempfile.gettempdir(), "crypto_cache_versions")
+        os.makedirs(self.dossier, exist_ok=True)
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def get(self, cle):
+        with self._verrou:
+            entree = self._entrees.get(cle)
+        valeur = None
+        if entree is not None:
+            tags, versions, expiration, valeur_stockee = entree
+            if expiration > time.monotonic() and self.versions(tags) == versions:
+                valeur = valeur_stockee
+                with self._verrou:
+                    if cle in self._entrees:
+                        self._entrees.move_to_end(cle)
+        self._compter(valeur is not None)
+        return valeur
+
+    def set(self, cle, valeur, tags=(), versions=None, duree_vie=None):
+        if valeur is None:
+            return
+        tags = tuple(tags)
+        versions = self.versions(tags) if versions is None else list(versions)
+        expiration = time.monotonic() + (self.duree_vie if duree_vie is None else duree_vie)
+        with self._verrou:
+            self._entrees[cle] = (tags, versions, expiration, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+
+    def versions(self, tags):
+        return [lire_tampon(self.dossier, tag) for tag in tags]
+
+    def invalider_tag(self, *tags):
+        for tag in tags:
+            changer_tampon(self.dossier, tag)
+        # Les autres processus détectent le changement de version à la lecture
+        with self._verrou:
+            for cle in [c for c, entree in self._entrees.items() if set(entree[0]) & set(tags)]:
+                del self._entrees[cle]
+
+    def vider(self):
+        """Vide les entrées de ce processus (les versions partagées sont conservées)."""
+        with self._verrou:
+            self._entrees.clear()
+
+
+class BackendRedis(BackendCache):
+    """Cache partagé sur un serveur parlant le protocole Redis.
+
+    Une entrée est une chaîne JSON ``{"tags": ..., "versions": ..., "valeur": ...}``
+    expirant au bout de ``duree_vie`` secondes ; la version d'un tag est un
+    uuid, créé par ``SET NX`` à la première lecture et remplacé à chaque
+    invalidation.
+    """
+
+    nom = REDIS
+
+    def __init__(self, url="redis://localhost:6379/0", prefixe="crypto:", duree_vie=300, client=None):
+        super().__init__(duree_vie)
+        self.prefixe = prefixe
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND = 'redis' nécessite le paquet redis (pip install redis)") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def get(self, cle):
+        brut = self.client.get(self._cle(cle))
+        valeur = None
+        if brut is not None:
+            entree = json.loads(brut)
+            if self.versions(entree["tags"]) == entree["versions"]:
+                valeur = entree["valeur"]
+        self._compter(valeur is not None)
+        return valeur
+
+    def set(self, cle, valeur, tags=(), versions=None, duree_vie=None):
+        if valeur is None:
+            return
+        tags = list(tags)
+        versions = self.versions(tags) if versions is None else list(versions)
+        entree = json.dumps({"tags": tags, "versions": versions, "valeur": valeur})
+        self.client.set(self._cle(cle), entree, ex=self.duree_vie if duree_vie is None else duree_vie)
+
+    def versions(self, tags):
+        if not tags:
+            return []
+        cles = [self._tag(t) for t in tags]
+        valeurs = self.client.mget(cles)
+        if None in valeurs:
+            # Tag jamais écrit ou perdu (FLUSHALL, redémarrage) : nouvelle version
+            # aléatoire, sans écraser celle qu'un autre worker vient de créer
+            pipeline = self.client.pipeline(transaction=False)
+            for cle, valeur in zip(cles, valeurs):
+                if valeur is None:
+                    pipeline.set(cle, uuid.uuid4().hex, nx=True)
+            pipeline.execute()
+            valeurs = self.client.mget(cles)
+        return [v.decode() if isinstance(v, bytes) else v for v in valeurs]
+
+    def invalider_tag(self, *tags):
+        pipeline = self.client.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.set(self._tag(tag), uuid.uuid4().hex)
+        pipeline.execute()
+
+    def _cle(self, cle):
+        return f"{self.prefixe}cle:{cle}"
+
+    def _tag(self, tag):
+        return f"{self.prefixe}tag:{tag}"
+
+
+def lire_tampon(dossier, cle):
+    """Contenu du tampon de version ``cle``, créé avec une valeur aléatoire s'il n'existe pas."""
+    chemin = os.path.join(dossier, f"{cle}.version")
+    try:
+        with open(chemin) as fichier:
+            return fichier.read()
+    except FileNotFoundError:
+        pass
+    # os.link échoue si le fichier existe : un tampon créé entre-temps par un autre processus est conservé
+    temporaire = _ecrire_temporaire(dossier)
+    try:
+        os.link(temporaire, chemin)
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(temporaire)
+    with open(chemin) as fichier:
+        return fichier.read()
+
+
+def changer_tampon(dossier, cle):
+    """Donne une nouvelle valeur au tampon ``cle``, visible de tous les processus."""
+    # Écriture atomique : un lecteur voit l'ancienne ou la nouvelle version
+    os.replace(_ecrire_temporaire(dossier), os.path.join(dossier, f"{cle}.version"))
+
+
+def _ecrire_temporaire(dossier):
+    """Fichier temporaire de ``dossier`` contenant une version aléatoire ; renvoie son chemin."""
+    descripteur, temporaire = tempfile.mkstemp(dir=dossier)
+    with os.fdopen(descripteur, "w") as fichier:
+        fichier.write(uuid.uuid4().hex)
+    return temporaire
@@ -0,0 +1,189 @@
+"""Calcul des bénéfices fournisseurs et de leur répartition entre bénéficiaires.
+
+Toutes les routes de calcul (``/cal/<id>``, ``/call/<id>``, ``/cal/perid``,
+``/accc/last``), l'export et le cumul journalier passent par ce module.
+
+Deux modes :
+
+- ``ENTIER`` (par défaut) : règles historiques de ``/call/<id>``. Les marges
+  de l'ensemble des couples (transaction, fournisseur) sont calculées en une
+  seule passe NumPy (``marges``), les parts des bénéficiaires en entiers
+  Python. Le bénéfice par USDT et le bénéfice total sont tronqués vers zéro,
+  la part d'un bénéficiaire vaut ``(benefice_total * commission) // 100``
+  avec une commission tronquée à l'entier.
+- ``DECIMAL`` : arithmétique ``Decimal`` exacte, sans troncature, utilisée
+  par ``/cal/<id>`` pour l'audit.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+import numpy as np
+
+ENTIER = "entier"
+DECIMAL = "decimal"
+
+# Les quantités ont 3 décimales (Numeric(10, 3)) : on calcule en millièmes
+# d'USDT pour rester en arithmétique entière exacte.
+_ECHELLE_QUANTITE = 1000
+
+Repartition = namedtuple("Repartition", "benefice_par_USDT benefice_total beneficiaires benefice_restant")
+Repartition.__doc__ = """Répartition du bénéfice d'un fournisseur pour une transaction.
+
+``beneficiaires`` associe à chaque nom ``commission_USDT`` et ``benefice_FCFA``
+(cumulés si le nom apparaît plusieurs fois chez le fournisseur).
+"""
+
+
+def repartitions(lignes, mode=ENTIER):
+    """Répartitions d'une séquence de ``(taux_convenu, fournisseur, beneficiaires)``.
+
+    Renvoie une liste de ``Repartition`` dans le même ordre que ``lignes``.
+    """
+    if mode == DECIMAL:
+        return [_repartition_decimal(*ligne) for ligne in lignes]
+    if mode != ENTIER:
+        raise ValueError(f"Mode de calcul inconnu : {mode}")
+    if not lignes:
+        return []
+
+    # Les mêmes fournisseurs reviennent dans de nombreuses lignes : leurs valeurs
+    # (taux, quantité, commissions) ne sont lues qu'une fois.
+    uniques = {}
+    fournisseurs = []
+    for _, fournisseur, beneficiaires in lignes:
+        cle = (id(fournisseur), id(beneficiaires))
+        f = uniques.get(cle)
+        if f is None:
+            f = uniques[cle] = _Fournisseur(fournisseur, beneficiaires)
+        fournisseurs.append(f)
+
+    benefice_par_USDT, benefice_total = marges(
+        [ligne[0] for ligne in lignes],
+        [f.taux_jour for f in fournisseurs],
+        [f.quantite_USDT for f in fournisseurs],
+    )
+
+    # Parts des bénéficiaires en entiers Python, ligne par ligne
+    return [
+        _repartition_entiere(par_USDT, benefice, f)
+        for f, par_USDT, benefice in zip(fournisseurs, benefice_par_USDT.tolist(), benefice_total.tolist())
+    ]
+
+
+def marges(taux_convenus, taux_jour, quantites_USDT):
+    """Bénéfices par USDT et bénéfices totaux (mode ``ENTIER``) en tableaux NumPy.
+
+    ``(taux_convenu - taux_jour)`` et ``(taux_convenu - taux_jour) * quantite_USDT``
+    sont tronqués vers zéro, comme ``int()``.
+    """
+    taux_convenus = np.asarray(taux_convenus, dtype=np.float64)
+    taux_jour = np.asarray(taux_jour, dtype=np.float64)
+    quantites = np.rint(np.asarray(quantites_USDT, dtype=np.float64) * _ECHELLE_QUANTITE).astype(np.int64)
+
+    benefice_par_USDT = np.trunc(taux_convenus - taux_jour).astype(np.int64)
+    produit = benefice_par_USDT * quantites
+    benefice_total = np.sign(produit) * (np.abs(produit) // _ECHELLE_QUANTITE)
+    return benefice_par_USDT, benefice_total
+
+
+def repartition(taux_convenu, fournisseur, beneficiaires, mode=ENTIER):
+    """Répartition d'un seul fournisseur (voir ``repartitions``)."""
+    return repartitions([(taux_convenu, fournisseur, beneficiaires)], mode)[0]
+
+
+def historiques(transactions):
+    """Entrées de l'historique (``/cal/perid``) d'une séquence de transactions.
+
+    ``transactions`` est une séquence de couples ``(transaction, fournisseurs)``
+    où ``fournisseurs`` est une liste de couples ``(fournisseur, beneficiaires)``.
+    Toutes les marges sont calculées en une seule passe.
+    """
+    lignes = [
+        (transaction.taux_convenu, fournisseur, beneficiaires)
+        for transaction, fournisseurs in transactions
+        for fournisseur, beneficiaires in fournisseurs
+    ]
+    resultats = iter(repartitions(lignes))
+
+    entrees = []
+    for transaction, fournisseurs in transactions:
+        total_benefice_fournisseurs = 0
+        fournisseurs_list = []
+        benefices_par_fournisseur = {}
+
+        for fournisseur, _ in fournisseurs:
+            resultat = next(resultats)
+            total_benefice_fournisseurs += resultat.benefice_total
+
+            fournisseurs_list.append({
+                'fournisseur': fournisseur.nom,
+                'benefice_par_USDT': resultat.benefice_par_USDT,
+                'benefice_total_FCFA': resultat.benefice_total
+            })
+            benefices_par_fournisseur[fournisseur.nom] = {
+                'benefices_par_beneficiaire': resultat.beneficiaires,
+                'benefice_restant': resultat.benefice_restant
+            }
+
+        entrees.append({
+            "transaction_id": transaction.id,
+            "date_transaction": transaction.date_transaction.strftime("%Y-%m-%d"),
+            "taux_convenu": transaction.taux_convenu,
+            "montant_FCFA": transaction.montant_FCFA,
+            "montant_USDT": int(transaction.montant_USDT),
+            "benefices_fournisseurs": fournisseurs_list,
+            "details_par_fournisseur": benefices_par_fournisseur,
+            "resume_global": {
+                "benefice_total_fournisseurs": total_benefice_fournisseurs
+            }
+        })
+
+    return entrees
+
+
+class _Fournisseur:
+    """Valeurs d'un fournisseur et de ses bénéficiaires, lues une seule fois."""
+
+    __slots__ = ("taux_jour", "quantite_USDT", "beneficiaires")
+
+    def __init__(self, fournisseur, beneficiaires):
+        self.taux_jour = fournisseur.taux_jour
+        self.quantite_USDT = fournisseur.quantite_USDT
+        self.beneficiaires = [(b.nom, int(b.commission_USDT)) for b in beneficiaires]
+
+
+def _repartition_entiere(benefice_par_USDT, benefice_total, fournisseur):
+    # Un même nom peut apparaître plusieurs fois : ses parts sont cumulées
+    # et la commission affichée est celle de sa première occurrence.
+    beneficiaires_dict = {}
+    benefice_restant = benefice_total
+    for nom, commission_USDT in fournisseur.beneficiaires:
+        part = (benefice_total * commission_USDT) // 100
+        benefice_restant -= part
+        if nom not in beneficiaires_dict:
+            beneficiaires_dict[nom] = {'commission_USDT': commission_USDT, 'benefice_FCFA': part}
+        else:
+            beneficiaires_dict[nom]['benefice_FCFA'] += part
+
+    return Repartition(benefice_par_USDT, benefice_total, beneficiaires_dict, benefice_restant)
+
+
+def _repartition_decimal(taux_convenu, fournisseur, beneficiaires):
+    benefice_par_USDT = Decimal(taux_convenu) - Decimal(fournisseur.taux_jour)
+    benefice_total = benefice_par_USDT * Decimal(fournisseur.quantite_USDT)
+
+    beneficiaires_dict = {}
+    for beneficiaire in beneficiaires:
+        commission_USDT = Decimal(beneficiaire.commission_USDT)
+        benefice_beneficiaire = (benefice_total * commission_USDT) / Decimal(100)
+
+        if beneficiaire.nom not in beneficiaires_dict:
+            beneficiaires_dict[beneficiaire.nom] = {
+                'commission_USDT': commission_USDT,
+                'benefice_FCFA': benefice_beneficiaire
+            }
+        else:
+            beneficiaires_dict[beneficiaire.nom]['benefice_FCFA'] += benefice_beneficiaire
+
+    benefice_restant = benefice_total - sum(d['benefice_FCFA'] for d in beneficiaires_dict.values())
+    return Repartition(benefice_par_USDT, benefice_total, beneficiaires_dict, benefice_restant)
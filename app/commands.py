@@ -0,0 +1,199 @@
+import click
+from flask.cli import with_appcontext
+
+from app import db
+
+
+@click.command('reconstruire-benefices')
+@with_appcontext
+def reconstruire_benefices():
+    """Reconstruire la table de cumul journalier des bénéfices."""
+    from app.benefices import reconstruire
+
+    lignes = reconstruire()
+    db.session.commit()
+    click.echo(f"✅ Cumul des bénéfices reconstruit : {lignes} lignes")
+
+
+@click.command('import-fournisseurs')
+@click.argument('fichier', type=click.Path(exists=True, dir_okay=False))
+@with_appcontext
+def import_fournisseurs(fichier):
+    """Importer des fournisseurs et leurs bénéficiaires depuis un fichier JSON ou CSV."""
+    from app import cache, cache_donnees, importation
+
+    with open(fichier, encoding='utf-8-sig') as f:
+        contenu = f.read()
+
+    try:
+        resume = importation.importer(importation.lire(contenu, fichier.rsplit('.', 1)[-1].lower()))
+    except importation.ImportInvalide as e:
+        db.session.rollback()
+        for erreur in e.erreurs:
+            click.echo(f"  entrée {erreur['index']} : {erreur['message']}", err=True)
+        raise click.ClickException(str(e))
+
+    db.session.commit()
+    # Les workers en cours d'exécution voient le changement de version des tags
+    cache_donnees.invalider(cache.FOURNISSEURS, cache.TAUX)
+    click.echo(
+        f"✅ {resume['crees']} fournisseurs créés, {resume['mis_a_jour']} mis à jour, "
+        f"{resume['beneficiaires']} bénéficiaires"
+    )
+
+
+@click.command('verifier-index')
+@with_appcontext
+def verifier_index():
+    """Vérifier par EXPLAIN que les requêtes chaudes utilisent leurs index."""
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import inspect, select, text
+
+    from app.models import Beneficiaire, Fournisseur, Transaction, TransactionFournisseur
+
+    debut_mois = datetime.today().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    # (route, requête, index attendu) : requêtes émises par getTransactionById
+    # et get_all_transactions_periode (chargement en lot compris)
+    requetes = [
+        ("/tran/<id> fournisseurs", select(Fournisseur)
+            .join(TransactionFournisseur, Fournisseur.id == TransactionFournisseur.fournisseur_id)
+            .where(TransactionFournisseur.transaction_id == 1),
+         "ix_transaction_fournisseur_transaction_id"),
+        ("/tran/<id> bénéficiaires", select(Beneficiaire).where(Beneficiaire.fournisseur_id == 1),
+         "ix_beneficiaires_fournisseur_id"),
+        ("/cal/perid transactions", select(Transaction)
+            .where(Transaction.date_transaction >= debut_mois - timedelta(days=1))
+            .order_by(Transaction.id.asc()),
+         "ix_transactions_date_id"),
+        ("/cal/perid fournisseurs", select(TransactionFournisseur.transaction_id, Fournisseur)
+            .join(Fournisseur, Fournisseur.id == TransactionFournisseur.fournisseur_id)
+            .where(TransactionFournisseur.transaction_id.in_([1, 2, 3])),
+         "ix_transaction_fournisseur_transaction_id"),
+        ("/cal/perid bénéficiaires", select(Beneficiaire).where(Beneficiaire.fournisseur_id.in_([1, 2, 3])),
+         "ix_beneficiaires_fournisseur_id"),
+    ]
+
+    dialecte = db.engine.dialect.name
+    inspecteur = inspect(db.engine)
+    existants = {
+        index["name"]
+        for table in ("transactions", "transaction_fournisseur", "beneficiaires")
+        for index in inspecteur.get_indexes(table)
+    }
+    echecs = 0
+    with db.engine.connect() as connexion:
+        if dialecte == "postgresql":
+            # Sur une petite base le planificateur préfère un parcours séquentiel :
+            # on vérifie que l'index est utilisable, pas qu'il est choisi.
+            connexion.execute(text("SET LOCAL enable_seqscan = off"))
+            prefixe = "EXPLAIN "
+        elif dialecte == "sqlite":
+            prefixe = "EXPLAIN QUERY PLAN "
+        else:
+            raise click.ClickException(f"Dialecte non pris en charge : {dialecte}")
+
+        for nom, requete, index in requetes:
+            sql = str(requete.compile(db.engine, compile_kwargs={"literal_binds": True}))
+            plan = "\n".join(" ".join(str(c) for c in ligne) for ligne in connexion.execute(text(prefixe + sql)))
+            if index not in existants:
+                echecs += 1
+                click.echo(f"❌ {nom} : index {index} absent")
+            elif index in plan:
+                click.echo(f"✅ {nom} : parcours de {index}")
+            else:
+                # L'index existe mais le planificateur lui préfère un autre plan (petite table, tri...)
+                click.echo(f"⚠️  {nom} : {index} présent mais non retenu par le planificateur")
+            for ligne in plan.splitlines():
+                click.echo(f"     {ligne}")
+
+    if echecs:
+        raise click.ClickException(f"{echecs} index manquant(s) : lancer flask db upgrade")
+
+
+# Nombre maximal de requêtes SQL par route, indépendant du volume de données
+BUDGETS_REQUETES = {
+    "/total/fr": 1,
+    "/total/tr": 1,
+    "/total/bn": 1,
+    "/total/been": 1,
+    "/dashboard/summary": 1,
+    "/four/taux": 1,
+    "/all/fourn": 2,
+    "/alll/ben": 1,
+    "/trans/alll": 2,
+    "/tran/{id}": 3,
+    "/cal/{id}": 3,
+    "/call/{id}": 3,
+    "/cal/perid?periode=annee": 3,
+    "/accc/last": 2,
+    "/export/transactions?periode=annee": 3,
+}
+
+
+@click.command('verifier-requetes')
+@with_appcontext
+def verifier_requetes():
+    """Vérifier le nombre de requêtes SQL de chaque route (détection des N+1).
+
+    À lancer sur une base contenant plusieurs transactions et fournisseurs.
+    """
+    from flask import current_app
+    from sqlalchemy import func
+
+    from app.models import TransactionFournisseur
+    from app.suivi_sql import assert_max_requetes
+
+    # Transaction ayant le plus de fournisseurs : un N+1 s'y voit le mieux
+    transaction_id = (
+        db.session.query(TransactionFournisseur.transaction_id)
+        .group_by(TransactionFournisseur.transaction_id)
+        .order_by(func.count().desc(), TransactionFournisseur.transaction_id)
+        .limit(1)
+        .scalar()
+    )
+    if transaction_id is None:
+        raise click.ClickException("Aucune transaction liée à un fournisseur : impossible de détecter un N+1")
+
+    client = current_app.test_client()
+    echecs = 0
+    for route, maximum in BUDGETS_REQUETES.items():
+        try:
+            with assert_max_requetes(maximum) as suivi:
+                reponse = client.get(route.format(id=transaction_id))
+                reponse.get_data()  # Les exports ne s'exécutent qu'à la lecture du corps
+        except AssertionError as e:
+            echecs += 1
+            click.echo(f"❌ {route} : {e}")
+            continue
+        if reponse.status_code >= 500:
+            echecs += 1
+            click.echo(f"❌ {route} : erreur {reponse.status_code}")
+            continue
+        click.echo(f"✅ {route} : {suivi.nombre}/{maximum} requêtes ({reponse.status_code})")
+
+    if echecs:
+        raise click.ClickException(f"{echecs} route(s) en erreur ou au-delà de leur budget de requêtes")
+
+
+@click.command('generer-spec')
+@click.argument('fichier', required=False)
+@with_appcontext
+def generer_spec(fichier):
+    """Pré-générer la spec Swagger servie en démarrage rapide (SWAGGER_SPEC_FICHIER)."""
+    from flask import current_app
+
+    from app.apispec import ecrire_spec
+
+    fichier = fichier or current_app.config["SWAGGER_SPEC_FICHIER"]
+    spec = ecrire_spec(current_app.swag, fichier)
+    click.echo(f"✅ {len(spec.get('paths', {}))} routes décrites dans {fichier}")
+
+
+def register_commands(app):
+    app.cli.add_command(reconstruire_benefices)
+    app.cli.add_command(import_fournisseurs)
+    app.cli.add_command(verifier_index)
+    app.cli.add_command(generer_spec)
+    app.cli.add_command(verifier_requetes)
@@ -0,0 +1,150 @@
+"""Compression des réponses (gzip, brotli) négociée par ``Accept-Encoding``.
+
+Les grosses réponses JSON (``/trans/alll``, ``/all/fourn``,
+``/cal/perid?periode=annee``) répètent les mêmes clés à chaque élément et se
+compressent très bien : le transfert vers les clients mobiles est plusieurs
+fois plus court. La compression est faite après la vue (``after_request``),
+sur le corps déjà sérialisé, si :
+
+- le client l'accepte (``br`` préféré à ``gzip`` à qualité égale ; brotli
+  nécessite le paquet ``brotli`` de requirements.txt, sans lui un
+  avertissement est journalisé au démarrage et seul gzip est proposé) ;
+- la réponse est un 200 non streamé, d'un type de ``COMPRESSION_TYPES``,
+  sans ``Content-Encoding`` ni ``Cache-Control: no-transform`` ;
+- le corps fait au moins ``COMPRESSION_SEUIL`` octets : en dessous, le gain
+  tient dans un paquet et ne vaut pas le temps CPU.
+
+Les réponses portant un ETag (routes ``versions_tables.conditionnel``) sont
+identifiées par leur ETag et leur encodage : les corps compressés sont gardés
+dans un LRU par processus (``COMPRESSION_CACHE_OCTETS``, 0 pour le désactiver)
+et réutilisés tant que les données n'ont pas changé. L'ETag d'une réponse
+compressée est rendu faible (même représentation, octets différents), ce qui
+conserve les 304 sur ``If-None-Match``.
+"""
+import gzip
+import logging
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    brotli = None
+
+GZIP = "gzip"
+BROTLI = "br"
+
+TYPES_DEFAUT = ("application/json", "text/csv", "text/html", "text/plain")
+
+logger = logging.getLogger(__name__)
+
+_reglages = {}
+_corps_compresses = None
+
+
+class CorpsCompresses:
+    """LRU des corps compressés, borné par la taille totale des corps gardés."""
+
+    def __init__(self, octets_max):
+        self.octets_max = octets_max
+        self.octets = 0
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def get(self, cle):
+        with self._verrou:
+            corps = self._entrees.get(cle)
+            if corps is not None:
+                self._entrees.move_to_end(cle)
+            return corps
+
+    def set(self, cle, corps):
+        if len(corps) > self.octets_max:
+            return
+        with self._verrou:
+            ancien = self._entrees.pop(cle, None)
+            if ancien is not None:
+                self.octets -= len(ancien)
+            self._entrees[cle] = corps
+            self.octets += len(corps)
+            while self.octets > self.octets_max:
+                _, retire = self._entrees.popitem(last=False)
+                self.octets -= len(retire)
+
+
+def encodages_disponibles():
+    """Encodages proposés, du préféré au moins préféré."""
+    return (BROTLI, GZIP) if brotli is not None else (GZIP,)
+
+
+def compresser(donnees, encodage, niveau=None):
+    """``donnees`` compressées en ``encodage`` (``gzip`` ou ``br``)."""
+    if encodage == BROTLI:
+        return brotli.compress(donnees, quality=_reglages.get("brotli", 5) if niveau is None else niveau)
+    # mtime=0 : même entrée, mêmes octets
+    return gzip.compress(donnees, compresslevel=_reglages.get("gzip", 6) if niveau is None else niveau, mtime=0)
+
+
+def init_app(app):
+    global _corps_compresses
+
+    app.config.setdefault("COMPRESSION", True)
+    app.config.setdefault("COMPRESSION_SEUIL", 1400)
+    app.config.setdefault("COMPRESSION_NIVEAU_GZIP", 6)
+    app.config.setdefault("COMPRESSION_NIVEAU_BROTLI", 5)
+    app.config.setdefault("COMPRESSION_TYPES", TYPES_DEFAUT)
+    app.config.setdefault("COMPRESSION_CACHE_OCTETS", 32 * 1024 * 1024)
+    if not app.config["COMPRESSION"]:
+        return
+
+    _reglages.update(
+        seuil=app.config["COMPRESSION_SEUIL"],
+        gzip=app.config["COMPRESSION_NIVEAU_GZIP"],
+        brotli=app.config["COMPRESSION_NIVEAU_BROTLI"],
+        types=frozenset(app.config["COMPRESSION_TYPES"]),
+    )
+    if brotli is None:
+        logger.warning("brotli n'est pas installé : réponses compressées en gzip seulement (pip install brotli)")
+    octets = app.config["COMPRESSION_CACHE_OCTETS"]
+    _corps_compresses = CorpsCompresses(octets) if octets else None
+
+    # Enregistré après les métriques : exécuté avant elles, qui mesurent la taille transférée
+    app.after_request(_compresser)
+
+
+def _compresser(response):
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or response.mimetype not in _reglages["types"]
+        or "Content-Encoding" in response.headers
+        or "no-transform" in response.headers.get("Cache-Control", "")
+    ):
+        return response
+
+    taille = response.calculate_content_length()
+    if taille is None or taille < _reglages["seuil"]:
+        return response
+
+    # La réponse dépend désormais d'Accept-Encoding, même non compressée
+    response.vary.add("Accept-Encoding")
+    encodage = request.accept_encodings.best_match(encodages_disponibles())
+    if encodage is None:
+        return response
+
+    etag, faible = response.get_etag()
+    cle = (etag, encodage) if etag and _corps_compresses is not None else None
+    corps = _corps_compresses.get(cle) if cle else None
+    if corps is None:
+        corps = compresser(response.get_data(), encodage)
+        if cle:
+            _corps_compresses.set(cle, corps)
+
+    response.set_data(corps)
+    response.headers["Content-Encoding"] = encodage
+    if etag and not faible:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,17 @@
+"""Constructions SQL propres au dialecte de la base configurée.
+
+``INSERT ... ON CONFLICT`` n'existe que dans les constructions des dialectes
+PostgreSQL et SQLite, pas dans ``sqlalchemy.insert`` : les upserts du cumul
+journalier (``app.benefices``) et de l'import des fournisseurs
+(``app.importation``) passent par ``insert`` ci-dessous.
+"""
+from app import db
+
+
+def insert(table):
+    """``INSERT`` du dialecte de la base courante, avec ``on_conflict_do_update``."""
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecte
+    else:
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecte
+    return insert_dialecte(table)
@@ -0,0 +1,113 @@
+"""Export en flux de l'historique des transactions (CSV ou NDJSON).
+
+Les transactions sont lues par lots via un curseur côté serveur
+(``yield_per``) et écrites au fil de l'eau : la mémoire consommée ne dépend
+pas du nombre de transactions exportées.
+"""
+import csv
+import io
+import json
+from itertools import groupby
+
+from app import calculs, db
+from app.benefices import beneficiaires_par_fournisseur
+from app.models import Fournisseur, Transaction, TransactionFournisseur
+
+# Nombre de lignes lues par aller-retour et de transactions écrites par morceau de réponse
+TAILLE_LOT = 1000
+
+COLONNES_CSV = [
+    "transaction_id", "date_transaction", "taux_convenu", "montant_FCFA", "montant_USDT",
+    "fournisseur_id", "fournisseur", "benefice_par_USDT", "benefice_total_FCFA",
+    "beneficiaire", "commission_USDT", "benefice_FCFA", "benefice_restant",
+]
+
+
+def _lots(date_debut=None):
+    """Lots de ``(transaction, [(fournisseur, beneficiaires), ...])`` triés par transaction."""
+    query = (
+        db.session.query(
+            Transaction.id,
+            Transaction.date_transaction,
+            Transaction.taux_convenu,
+            Transaction.montant_FCFA,
+            Transaction.montant_USDT,
+            TransactionFournisseur.fournisseur_id,
+        )
+        .join(TransactionFournisseur, TransactionFournisseur.transaction_id == Transaction.id)
+        .order_by(Transaction.id.asc(), TransactionFournisseur.fournisseur_id.asc())
+    )
+    if date_debut:
+        query = query.filter(Transaction.date_transaction >= date_debut)
+
+    # Fournisseurs et bénéficiaires : tables de référence, chargées une seule fois
+    fournisseurs = {f.id: f for f in Fournisseur.query.all()}
+    beneficiaires = beneficiaires_par_fournisseur()
+
+    lot = []
+    for _, lignes in groupby(query.yield_per(TAILLE_LOT), key=lambda ligne: ligne.id):
+        lignes = list(lignes)
+        lot.append((lignes[0], [
+            (fournisseurs[ligne.fournisseur_id], beneficiaires[ligne.fournisseur_id])
+            for ligne in lignes if ligne.fournisseur_id in fournisseurs
+        ]))
+        if len(lot) >= TAILLE_LOT:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def generer_ndjson(date_debut=None):
+    """Une ligne JSON par transaction, au format de ``/cal/perid``."""
+    for lot in _lots(date_debut):
+        yield "".join(
+            json.dumps(entree, ensure_ascii=False) + "\n" for entree in calculs.historiques(lot)
+        )
+
+
+def generer_csv(date_debut=None):
+    """Une ligne CSV par (transaction, fournisseur, bénéficiaire)."""
+    sortie = io.StringIO()
+    writer = csv.writer(sortie)
+
+    # L'en-tête part immédiatement, avant la première lecture en base
+    writer.writerow(COLONNES_CSV)
+    yield _vider(sortie)
+
+    for lot in _lots(date_debut):
+        resultats = iter(calculs.repartitions([
+            (transaction.taux_convenu, fournisseur, beneficiaires)
+            for transaction, fournisseurs in lot
+            for fournisseur, beneficiaires in fournisseurs
+        ]))
+
+        for transaction, fournisseurs in lot:
+            debut = [
+                transaction.id,
+                transaction.date_transaction.strftime("%Y-%m-%d"),
+                transaction.taux_convenu,
+                transaction.montant_FCFA,
+                transaction.montant_USDT,
+            ]
+            for fournisseur, _ in fournisseurs:
+                resultat = next(resultats)
+                colonnes_fournisseur = debut + [
+                    fournisseur.id, fournisseur.nom, resultat.benefice_par_USDT, resultat.benefice_total
+                ]
+
+                # Un fournisseur sans bénéficiaire produit tout de même une ligne
+                details = resultat.beneficiaires.items() or [("", {"commission_USDT": "", "benefice_FCFA": ""})]
+                for nom, detail in details:
+                    writer.writerow(colonnes_fournisseur + [
+                        nom, detail["commission_USDT"], detail["benefice_FCFA"], resultat.benefice_restant
+                    ])
+
+        yield _vider(sortie)
+
+
+def _vider(sortie):
+    contenu = sortie.getvalue()
+    sortie.seek(0)
+    sortie.truncate(0)
+    return contenu
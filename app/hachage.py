@@ -0,0 +1,126 @@
+"""Hachage des mots de passe dans un pool de processus borné.
+
+``generate_password_hash`` / ``check_password_hash`` coûtent volontairement
+cher en CPU (scrypt, pbkdf2) : exécutés dans le thread de la requête, une
+rafale de connexions bloque le GIL du worker et toutes ses autres requêtes.
+``Hacheur`` les exécute dans ``HACHAGE_PROCESSUS`` processus dédiés (créés à la
+première utilisation, dans chaque worker).
+
+Au-delà de ``HACHAGE_FILE_MAX`` hachages en cours ou en attente dans le
+worker, les nouvelles demandes sont refusées tout de suite (``HachageSature``,
+réponse 503) au lieu de s'accumuler : l'excès de connexions est délesté.
+
+``HACHAGE_METHODE`` fixe l'algorithme et son coût au format de werkzeug
+(``scrypt:32768:8:1``, ``pbkdf2:sha256:600000``) ; les anciens hachages restent
+vérifiables et sont recalculés à la connexion suivante (``a_rehacher``).
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as DelaiDepasse
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+HACHER = "hacher"
+VERIFIER = "verifier"
+
+
+class HachageSature(Exception):
+    """Trop de hachages en cours dans ce worker, ou résultat trop lent."""
+
+
+class Hacheur:
+    """Hachage et vérification des mots de passe hors du thread de la requête."""
+
+    def __init__(self):
+        self.methode = "scrypt"
+        self.processus = 0
+        self.file_max = 0
+        self.delai = None
+        self.metriques = None
+        self._prefixe = None
+        self._places = None
+        self._pool = None
+        self._pid = None
+        self._verrou = threading.Lock()
+
+    def init_app(self, app, metriques=None):
+        self.methode = app.config.get("HACHAGE_METHODE", self.methode)
+        self.processus = app.config.get("HACHAGE_PROCESSUS", 2)
+        self.file_max = app.config.get("HACHAGE_FILE_MAX", 4 * max(self.processus, 1))
+        self.delai = app.config.get("HACHAGE_DELAI", 10.0)
+        self.metriques = metriques
+        self._prefixe = None
+        self._places = threading.BoundedSemaphore(self.file_max)
+
+    def hacher(self, mot_de_passe):
+        """Hachage de ``mot_de_passe`` avec ``HACHAGE_METHODE``."""
+        return self._executer(HACHER, generate_password_hash, mot_de_passe, self.methode)
+
+    def verifier(self, hachage, mot_de_passe):
+        """``True`` si ``mot_de_passe`` correspond à ``hachage`` (quelle que soit sa méthode)."""
+        return self._executer(VERIFIER, check_password_hash, hachage, mot_de_passe)
+
+    def a_rehacher(self, hachage):
+        """``True`` si ``hachage`` n'a pas été calculé avec ``HACHAGE_METHODE``."""
+        return hachage.split("$", 1)[0] != self._prefixe_methode()
+
+    def _prefixe_methode(self):
+        # Werkzeug complète la méthode ("scrypt" devient "scrypt:32768:8:1") :
+        # préfixe d'un vrai hachage, calculé une fois, à la première connexion
+        if self._prefixe is None:
+            self._prefixe = generate_password_hash("", self.methode).split("$", 1)[0]
+        return self._prefixe
+
+    def _executer(self, operation, fonction, *arguments):
+        if not self._places.acquire(blocking=False):
+            self._compter_rejet(operation, "file_pleine")
+            raise HachageSature(f"Plus de {self.file_max} hachages en attente")
+
+        debut = time.perf_counter()
+        try:
+            if not self.processus:
+                try:
+                    return fonction(*arguments)
+                finally:
+                    self._places.release()
+
+            try:
+                futur = self._pool_courant().submit(fonction, *arguments)
+            except BrokenProcessPool:
+                # Un processus du pool est mort : nouveau pool à l'appel suivant
+                self._pid = None
+                self._places.release()
+                raise
+            # La place est libérée à la fin du calcul, même après expiration du délai
+            futur.add_done_callback(lambda _: self._places.release())
+            try:
+                return futur.result(timeout=self.delai)
+            except DelaiDepasse:
+                self._compter_rejet(operation, "delai")
+                raise HachageSature(f"Hachage non terminé en {self.delai} s") from None
+            except BrokenProcessPool:
+                self._pid = None
+                raise
+        finally:
+            if self.metriques is not None:
+                self.metriques.observer("hachage_duree_secondes", {"operation": operation}, time.perf_counter() - debut)
+
+    def _pool_courant(self):
+        # Un pool par processus : celui du maître gunicorn n'est pas utilisable après le fork
+        if self._pid != os.getpid():
+            with self._verrou:
+                if self._pid != os.getpid():
+                    # "spawn" : processus neufs, sans copie des threads ni des connexions du worker
+                    self._pool = ProcessPoolExecutor(self.processus, mp_context=multiprocessing.get_context("spawn"))
+                    self._pid = os.getpid()
+                    atexit.register(self._pool.shutdown, wait=False, cancel_futures=True)
+        return self._pool
+
+    def _compter_rejet(self, operation, raison):
+        if self.metriques is not None:
+            self.metriques.incrementer("hachage_rejets_total", {"operation": operation, "raison": raison})
@@ -0,0 +1,174 @@
+"""Import en masse des fournisseurs et de leurs bénéficiaires (JSON ou CSV).
+
+Utilisé par la route ``/fourn/import`` et par la commande
+``flask import-fournisseurs``. Un fournisseur dont le nom existe déjà est
+mis à jour (upsert) et ses bénéficiaires sont remplacés, comme avec
+``/update/fourn/<id>``.
+
+Format JSON : ``{"fournisseurs": [...]}`` ou directement la liste, chaque
+fournisseur au format de ``/add/fourn``.
+
+Format CSV : une ligne par bénéficiaire, les colonnes du fournisseur étant
+répétées ::
+
+    nom,taux_jour,quantite_USDT,beneficiaire,commission_USDT
+    Fournisseur A,600,1000,Jean,10.5
+    Fournisseur A,600,1000,Awa,5
+"""
+import csv
+import io
+import json
+
+from sqlalchemy import insert
+
+from app import benefices, db, dialecte
+from app.models import Beneficiaire, Fournisseur
+
+# Lignes par instruction INSERT multi-lignes (reste sous la limite de paramètres des SGBD)
+TAILLE_LOT = 1000
+
+
+class ImportInvalide(ValueError):
+    """Fichier ou données d'import invalides ; ``erreurs`` détaille chaque fournisseur refusé."""
+
+    def __init__(self, message, erreurs=None):
+        super().__init__(message)
+        self.erreurs = erreurs or []
+
+
+def lire(contenu, format_fichier):
+    """Liste de fournisseurs (format de ``/add/fourn``) depuis un texte JSON ou CSV."""
+    if format_fichier == "json":
+        try:
+            data = json.loads(contenu)
+        except ValueError:
+            raise ImportInvalide("JSON invalide")
+        return data.get("fournisseurs") if isinstance(data, dict) else data
+    if format_fichier == "csv":
+        return _lire_csv(contenu)
+    raise ImportInvalide("Format inconnu (json ou csv)")
+
+
+def importer(fournisseurs_data):
+    """Valide puis insère ou met à jour les fournisseurs, sans commit.
+
+    Lève ``ImportInvalide`` si une entrée est invalide (rien n'est écrit).
+    Renvoie ``{"crees": n, "mis_a_jour": n, "beneficiaires": n}``.
+    """
+    if not isinstance(fournisseurs_data, list) or not fournisseurs_data:
+        raise ImportInvalide("Aucun fournisseur fourni")
+
+    # Validation complète avant toute écriture ; un nom en double : la dernière entrée l'emporte
+    erreurs = []
+    fournisseurs = {}
+    for index, data in enumerate(fournisseurs_data):
+        try:
+            fournisseur = _valider(data)
+        except ValueError as e:
+            erreurs.append({"index": index, "message": str(e)})
+            continue
+        fournisseurs.pop(fournisseur["nom"], None)
+        fournisseurs[fournisseur["nom"]] = fournisseur
+
+    if erreurs:
+        raise ImportInvalide("Import invalide, aucun fournisseur ajouté", erreurs)
+
+    noms = list(fournisseurs)
+    existants = {
+        nom for lot in _lots(noms)
+        for (nom,) in db.session.query(Fournisseur.nom).filter(Fournisseur.nom.in_(lot))
+    }
+
+    # INSERT ... ON CONFLICT (nom) DO UPDATE ... RETURNING id, nom
+    ids = {}
+    for lot in _lots(noms):
+        stmt = dialecte.insert(Fournisseur).values([
+            {k: fournisseurs[nom][k] for k in ("nom", "taux_jour", "quantite_USDT")} for nom in lot
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Fournisseur.nom],
+            set_={"taux_jour": stmt.excluded.taux_jour, "quantite_USDT": stmt.excluded.quantite_USDT},
+        ).returning(Fournisseur.id, Fournisseur.nom)
+        ids.update({nom: fournisseur_id for fournisseur_id, nom in db.session.execute(stmt)})
+
+    # Les bénéficiaires des fournisseurs mis à jour sont remplacés
+    ids_existants = [ids[nom] for nom in existants]
+    for lot in _lots(ids_existants):
+        Beneficiaire.query.filter(Beneficiaire.fournisseur_id.in_(lot)).delete(synchronize_session=False)
+
+    lignes = [
+        {"nom": b["nom"], "commission_USDT": b["commission_USDT"], "fournisseur_id": ids[nom]}
+        for nom, fournisseur in fournisseurs.items()
+        for b in fournisseur["beneficiaires"]
+    ]
+    for lot in _lots(lignes):
+        db.session.execute(insert(Beneficiaire).values(lot))
+
+    # Taux, quantités et bénéficiaires modifiés : le cumul de ces fournisseurs est recalculé
+    db.session.expire_all()
+    benefices.recalculer_fournisseurs(ids_existants)
+
+    return {"crees": len(noms) - len(existants), "mis_a_jour": len(existants), "beneficiaires": len(lignes)}
+
+
+def _valider(data):
+    """Mêmes règles que ``/add/fourn`` ; lève ValueError avec le motif du refus."""
+    if not isinstance(data, dict) or not all(k in data for k in ["nom", "taux_jour", "quantite_USDT", "beneficiaires"]):
+        raise ValueError("Données incomplètes")
+    if not isinstance(data["nom"], str) or not data["nom"].strip():
+        raise ValueError("Nom du fournisseur invalide")
+
+    try:
+        taux_jour = float(data["taux_jour"])
+        quantite_USDT = float(data["quantite_USDT"])
+    except (TypeError, ValueError):
+        raise ValueError("Taux du jour et quantité doivent être des nombres valides")
+    if taux_jour <= 0 or quantite_USDT <= 0:
+        raise ValueError("Les valeurs du taux et de la quantité doivent être positives")
+
+    beneficiaires = data["beneficiaires"]
+    if not isinstance(beneficiaires, list) or len(beneficiaires) == 0:
+        raise ValueError("Au moins un bénéficiaire est requis")
+
+    valides = []
+    for benef in beneficiaires:
+        if not isinstance(benef, dict) or not all(k in benef for k in ["nom", "commission_USDT"]):
+            raise ValueError("Données du bénéficiaire incomplètes")
+        if not isinstance(benef["nom"], str) or not benef["nom"].strip():
+            raise ValueError("Nom du bénéficiaire invalide")
+        try:
+            commission_USDT = float(benef["commission_USDT"])
+        except (TypeError, ValueError):
+            raise ValueError("Commission invalide")
+        if commission_USDT < 0:
+            raise ValueError("La commission doit être un nombre positif")
+        valides.append({"nom": benef["nom"].strip(), "commission_USDT": commission_USDT})
+
+    return {"nom": data["nom"].strip(), "taux_jour": taux_jour, "quantite_USDT": quantite_USDT,
+            "beneficiaires": valides}
+
+
+def _lire_csv(contenu):
+    fournisseurs = {}
+    try:
+        for ligne in csv.DictReader(io.StringIO(contenu)):
+            nom = (ligne.get("nom") or "").strip()
+            fournisseur = fournisseurs.setdefault(nom, {
+                "nom": nom,
+                "taux_jour": ligne.get("taux_jour"),
+                "quantite_USDT": ligne.get("quantite_USDT"),
+                "beneficiaires": [],
+            })
+            if ligne.get("beneficiaire"):
+                fournisseur["beneficiaires"].append({
+                    "nom": ligne["beneficiaire"],
+                    "commission_USDT": ligne.get("commission_USDT"),
+                })
+    except csv.Error:
+        raise ImportInvalide("CSV invalide")
+    return list(fournisseurs.values())
+
+
+def _lots(elements):
+    for debut in range(0, len(elements), TAILLE_LOT):
+        yield elements[debut:debut + TAILLE_LOT]
@@ -0,0 +1,69 @@
+"""Jetons d'accès JWT autoportés et révocation par version.
+
+Le jeton émis par ``/login`` porte l'identifiant de l'utilisateur (``sub``),
+son email et la version de ses jetons (``ver``, colonne
+``users.token_version``) : les routes authentifiées identifient l'appelant
+par ``get_jwt()`` sans lire la table ``users``.
+
+Changer de mot de passe incrémente ``token_version`` : tous les jetons émis
+avant sont refusés (401). La version courante de chaque utilisateur est lue
+dans le cache applicatif (tag ``jeton-<id>``, invalidé après le changement,
+dans tous les workers) : une vérification ne touche la base qu'après une
+invalidation ou l'expiration de l'entrée (``CACHE_TTL``).
+"""
+from datetime import timedelta
+
+from flask import jsonify
+from flask_jwt_extended import create_access_token
+
+DUREE_VALIDITE = timedelta(hours=1)
+
+# Version renvoyée pour un utilisateur supprimé : aucun jeton ne lui correspond
+INCONNU = -1
+
+
+def init_app(app, jwt, cache):
+    from app import db
+    from app.models import User
+
+    def version_courante(user_id):
+        def construire():
+            version = db.session.execute(
+                db.select(User.token_version).where(User.id == user_id)
+            ).scalar_one_or_none()
+            return INCONNU if version is None else version
+
+        return cache.lire(_cle(user_id), construire, tags=(_tag(user_id),))
+
+    @jwt.token_in_blocklist_loader
+    def jeton_revoque(entete, contenu):
+        # Jeton émis avant l'ajout des versions, ou avant le dernier changement de mot de passe
+        if "ver" not in contenu:
+            return True
+        return contenu["ver"] != version_courante(int(contenu["sub"]))
+
+    @jwt.revoked_token_loader
+    def reponse_jeton_revoque(entete, contenu):
+        return jsonify({"message": "Jeton révoqué, veuillez vous reconnecter"}), 401
+
+
+def creer_jeton(user):
+    """Jeton d'accès portant l'identifiant, l'email et la version des jetons de ``user``."""
+    return create_access_token(
+        identity=str(user.id),
+        additional_claims={"email": user.email, "ver": user.token_version or 0},
+        expires_delta=DUREE_VALIDITE,
+    )
+
+
+def invalider(cache, user_id):
+    """Périme la version en cache de ``user_id``. À appeler après le commit."""
+    cache.invalider(_tag(user_id))
+
+
+def _cle(user_id):
+    return f"jeton-version:{user_id}"
+
+
+def _tag(user_id):
+    return f"jeton-{user_id}"
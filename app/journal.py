@@ -0,0 +1,173 @@
+"""Journalisation structurée et non bloquante de l'application.
+
+Les modules journalisent avec ``logging.getLogger(__name__)`` (loggers enfants
+du logger ``app`` de Flask). Les enregistrements sont mis dans une file par le
+thread de la requête ; un thread d'écriture (``QueueListener``, un par
+processus, redémarré après le fork des workers gunicorn) les formate et les
+écrit sur la sortie d'erreur : la requête n'attend jamais la sortie.
+
+Chaque ligne porte le niveau, le logger, la méthode et le chemin de la requête
+en cours et les champs passés dans ``extra``. ``JOURNAL_FORMAT`` vaut ``json``
+(une ligne JSON par enregistrement) ou ``texte``.
+
+Les corps de requête ne sont journalisés que par ``donnees_recues``, au niveau
+INFO, pour une fraction ``JOURNAL_ECHANTILLON_DONNEES`` des appels et avec les
+mots de passe masqués. Au-dessus d'INFO (``JOURNAL_NIVEAU=WARNING``), l'appel
+se réduit à un test de niveau.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import has_request_context, request
+
+JSON = "json"
+TEXTE = "texte"
+
+# Clés masquées dans les corps de requête journalisés
+_SECRETS = ("password", "mot_de_passe", "token")
+
+# Attributs standard d'un LogRecord : tout le reste vient de ``extra``
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "methode", "chemin", "trace"}
+
+_taux_donnees = 0.0
+
+
+class FileJournal(QueueHandler):
+    """``QueueHandler`` dont le thread d'écriture est démarré dans chaque processus."""
+
+    def __init__(self, sortie):
+        super().__init__(queue.SimpleQueue())
+        self.sortie = sortie
+        self._pid = None
+        self._ecouteur = None
+        self._verrou = threading.Lock()
+        self.addFilter(_contexte_requete)
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._demarrer()
+        self.queue.put_nowait(record)
+
+    def prepare(self, record):
+        # Dans le thread appelant : message et trace calculés tant que les
+        # arguments et l'exception existent ; la mise en forme (JSON,
+        # horodatage) est faite par le thread d'écriture
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.trace = logging.Formatter().formatException(record.exc_info) if record.exc_info else None
+        record.args = record.exc_info = record.exc_text = record.stack_info = None
+        return record
+
+    def _demarrer(self):
+        with self._verrou:
+            if self._pid == os.getpid():
+                return
+            # Après un fork, la file et le thread du parent ne sont plus utilisables
+            self.queue = queue.SimpleQueue()
+            self._ecouteur = QueueListener(self.queue, self.sortie, respect_handler_level=True)
+            self._ecouteur.start()
+            self._pid = os.getpid()
+        atexit.register(self.arreter)
+
+    def arreter(self):
+        """Vide la file et arrête le thread d'écriture de ce processus."""
+        with self._verrou:
+            if self._ecouteur is not None and self._pid == os.getpid():
+                self._ecouteur.stop()
+                self._ecouteur = None
+                self._pid = None
+
+
+class FormatJSON(logging.Formatter):
+    """Une ligne JSON par enregistrement."""
+
+    def format(self, record):
+        ligne = {
+            "horodatage": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "niveau": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "methode", None):
+            ligne["methode"] = record.methode
+            ligne["chemin"] = record.chemin
+        for cle, valeur in vars(record).items():
+            if cle not in _STANDARD:
+                ligne[cle] = valeur
+        if getattr(record, "trace", None):
+            ligne["trace"] = record.trace
+        return json.dumps(ligne, ensure_ascii=False, default=str)
+
+
+class FormatTexte(logging.Formatter):
+    """Format lisible pour le développement."""
+
+    def format(self, record):
+        requete = f" ({record.methode} {record.chemin})" if getattr(record, "methode", None) else ""
+        texte = f"[{self.formatTime(record)}] {record.levelname} {record.name}{requete}: {record.getMessage()}"
+        extra = {cle: valeur for cle, valeur in vars(record).items() if cle not in _STANDARD}
+        if extra:
+            texte = f"{texte} {json.dumps(extra, ensure_ascii=False, default=str)}"
+        if getattr(record, "trace", None):
+            texte = f"{texte}\n{record.trace}"
+        return texte
+
+
+def _contexte_requete(record):
+    # Filtre exécuté dans le thread de la requête, avant la mise en file
+    if has_request_context():
+        record.methode = request.method
+        record.chemin = request.path
+    return True
+
+
+def init_app(app):
+    global _taux_donnees
+
+    app.config.setdefault("JOURNAL_NIVEAU", "INFO")
+    app.config.setdefault("JOURNAL_FORMAT", JSON)
+    app.config.setdefault("JOURNAL_ECHANTILLON_DONNEES", 0.0)
+    _taux_donnees = float(app.config["JOURNAL_ECHANTILLON_DONNEES"])
+
+    sortie = logging.StreamHandler(sys.stderr)
+    sortie.setFormatter(FormatTexte() if app.config["JOURNAL_FORMAT"] == TEXTE else FormatJSON())
+
+    # Logger "app" (app.logger) et ses enfants (app.routes, app.suivi_sql, ...)
+    logger = logging.getLogger(app.import_name)
+    for ancien in [h for h in logger.handlers if isinstance(h, FileJournal)]:
+        ancien.arreter()
+        logger.removeHandler(ancien)
+    logger.addHandler(FileJournal(sortie))
+    logger.setLevel(app.config["JOURNAL_NIVEAU"].upper())
+    logger.propagate = False
+
+    # SQLAlchemy journalise le pool sous app.pool.PoolMesure, enfant du logger
+    # "app" : il garde le niveau par défaut des loggers sqlalchemy
+    logging.getLogger(f"{app.import_name}.pool.PoolMesure").setLevel(logging.WARNING)
+
+
+def donnees_recues(logger, donnees):
+    """Journalise le corps d'une requête pour une fraction des appels (mots de passe masqués)."""
+    if not logger.isEnabledFor(logging.INFO) or _taux_donnees <= 0 or random.random() >= _taux_donnees:
+        return
+    logger.info("Données reçues", extra={"donnees": _masquer(donnees)})
+
+
+def _masquer(donnees):
+    if isinstance(donnees, dict):
+        return {
+            cle: "***" if any(secret in str(cle).lower() for secret in _SECRETS) else _masquer(valeur)
+            for cle, valeur in donnees.items()
+        }
+    if isinstance(donnees, list):
+        return [_masquer(valeur) for valeur in donnees]
+    return donnees
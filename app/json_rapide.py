@@ -0,0 +1,76 @@
+"""Sérialisation JSON des réponses avec orjson.
+
+``FournisseurJSONRapide`` remplace le fournisseur JSON par défaut de Flask
+(``app.json``) : ``jsonify`` et ``current_app.json.dumps`` passent par orjson,
+plusieurs fois plus rapide que le module ``json`` sur les grosses listes de
+``/cal/perid`` et ``/trans/alll``. La réponse est construite directement en
+octets, sans passer par une chaîne intermédiaire.
+
+Types encodés nativement :
+
+- ``Decimal`` (colonnes ``Numeric``) : nombre arrondi à ``JSON_DECIMALES``
+  décimales (3 par défaut, la précision des colonnes ; ``None`` : sans
+  arrondi), au lieu de la chaîne produite par le fournisseur de Flask ;
+- ``datetime`` / ``date`` : ISO 8601 (``2025-05-05T14:30:00``), comme les
+  ``.isoformat()`` des routes, au lieu du format HTTP de Flask ;
+- scalaires et tableaux NumPy (``app.calculs``).
+
+Comme le fournisseur de Flask, les clés sont triées (``sort_keys``) et la
+sortie est indentée en mode debug. orjson est une dépendance optionnelle :
+sans lui (ou avec ``JSON_RAPIDE=0``), le fournisseur de Flask est conservé.
+"""
+import logging
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class FournisseurJSONRapide(DefaultJSONProvider):
+    """Fournisseur JSON de Flask fondé sur orjson."""
+
+    decimales = 3
+
+    def dumps(self, obj, **kwargs):
+        return self._encoder(obj, indent=bool(kwargs.get("indent"))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._encoder(obj, indent) + b"\n", mimetype=self.mimetype)
+
+    def _encoder(self, obj, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self._defaut, option=options)
+
+    def _defaut(self, o):
+        if isinstance(o, Decimal):
+            return float(o if self.decimales is None else round(o, self.decimales))
+        # UUID, dataclasses, __html__ : même traitement que le fournisseur de Flask
+        return DefaultJSONProvider.default(o)
+
+
+def init_app(app):
+    app.config.setdefault("JSON_RAPIDE", True)
+    app.config.setdefault("JSON_DECIMALES", 3)
+    if not app.config["JSON_RAPIDE"]:
+        return
+    if orjson is None:
+        logger.warning("orjson n'est pas installé : sérialisation JSON par le module json (pip install orjson)")
+        return
+
+    app.json = FournisseurJSONRapide(app)
+    app.json.decimales = app.config["JSON_DECIMALES"]
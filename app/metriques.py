@@ -0,0 +1,251 @@
+"""Métriques des requêtes HTTP au format texte Prometheus (``/metrics``).
+
+Pour chaque route (règle d'URL) et méthode : nombre de requêtes par statut,
+histogrammes de durée, de taille de réponse, de temps passé en base et de
+nombre de requêtes SQL (relevés par ``app.suivi_sql``) ; durée et refus des
+hachages de mot de passe (``app.hachage``). L'enregistrement se fait en mémoire
+sous un verrou ; il ne coûte que quelques opérations de dictionnaire par requête.
+
+Avec plusieurs workers gunicorn, chaque worker écrit régulièrement ses
+compteurs dans ``METRIQUES_DIR`` (un fichier par processus, conservé après sa
+sortie) et ``/metrics`` additionne tous les fichiers : quel que soit le worker
+interrogé, Prometheus voit les totaux du serveur. Sans ``METRIQUES_DIR``, les
+compteurs sont ceux du seul processus courant. Quand un worker se termine, le
+maître gunicorn reporte ses compteurs dans un fichier cumulé et supprime le
+sien (``marquer_processus_mort``).
+
+La durée d'une réponse en streaming (export) s'arrête au retour de la vue.
+"""
+import atexit
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from flask import g, request
+
+COMPTEUR = "counter"
+HISTOGRAMME = "histogram"
+
+_SECONDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_OCTETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+_NOMBRES = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Compteurs cumulés des workers terminés (voir marquer_processus_mort)
+FICHIER_MORTS = "morts.json"
+
+# nom : (type, aide, seuils des histogrammes)
+DEFINITIONS = {
+    "http_requetes_total": (COMPTEUR, "Requêtes HTTP traitées", None),
+    "http_duree_requete_secondes": (HISTOGRAMME, "Durée de traitement des requêtes", _SECONDES),
+    "http_taille_reponse_octets": (HISTOGRAMME, "Taille des corps de réponse (hors streaming)", _OCTETS),
+    "db_duree_requete_secondes": (HISTOGRAMME, "Temps passé en base par requête HTTP", _SECONDES),
+    "db_requetes_sql": (HISTOGRAMME, "Nombre de requêtes SQL par requête HTTP", _NOMBRES),
+    "hachage_duree_secondes": (HISTOGRAMME, "Durée des hachages de mot de passe, attente comprise", _SECONDES),
+    "hachage_rejets_total": (COMPTEUR, "Hachages refusés (file pleine ou délai dépassé)", None),
+}
+
+
+class Metriques:
+    """Compteurs et histogrammes en mémoire, exposés au format Prometheus."""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._valeurs = {}
+        self.dossier = None
+        self.intervalle = 5.0
+        self._pid = None
+        self._fichier = None
+
+    def init_app(self, app):
+        self.dossier = app.config.get("METRIQUES_DIR")
+        self.intervalle = app.config.get("METRIQUES_INTERVALLE", self.intervalle)
+        if self.dossier:
+            os.makedirs(self.dossier, exist_ok=True)
+
+        app.before_request(self._debut_requete)
+        app.after_request(self._fin_requete)
+        app.teardown_request(self._echec_requete)
+
+    # -- Enregistrement ---------------------------------------------------
+
+    def incrementer(self, nom, etiquettes, valeur=1):
+        cle = (nom, tuple(sorted(etiquettes.items())))
+        with self._verrou:
+            self._valeurs[cle] = self._valeurs.get(cle, 0) + valeur
+
+    def observer(self, nom, etiquettes, valeur):
+        seuils = DEFINITIONS[nom][2]
+        cle = (nom, tuple(sorted(etiquettes.items())))
+        with self._verrou:
+            # Comptes par seuil (non cumulés), puis somme et total
+            serie = self._valeurs.get(cle)
+            if serie is None:
+                serie = self._valeurs[cle] = [0] * (len(seuils) + 1) + [0.0, 0]
+            for i, seuil in enumerate(seuils):
+                if valeur <= seuil:
+                    serie[i] += 1
+                    break
+            else:
+                serie[len(seuils)] += 1
+            serie[-2] += valeur
+            serie[-1] += 1
+
+    def _debut_requete(self):
+        self._demarrer_ecriture()
+        g.metriques_debut = time.perf_counter()
+
+    def _fin_requete(self, response):
+        self._enregistrer(response.status_code, response.content_length)
+        return response
+
+    def _echec_requete(self, erreur):
+        # Exception non interceptée : after_request n'a pas été appelé
+        if erreur is not None:
+            self._enregistrer(500, None)
+
+    def _enregistrer(self, statut, taille):
+        debut = g.pop("metriques_debut", None)
+        if debut is None:
+            return
+        duree = time.perf_counter() - debut
+        route = request.url_rule.rule if request.url_rule is not None else "<inconnue>"
+        etiquettes = {"route": route, "methode": request.method}
+
+        self.incrementer("http_requetes_total", {**etiquettes, "statut": str(statut)})
+        self.observer("http_duree_requete_secondes", etiquettes, duree)
+        if taille is not None:
+            self.observer("http_taille_reponse_octets", etiquettes, taille)
+        suivi = g.get("suivi_sql")
+        if suivi is not None:
+            self.observer("db_duree_requete_secondes", etiquettes, suivi.duree)
+            self.observer("db_requetes_sql", etiquettes, suivi.nombre)
+
+    # -- Partage entre workers --------------------------------------------
+
+    def _demarrer_ecriture(self):
+        # Le fil d'écriture est démarré dans chaque worker, après le fork
+        if not self.dossier or self._pid == os.getpid():
+            return
+        with self._verrou:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._fichier = os.path.join(self.dossier, f"{self._pid}-{uuid.uuid4().hex[:8]}.json")
+        threading.Thread(target=self._ecrire_en_boucle, name="metriques", daemon=True).start()
+        atexit.register(self.ecrire)
+
+    def _ecrire_en_boucle(self):
+        while True:
+            time.sleep(self.intervalle)
+            self.ecrire()
+
+    def ecrire(self):
+        """Écrit les valeurs de ce processus dans son fichier de ``METRIQUES_DIR``."""
+        if not self._fichier:
+            return
+        with self._verrou:
+            contenu = json.dumps([[nom, etiquettes, valeur] for (nom, etiquettes), valeur in self._valeurs.items()])
+        descripteur, temporaire = tempfile.mkstemp(dir=self.dossier)
+        with os.fdopen(descripteur, "w") as fichier:
+            fichier.write(contenu)
+        os.replace(temporaire, self._fichier)
+
+    def _cumul(self):
+        if not self._fichier:
+            with self._verrou:
+                return {cle: (list(v) if isinstance(v, list) else v) for cle, v in self._valeurs.items()}
+
+        self.ecrire()
+        cumul = {}
+        for nom_fichier in os.listdir(self.dossier):
+            if nom_fichier.endswith(".json"):
+                _fusionner(cumul, _lire(os.path.join(self.dossier, nom_fichier)))
+        return cumul
+
+    # -- Exposition ---------------------------------------------------------
+
+    def exposer(self):
+        """Toutes les métriques au format texte Prometheus 0.0.4."""
+        par_nom = defaultdict(list)
+        for (nom, etiquettes), valeur in sorted(self._cumul().items()):
+            par_nom[nom].append((etiquettes, valeur))
+
+        lignes = []
+        for nom, (type_, aide, seuils) in DEFINITIONS.items():
+            lignes.append(f"# HELP {nom} {aide}")
+            lignes.append(f"# TYPE {nom} {type_}")
+            for etiquettes, valeur in par_nom.get(nom, ()):
+                if type_ == COMPTEUR:
+                    lignes.append(f"{nom}{_etiquettes(etiquettes)} {_nombre(valeur)}")
+                    continue
+                cumul = 0
+                for seuil, compte in zip((*seuils, math.inf), valeur):
+                    cumul += compte
+                    le = "+Inf" if seuil == math.inf else _nombre(seuil)
+                    lignes.append(f"{nom}_bucket{_etiquettes((*etiquettes, ('le', le)))} {cumul}")
+                lignes.append(f"{nom}_sum{_etiquettes(etiquettes)} {_nombre(valeur[-2])}")
+                lignes.append(f"{nom}_count{_etiquettes(etiquettes)} {valeur[-1]}")
+        return "\n".join(lignes) + "\n"
+
+
+def marquer_processus_mort(dossier, pid):
+    """Reporte les compteurs du worker ``pid`` terminé dans ``FICHIER_MORTS`` et supprime son fichier.
+
+    Appelé par le maître gunicorn (``child_exit``) : sans cela, chaque worker
+    recyclé (``max_requests``) laisserait un fichier relu à chaque ``/metrics``.
+    """
+    fichiers = [os.path.join(dossier, n) for n in os.listdir(dossier) if n.startswith(f"{pid}-") and n.endswith(".json")]
+    if not fichiers:
+        return
+
+    chemin_morts = os.path.join(dossier, FICHIER_MORTS)
+    cumul = {}
+    for chemin in (chemin_morts, *fichiers):
+        _fusionner(cumul, _lire(chemin))
+    contenu = json.dumps([[nom, etiquettes, valeur] for (nom, etiquettes), valeur in cumul.items()])
+    descripteur, temporaire = tempfile.mkstemp(dir=dossier)
+    with os.fdopen(descripteur, "w") as fichier:
+        fichier.write(contenu)
+    # Cumul écrit avant la suppression : une lecture concurrente compte au pire
+    # le worker deux fois, jamais zéro
+    os.replace(temporaire, chemin_morts)
+    for chemin in fichiers:
+        os.remove(chemin)
+
+
+def _lire(chemin):
+    try:
+        with open(chemin) as fichier:
+            return json.load(fichier)
+    except (OSError, ValueError):
+        return []
+
+
+def _fusionner(cumul, lignes):
+    for nom, etiquettes, valeur in lignes:
+        cle = (nom, tuple(tuple(e) for e in etiquettes))
+        if isinstance(valeur, list):
+            serie = cumul.setdefault(cle, [0] * len(valeur))
+            for i, v in enumerate(valeur):
+                serie[i] += v
+        else:
+            cumul[cle] = cumul.get(cle, 0) + valeur
+
+
+def _etiquettes(etiquettes):
+    if not etiquettes:
+        return ""
+    return "{" + ",".join(f'{cle}="{_echapper(valeur)}"' for cle, valeur in etiquettes) + "}"
+
+
+def _echapper(valeur):
+    return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _nombre(valeur):
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
@@ -8,6 +8,8 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)  
     email = db.Column(db.String(120), unique=True, nullable=False) 
     password = db.Column(db.String(200), nullable=False)  
+    # Incrémentée à chaque changement de mot de passe : révoque les jetons émis avant (app/jetons.py)
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def __repr__(self):
         return f"<User {self.email}>"
@@ -15,6 +17,10 @@ class User(db.Model):
 # Table Transaction
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Ordre de pagination par curseur de /trans/alll et filtres par période (/cal/perid)
+        db.Index('ix_transactions_date_id', 'date_transaction', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     montant_FCFA = db.Column(db.Integer, nullable=False)
@@ -22,6 +28,10 @@ class Transaction(db.Model):
     montant_USDT = db.Column(db.Numeric(10, 3), nullable=False)  # Précision à 3 décimales
     date_transaction = db.Column(db.DateTime, default=db.func.current_timestamp())
 
+    # Fournisseurs liés via la table intermédiaire (lecture seule, chargés en lot)
+    fournisseurs = db.relationship('Fournisseur', secondary='transaction_fournisseur', lazy=True,
+                                   viewonly=True, order_by='Fournisseur.id')
+
     def __repr__(self):
         return f"<Transaction {self.id}: {self.montant_FCFA} FCFA - {self.montant_USDT} USDT>"
 
@@ -49,7 +59,7 @@ class Beneficiaire(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nom = db.Column(db.String(100), nullable=False)
     commission_USDT = db.Column(db.Numeric(10, 3), nullable=False)  # Précision à 3 décimales
-    fournisseur_id = db.Column(db.Integer, db.ForeignKey('fournisseurs.id'), nullable=False)
+    fournisseur_id = db.Column(db.Integer, db.ForeignKey('fournisseurs.id'), nullable=False, index=True)
 
     def __repr__(self):
         return f"<Beneficiaire {self.nom}: {self.commission_USDT} USDT>"
@@ -62,5 +72,27 @@ class TransactionFournisseur(db.Model):
     __tablename__ = 'transaction_fournisseur'
     
     id = db.Column(db.Integer, primary_key=True)
-    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=False)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=False, index=True)
+    fournisseur_id = db.Column(db.Integer, db.ForeignKey('fournisseurs.id'), nullable=False, index=True)
+
+
+# Table de cumul journalier des bénéfices (maintenue par app/benefices.py)
+# Une ligne par (jour, fournisseur, bénéficiaire). La ligne dont le nom de
+# bénéficiaire est vide porte le volume, le bénéfice du fournisseur et le
+# bénéfice restant ; les autres lignes portent la part de chaque bénéficiaire.
+class BeneficeJournalier(db.Model):
+    __tablename__ = 'benefices_journaliers'
+    __table_args__ = (
+        db.UniqueConstraint('jour', 'fournisseur_id', 'beneficiaire_nom', name='uq_benefices_journaliers_cle'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    jour = db.Column(db.Date, nullable=False)
     fournisseur_id = db.Column(db.Integer, db.ForeignKey('fournisseurs.id'), nullable=False)
+    beneficiaire_nom = db.Column(db.String(100), nullable=False, default='')
+    volume_USDT = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+    benefice_FCFA = db.Column(db.BigInteger, nullable=False, default=0)
+    part_FCFA = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<BeneficeJournalier {self.jour} {self.fournisseur_id} {self.beneficiaire_nom!r}: {self.part_FCFA} FCFA>"
@@ -0,0 +1,84 @@
+"""Pool de connexions PostgreSQL configurable et mesuré.
+
+Les options du moteur sont construites à partir des réglages ``DB_*`` de la
+configuration (alimentés par les variables d'environnement, voir ``config.py``).
+Le pool ``PoolMesure`` compte les emprunts de connexion, le temps passé à
+attendre une connexion libre et les expirations d'attente ; ``/db/pool``
+expose ces compteurs pour dimensionner les workers face à ``max_connections``.
+"""
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMesure(QueuePool):
+    """``QueuePool`` qui mesure les emprunts de connexion (compteurs par processus)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._verrou_mesures = threading.Lock()
+        self.emprunts = 0
+        self.expirations = 0
+        self.attente_totale = 0.0
+        self.attente_max = 0.0
+
+    def _do_get(self):
+        debut = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._verrou_mesures:
+                self.expirations += 1
+            raise
+        finally:
+            attente = time.perf_counter() - debut
+            with self._verrou_mesures:
+                self.emprunts += 1
+                self.attente_totale += attente
+                self.attente_max = max(self.attente_max, attente)
+
+    def mesures(self):
+        """État courant du pool et compteurs depuis sa création."""
+        with self._verrou_mesures:
+            return {
+                "taille": self.size(),
+                "empruntees": self.checkedout(),
+                "disponibles": self.checkedin(),
+                # Négatif tant que le pool n'a pas ouvert ``taille`` connexions
+                "debordement": self.overflow(),
+                "debordement_max": self._max_overflow,
+                "delai_attente_max_s": self._timeout,
+                "emprunts": self.emprunts,
+                "expirations": self.expirations,
+                "attente_totale_ms": round(self.attente_totale * 1000, 3),
+                "attente_moyenne_ms": round(self.attente_totale * 1000 / self.emprunts, 3) if self.emprunts else 0.0,
+                "attente_max_ms": round(self.attente_max * 1000, 3),
+            }
+
+
+def options_moteur(config):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` déduites des réglages ``DB_*``.
+
+    Les options de pool ne s'appliquent pas à SQLite en mémoire (une seule
+    connexion par thread) ; ``statement_timeout`` n'est transmis qu'à PostgreSQL.
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+
+    options = {
+        "poolclass": PoolMesure,
+        "pool_size": config.get("DB_POOL_SIZE", 5),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 10),
+        "pool_recycle": config.get("DB_POOL_RECYCLE", -1),
+        "pool_pre_ping": config.get("DB_POOL_PRE_PING", False),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+    }
+
+    statement_timeout = config.get("DB_STATEMENT_TIMEOUT_MS", 0)
+    if statement_timeout and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={int(statement_timeout)}"}
+    return options
@@ -1,18 +1,31 @@
-from flask import Blueprint, request, jsonify, session
-from app import db
-from app.models import TransactionFournisseur, User
+from flask import Blueprint, Response, current_app, request, jsonify, session, stream_with_context
+from app import cache_donnees, cache_jetons, db, hacheur, metriques, versions_tables
+from app.models import BeneficeJournalier, TransactionFournisseur, User
 from app.models import Transaction , Fournisseur , Beneficiaire
-from werkzeug.security import check_password_hash
-from werkzeug.security import generate_password_hash
-from sqlalchemy import desc
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from app import benefices, cache, calculs, export, importation, jetons, journal
+from app.hachage import HachageSature
+from sqlalchemy import desc, func, insert, literal, select, tuple_, union_all
+from sqlalchemy.orm import selectinload
+from flask_jwt_extended import get_jwt, jwt_required, get_jwt_identity
 from datetime import datetime, timedelta  
 from decimal import Decimal
+import base64
+import binascii
+import json
+import logging
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 
 
 main = Blueprint('main', __name__)
+logger = logging.getLogger(__name__)
+
+
+@main.errorhandler(HachageSature)
+def hachage_sature(e):
+    # Trop de hachages de mot de passe en attente dans ce worker : délestage
+    logger.warning("Hachage refusé : %s", e)
+    return jsonify({"message": "Serveur occupé, réessayez dans un instant"}), 503, {"Retry-After": "1"}
 
 
 ##########################################################################################
@@ -47,6 +60,8 @@ def save_user():
         description: Email ou mot de passe manquant
       409:
         description: Email déjà utilisé
+      503:
+        description: Trop de hachages de mot de passe en attente, réessayer après Retry-After
     """
     data = request.json
     email = data.get('email')
@@ -61,7 +76,7 @@ def save_user():
         return jsonify({"message": "Cet email est déjà utilisé !"}), 409
 
     # Hachage du mot de passe
-    hashed_password = generate_password_hash(password)
+    hashed_password = hacheur.hacher(password)
 
     # Création et sauvegarde du nouvel utilisateur
     new_user = User(email=email, password=hashed_password)
@@ -97,6 +112,8 @@ def login_user():
         description: Connexion réussie
       401:
         description: Email ou mot de passe incorrect
+      503:
+        description: Trop de hachages de mot de passe en attente, réessayer après Retry-After
     """
     ...
     data = request.json
@@ -107,8 +124,15 @@ def login_user():
     user = User.query.filter_by(email=email).first()
 
     # Si l'utilisateur n'existe pas ou le mot de passe est incorrect
-    if user and check_password_hash(user.password, password):
-        access_token = create_access_token(identity=user.id, expires_delta=timedelta(hours=1))
+    if user and hacheur.verifier(user.password, password):
+        # Hachage calculé avec une ancienne méthode ou un ancien coût : recalculé
+        if hacheur.a_rehacher(user.password):
+            try:
+                user.password = hacheur.hacher(password)
+                db.session.commit()
+            except HachageSature:
+                pass  # nouvel essai à la prochaine connexion
+        access_token = jetons.creer_jeton(user)
         return jsonify({"message": "Connexion réussie !", "token": access_token}), 200
     else:
         return jsonify({"message": "Email ou mot de passe incorrect !"}), 401
@@ -129,21 +153,17 @@ def get_user():
       - Bearer: []
     responses:
       200:
-        description: Données utilisateur
-      404:
-        description: Utilisateur non trouvé
+        description: Identifiant et email de l'utilisateur, lus dans le jeton
+      401:
+        description: Jeton absent, expiré ou révoqué
     """
     ...
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-
-    if user:
-        return jsonify({
-            "id": user.id,
-            "email": user.email,
-        }), 200
-    else:
-        return jsonify({"message": "Utilisateur non trouvé !"}), 404
+    # Identité lue dans le jeton (version vérifiée par app/jetons.py) : pas de requête SQL
+    claims = get_jwt()
+    return jsonify({
+        "id": int(claims["sub"]),
+        "email": claims["email"],
+    }), 200
 
 ###############################################
 #######  info user ##################
@@ -164,6 +184,7 @@ def get_current_user():
             "Rôle": getattr(user, 'role', "Non défini"),
         }), 200
     except Exception as e:
+        logger.exception("Erreur serveur")
         return jsonify({"error": str(e)}), 500
 
 ###############################################
@@ -200,7 +221,7 @@ def change_password():
               example: "nouveauMot456"
     responses:
       200:
-        description: Mot de passe changé avec succès
+        description: Mot de passe changé avec succès ; les anciens jetons sont révoqués, le nouveau est renvoyé dans token
       400:
         description: Erreur de validation (champs manquants ou mot de passe non correspondant)
       401:
@@ -209,14 +230,15 @@ def change_password():
         description: Utilisateur non trouvé
       500:
         description: Erreur serveur
+      503:
+        description: Trop de hachages de mot de passe en attente, réessayer après Retry-After
     """
 
     try:
         data = request.get_json()
-        print("📦 Données reçues :", data)
+        journal.donnees_recues(logger, data)
 
-        email = get_jwt_identity()
-        print("🔐 Identité du token :", email)
+        user_id = int(get_jwt_identity())
 
         old_password = data.get('old_password')
         new_password = data.get('new_password')
@@ -228,20 +250,25 @@ def change_password():
         if new_password != confirm_password:
             return jsonify({"message": "Les mots de passe ne correspondent pas !"}), 400
 
-        user = User.query.filter_by(email=email).first()
+        user = db.session.get(User, user_id)
         if not user:
             return jsonify({"message": "Utilisateur non trouvé !"}), 404
 
-        if not check_password_hash(user.password, old_password):
+        if not hacheur.verifier(user.password, old_password):
             return jsonify({"message": "Ancien mot de passe incorrect !"}), 401
 
-        user.password = generate_password_hash(new_password)
+        user.password = hacheur.hacher(new_password)
+        # Les jetons émis avant ce changement (y compris celui-ci) sont révoqués
+        user.token_version = (user.token_version or 0) + 1
         db.session.commit()
+        jetons.invalider(cache_jetons, user.id)
 
-        return jsonify({"message": "Mot de passe changé avec succès !"}), 200
+        return jsonify({"message": "Mot de passe changé avec succès !", "token": jetons.creer_jeton(user)}), 200
 
+    except HachageSature:
+        raise  # 503 (hachage_sature)
     except Exception as e:
-        print("❌ Erreur backend :", str(e))
+        logger.exception("Erreur lors du changement de mot de passe")
         return jsonify({"message": "Erreur serveur", "error": str(e)}), 500
 
 
@@ -351,6 +378,24 @@ def gettotalbenefice():
     ---
     tags:
       - Dashboard
+    parameters:
+      - name: date_debut
+        in: query
+        type: string
+        format: date
+        required: false
+        description: Date de début incluse (AAAA-MM-JJ)
+      - name: date_fin
+        in: query
+        type: string
+        format: date
+        required: false
+        description: Date de fin incluse (AAAA-MM-JJ)
+      - name: fournisseur_id
+        in: query
+        type: integer
+        required: false
+        description: Limiter le calcul à un fournisseur
     responses:
       200:
         description: Bénéfice total calculé avec succès
@@ -358,35 +403,315 @@ def gettotalbenefice():
           type: object
           properties:
             benefice_global_total:
-              type: number
-              format: float
-              example: 1234.56
-      404:
-        description: Aucune transaction trouvée
+              type: integer
+              example: 123456
+      400:
+        description: Paramètres invalides
       500:
         description: Erreur lors du calcul du bénéfice
     """
     ...
 
     try:
-        transactions = Transaction.query.all()
-        if not transactions:
-            return jsonify({"message": "Aucune transaction trouvée", "benefice_global_total": 0}), 404
+        try:
+            date_debut = request.args.get("date_debut")
+            date_fin = request.args.get("date_fin")
+            date_debut = datetime.strptime(date_debut, "%Y-%m-%d") if date_debut else None
+            date_fin = datetime.strptime(date_fin, "%Y-%m-%d") + timedelta(days=1) if date_fin else None
+        except ValueError:
+            return jsonify({"message": "Les dates doivent être au format AAAA-MM-JJ"}), 400
 
-        total_benefice = 0
-        for transaction in transactions:
-            fournisseurs = Fournisseur.query.filter_by(transaction_id=transaction.id).all()
-            for fournisseur in fournisseurs:
-                benefice_fournisseur = (transaction.taux_convenu - fournisseur.taux_jour) * fournisseur.quantite_USDT
-                total_benefice += benefice_fournisseur
+        fournisseur_id = request.args.get("fournisseur_id", type=int)
+
+        total_benefice = calculer_benefice_global(date_debut, date_fin, fournisseur_id)
 
         return jsonify({"benefice_global_total": total_benefice}), 200
 
     except Exception as e:
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
         return jsonify({"message": "Erreur lors de la récupération du bénéfice total", "error": str(e)}), 500
 
 
+def calculer_benefice_global(date_debut=None, date_fin=None, fournisseur_id=None):
+    """Somme des bénéfices fournisseurs calculée en base, sans charger de lignes.
+
+    Chaque terme est tronqué à l'entier comme dans ``/call/<id>``.
+    ``date_fin`` est exclusive.
+    """
+    return int(db.session.execute(_requete_benefice_global(date_debut, date_fin, fournisseur_id)).scalar())
+
+
+def _benefice_fournisseur():
+    """Expression SQL du bénéfice d'un couple (transaction, fournisseur), tronqué à l'entier."""
+    return func.trunc((Transaction.taux_convenu - Fournisseur.taux_jour) * Fournisseur.quantite_USDT)
+
+
+def _requete_benefice_global(date_debut=None, date_fin=None, fournisseur_id=None):
+    query = (
+        select(func.coalesce(func.sum(_benefice_fournisseur()), 0))
+        .select_from(Transaction)
+        .join(TransactionFournisseur, TransactionFournisseur.transaction_id == Transaction.id)
+        .join(Fournisseur, Fournisseur.id == TransactionFournisseur.fournisseur_id)
+    )
+    if date_debut:
+        query = query.where(Transaction.date_transaction >= date_debut)
+    if date_fin:
+        query = query.where(Transaction.date_transaction < date_fin)
+    if fournisseur_id is not None:
+        query = query.where(Fournisseur.id == fournisseur_id)
+    return query
+
+
+#######################################################
+@main.route('/dashboard/summary', methods=['GET'])
+def get_dashboard_summary():
+    """
+    Résumé du tableau de bord en un seul appel
+    ---
+    tags:
+      - Dashboard
+    description: >
+      Regroupe /total/fr, /total/tr, /total/bn, /total/been et /accc/last,
+      calculés par une seule requête SQL. La réponse porte un ETag et un
+      Cache-Control (DASHBOARD_CACHE_MAX_AGE secondes).
+    responses:
+      200:
+        description: Résumé du tableau de bord
+        schema:
+          type: object
+          properties:
+            total_fournisseurs:
+              type: integer
+              example: 42
+            total:
+              type: integer
+              example: 105
+            total_beneficiaires:
+              type: integer
+              example: 12
+            benefice_global_total:
+              type: integer
+              example: 123456
+            transactions:
+              type: array
+              description: Les 3 dernières transactions, comme /accc/last
+              items:
+                type: object
+                properties:
+                  date_transaction:
+                    type: string
+                    example: "2025-05-05"
+                  montant_FCFA:
+                    type: integer
+                    example: 150000
+                  fournisseur:
+                    type: string
+                    example: "Binance, Fournisseur A"
+                  benefice_total_FCFA:
+                    type: integer
+                    example: 3500
+      304:
+        description: Résumé inchangé (If-None-Match)
+      500:
+        description: Erreur serveur
+    """
+    ...
+
+    try:
+        # Compteurs et bénéfice global : une ligne de sous-requêtes scalaires
+        totaux = select(
+            select(func.count(Fournisseur.id)).scalar_subquery().label("total_fournisseurs"),
+            select(func.count(Transaction.id)).scalar_subquery().label("total"),
+            select(func.count(Beneficiaire.id)).scalar_subquery().label("total_beneficiaires"),
+            _requete_benefice_global().scalar_subquery().label("benefice_global_total"),
+        ).subquery()
+
+        # 3 dernières transactions avec leurs fournisseurs et leur bénéfice (comme /accc/last)
+        dernieres = (
+            select(Transaction.id, Transaction.date_transaction, Transaction.montant_FCFA)
+            .order_by(Transaction.date_transaction.desc())
+            .limit(3)
+            .subquery()
+        )
+        # Une ligne par (transaction, fournisseur) : les noms sont joints en Python,
+        # dans l'ordre des ID (pas d'agrégat ordonné portable entre SGBD)
+        recap = (
+            select(
+                dernieres.c.id,
+                dernieres.c.date_transaction,
+                dernieres.c.montant_FCFA,
+                Fournisseur.id.label("fournisseur_id"),
+                Fournisseur.nom.label("fournisseur"),
+                _benefice_fournisseur().label("benefice_FCFA"),
+            )
+            .select_from(dernieres)
+            .join(Transaction, Transaction.id == dernieres.c.id)
+            .join(TransactionFournisseur, TransactionFournisseur.transaction_id == dernieres.c.id)
+            .join(Fournisseur, Fournisseur.id == TransactionFournisseur.fournisseur_id)
+            .subquery()
+        )
+
+        # LEFT JOIN sur une condition toujours vraie : les totaux sont renvoyés
+        # même sans transaction, le tout en un seul aller-retour
+        lignes = db.session.execute(
+            select(totaux, recap)
+            .select_from(totaux.outerjoin(recap, literal(True)))
+            .order_by(recap.c.date_transaction.desc(), recap.c.id, recap.c.fournisseur_id)
+        ).all()
+
+        # Regroupement par transaction, dans l'ordre des lignes (date décroissante)
+        transactions = {}
+        for ligne in lignes:
+            if ligne.id is None:
+                continue
+            transaction = transactions.setdefault(ligne.id, {
+                "date_transaction": ligne.date_transaction.strftime("%Y-%m-%d"),
+                "montant_FCFA": ligne.montant_FCFA,
+                "fournisseurs": [],
+                "benefice_total_FCFA": 0,
+            })
+            transaction["fournisseurs"].append(ligne.fournisseur)
+            transaction["benefice_total_FCFA"] += int(ligne.benefice_FCFA)
+
+        premiere = lignes[0]
+        response = jsonify({
+            "total_fournisseurs": premiere.total_fournisseurs,
+            "total": premiere.total,
+            "total_beneficiaires": premiere.total_beneficiaires,
+            "benefice_global_total": int(premiere.benefice_global_total),
+            "transactions": [
+                {
+                    "date_transaction": t["date_transaction"],
+                    "montant_FCFA": t["montant_FCFA"],
+                    "fournisseur": ", ".join(t["fournisseurs"]),
+                    "benefice_total_FCFA": t["benefice_total_FCFA"]
+                }
+                for t in transactions.values()
+            ]
+        })
+
+        response.cache_control.private = True
+        response.cache_control.max_age = current_app.config.get("DASHBOARD_CACHE_MAX_AGE", 10)
+        response.add_etag()
+        return response.make_conditional(request)
+
+    except Exception as e:
+        logger.exception("Erreur serveur")
+        return jsonify({"message": "Erreur lors de la récupération du tableau de bord", "error": str(e)}), 500
+
+
+
+@main.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """
+    Compteurs du cache applicatif (worker courant)
+    ---
+    tags:
+      - Cache
+    responses:
+      200:
+        description: Succès et échecs de lecture depuis le démarrage du worker
+        schema:
+          type: object
+          properties:
+            backend:
+              type: string
+              example: "memoire"
+            succes:
+              type: integer
+              example: 1520
+            echecs:
+              type: integer
+              example: 12
+            taux_succes:
+              type: number
+              example: 0.9922
+            jetons:
+              type: object
+              description: Mêmes compteurs pour le cache des versions de jetons d'accès
+    """
+    ...
+
+    return jsonify({**cache_donnees.stats(), "jetons": cache_jetons.stats()}), 200
+
+
+@main.route('/db/pool', methods=['GET'])
+def get_pool_stats():
+    """
+    État du pool de connexions à la base (worker courant)
+    ---
+    tags:
+      - Supervision
+    description: >
+      Connexions empruntées, débordement et temps d'attente d'une connexion
+      libre depuis le démarrage du worker. Connexions maximales vers
+      PostgreSQL : nombre de workers x (taille + debordement_max).
+    responses:
+      200:
+        description: Mesures du pool
+        schema:
+          type: object
+          properties:
+            taille:
+              type: integer
+              example: 10
+            empruntees:
+              type: integer
+              example: 3
+            disponibles:
+              type: integer
+              example: 7
+            debordement:
+              type: integer
+              example: 0
+            debordement_max:
+              type: integer
+              example: 5
+            emprunts:
+              type: integer
+              example: 15230
+            expirations:
+              type: integer
+              example: 0
+            attente_moyenne_ms:
+              type: number
+              example: 0.042
+            attente_max_ms:
+              type: number
+              example: 12.5
+      501:
+        description: Pool non mesuré (SQLite en mémoire ou poolclass personnalisée)
+    """
+    ...
+
+    pool = db.engine.pool
+    if not hasattr(pool, "mesures"):
+        return jsonify({"message": "Pool de connexions non mesuré", "pool": pool.status()}), 501
+
+    return jsonify(pool.mesures()), 200
+
+
+@main.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Métriques au format texte Prometheus
+    ---
+    tags:
+      - Supervision
+    description: >
+      Par route et méthode : requêtes par statut, histogrammes de durée, de
+      taille de réponse, de temps passé en base et de nombre de requêtes SQL.
+      Avec METRIQUES_DIR (gunicorn), totaux de tous les workers.
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Métriques Prometheus (format texte 0.0.4)
+    """
+    ...
+
+    return Response(metriques.exposer(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 
 @main.route('/four/taux', methods=['GET'])
 def get_taux_transactions():
@@ -402,28 +727,35 @@ def get_taux_transactions():
         description: Erreur lors de la récupération
     """
     try:
-        # Récupération des fournisseurs avec leur taux
-        fournisseurs = Fournisseur.query.order_by(Fournisseur.id).all()
-
-        result = []
-        for fournisseur in fournisseurs:
-            result.append({
-                "id": fournisseur.id,
-                "fournisseur": fournisseur.nom,
-                "taux": float(fournisseur.taux_jour)
-            })
-
-        return jsonify({
-            "message": "Taux des transactions récupérés avec succès",
-            "transactions_taux": result
-        }), 200
+        # Servi depuis le cache tant qu'aucun fournisseur n'a changé de nom ou de taux
+        corps = cache_donnees.lire(cache.TAUX, _corps_taux_transactions)
+        return Response(corps, status=200, mimetype="application/json")
 
     except Exception as e:
+        logger.exception("Erreur serveur")
         return jsonify({
             "message": "Erreur lors de la récupération des taux des transactions",
             "error": str(e)
         }), 500
 
+
+def _corps_taux_transactions():
+    # Récupération des fournisseurs avec leur taux
+    fournisseurs = Fournisseur.query.order_by(Fournisseur.id).all()
+
+    result = []
+    for fournisseur in fournisseurs:
+        result.append({
+            "id": fournisseur.id,
+            "fournisseur": fournisseur.nom,
+            "taux": float(fournisseur.taux_jour)
+        })
+
+    return current_app.json.dumps({
+        "message": "Taux des transactions récupérés avec succès",
+        "transactions_taux": result
+    })
+
 ########################################################################################    
 ##########################################################################################
 #########################     TRANSACTION    #############################################
@@ -530,6 +862,7 @@ def adddfournisseur():
             db.session.add(new_benef)
 
         db.session.commit()  # Commit tout en une seule transaction
+        cache_donnees.invalider(cache.FOURNISSEURS, cache.TAUX)
 
         return jsonify({
             "message": "Fournisseur et bénéficiaires ajoutés avec succès",
@@ -547,10 +880,79 @@ def adddfournisseur():
 
     except Exception as e:
         db.session.rollback()  # Annule tout si une erreur survient
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
         return jsonify({"message": "Erreur lors de l'ajout", "error": str(e)}), 500
 
 
+@main.route('/fourn/import', methods=['POST'])
+def importer_fournisseurs():
+    """
+    Importer en masse des fournisseurs et leurs bénéficiaires (JSON ou CSV)
+    ---
+    tags:
+      - Fournisseurs
+    consumes:
+      - application/json
+      - multipart/form-data
+    parameters:
+      - in: formData
+        name: fichier
+        type: file
+        required: false
+        description: >
+          Fichier .json (liste au format de /add/fourn) ou .csv (colonnes
+          nom, taux_jour, quantite_USDT, beneficiaire, commission_USDT ; une
+          ligne par bénéficiaire). Sans fichier, le corps JSON
+          {"fournisseurs": [...]} est utilisé.
+    responses:
+      200:
+        description: Import réussi ; les fournisseurs existants (même nom) sont mis à jour
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            crees:
+              type: integer
+              example: 120
+            mis_a_jour:
+              type: integer
+              example: 3
+            beneficiaires:
+              type: integer
+              example: 250
+      400:
+        description: Import invalide ; "erreurs" liste les fournisseurs refusés avec leur index
+      500:
+        description: Erreur serveur
+    """
+    ...
+
+    try:
+        fichier = request.files.get('fichier')
+        if fichier:
+            format_fichier = fichier.filename.rsplit('.', 1)[-1].lower() if '.' in fichier.filename else ''
+            fournisseurs_data = importation.lire(fichier.read().decode('utf-8-sig'), format_fichier)
+        else:
+            data = request.get_json(silent=True)
+            fournisseurs_data = data.get('fournisseurs') if isinstance(data, dict) else data
+
+        resume = importation.importer(fournisseurs_data)
+        db.session.commit()
+        cache_donnees.invalider(cache.FOURNISSEURS, cache.TAUX)
+
+        return jsonify({"message": "Import des fournisseurs terminé", **resume}), 200
+
+    except importation.ImportInvalide as e:
+        db.session.rollback()
+        return jsonify({"message": str(e), "erreurs": e.erreurs}), 400
+
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Erreur serveur")
+        return jsonify({"message": "Erreur lors de l'import", "error": str(e)}), 500
+
+
 @main.route('/update/fourn/<int:id>', methods=['PUT'])
 def update_fournisseur(id):
     """
@@ -654,8 +1056,18 @@ def update_fournisseur(id):
                     fournisseur_id=fournisseur.id
                 )
                 db.session.add(new_benef)
+
+        # Le taux, la quantité et les bénéficiaires entrent dans le calcul des bénéfices
+        if any(champ in data for champ in ("taux_jour", "quantite_USDT", "beneficiaires")):
+            benefices.recalculer_fournisseur(fournisseur.id)
         
         db.session.commit()
+
+        # /four/taux n'expose que le nom et le taux du jour
+        if "nom" in data or "taux_jour" in data:
+            cache_donnees.invalider(cache.FOURNISSEURS, cache.TAUX)
+        else:
+            cache_donnees.invalider(cache.FOURNISSEURS)
         
         return jsonify({
             "message": "Fournisseur mis à jour avec succès",
@@ -673,7 +1085,7 @@ def update_fournisseur(id):
     
     except Exception as e:
         db.session.rollback()
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
         return jsonify({"message": "Erreur lors de la mise à jour", "error": str(e)}), 500
 
 
@@ -705,23 +1117,26 @@ def deletefournisseur(id):
         if not fournisseur:
             return jsonify({"message": "Fournisseur non trouvé"}), 404
 
-        # Supprimer les bénéficiaires liés à ce fournisseur
+        # Supprimer les bénéficiaires et le cumul liés à ce fournisseur
         Beneficiaire.query.filter_by(fournisseur_id=id).delete()
+        BeneficeJournalier.query.filter_by(fournisseur_id=id).delete()
 
         # Supprimer le fournisseur
         db.session.delete(fournisseur)
         db.session.commit()
+        cache_donnees.invalider(cache.FOURNISSEURS, cache.TAUX)
 
         return jsonify({"message": "Fournisseur supprimé avec succès"}), 200
 
     except Exception as e:
         db.session.rollback()
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
         return jsonify({"message": "Erreur lors de la suppression", "error": str(e)}), 500
 
 
 
 @main.route('/all/fourn', methods=['GET'])
+@versions_tables.conditionnel('fournisseurs', 'beneficiaires')
 def getallfournisseursssss():
     """
     Récupérer la liste de tous les fournisseurs avec leurs bénéficiaires
@@ -731,42 +1146,57 @@ def getallfournisseursssss():
     responses:
       200:
         description: Liste des fournisseurs
+      304:
+        description: Inchangé depuis l'ETag envoyé dans If-None-Match
       500:
         description: Erreur lors de la récupération
     """
     ...
 
     try:
-        # Récupération de tous les fournisseurs triés par leur ID
-        fournisseurs = Fournisseur.query.order_by(Fournisseur.id).all()
-
-        # Construction de la réponse
-        result = []
-        for fournisseur in fournisseurs:
-            result.append({
-                "id": fournisseur.id,
-                "nom": fournisseur.nom,
-                "taux_jour": float(fournisseur.taux_jour),
-                "quantite_USDT": float(fournisseur.quantite_USDT),
-                "beneficiaires": [
-                    {
-                        "id": benef.id,
-                        "nom": benef.nom,
-                        "commission_USDT": float(benef.commission_USDT)
-                    } for benef in fournisseur.beneficiaires
-                ]
-            })
-
-        return jsonify({
-            "message": "Liste des fournisseurs récupérée avec succès",
-            "fournisseurs": result
-        }), 200
+        # Servi depuis le cache tant qu'aucun fournisseur n'a été modifié
+        corps = cache_donnees.lire(cache.FOURNISSEURS, _corps_fournisseurs)
+        return Response(corps, status=200, mimetype="application/json")
 
     except Exception as e:
+        logger.exception("Erreur serveur")
         return jsonify({"message": "Erreur lors de la récupération des fournisseurs", "error": str(e)}), 500
 
 
+def _corps_fournisseurs():
+    # Récupération de tous les fournisseurs triés par leur ID, bénéficiaires en une requête
+    fournisseurs = (
+        Fournisseur.query
+        .options(selectinload(Fournisseur.beneficiaires))
+        .order_by(Fournisseur.id)
+        .all()
+    )
+
+    # Construction de la réponse
+    result = []
+    for fournisseur in fournisseurs:
+        result.append({
+            "id": fournisseur.id,
+            "nom": fournisseur.nom,
+            "taux_jour": float(fournisseur.taux_jour),
+            "quantite_USDT": float(fournisseur.quantite_USDT),
+            "beneficiaires": [
+                {
+                    "id": benef.id,
+                    "nom": benef.nom,
+                    "commission_USDT": float(benef.commission_USDT)
+                } for benef in fournisseur.beneficiaires
+            ]
+        })
+
+    return current_app.json.dumps({
+        "message": "Liste des fournisseurs récupérée avec succès",
+        "fournisseurs": result
+    })
+
+
 @main.route('/alll/ben', methods=['GET'])
+@versions_tables.conditionnel('beneficiaires')
 def getall_beneficiaires():
     """
     Récupérer tous les bénéficiaires
@@ -776,6 +1206,8 @@ def getall_beneficiaires():
     responses:
       200:
         description: Liste des bénéficiaires
+      304:
+        description: Inchangé depuis l'ETag envoyé dans If-None-Match
       500:
         description: Erreur lors de la récupération
     """
@@ -800,6 +1232,7 @@ def getall_beneficiaires():
         }), 200
 
     except Exception as e:
+        logger.exception("Erreur serveur")
         return jsonify({"message": "Erreur lors de la récupération des bénéficiaires", "error": str(e)}), 500
 
 
@@ -893,7 +1326,7 @@ def ajoutetransaction():
     
     try:
         data = request.json
-        print("📩 Données reçues:", data)
+        journal.donnees_recues(logger, data)
 
         montant_fcfa = float(data.get('montantFCFA', 0))
         taux_conv = float(data.get('tauxConv', 0))
@@ -936,6 +1369,9 @@ def ajoutetransaction():
             )
             db.session.add(transaction_fournisseur_entry)
 
+        # Mise à jour du cumul journalier dans la même transaction
+        benefices.appliquer_transaction(transaction, fournisseurs)
+
         db.session.commit()
 
         return jsonify({
@@ -952,88 +1388,388 @@ def ajoutetransaction():
 
     except Exception as e:
         db.session.rollback()
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
+        return jsonify({'message': 'Erreur interne', 'error': str(e)}), 500
+
+####### AJOUT EN MASSE DE TRANSACTIONS ##################
+# Nombre maximal de transactions acceptées par appel à /trans/bulk
+TRANSACTIONS_BULK_MAX = 10000
+
+@main.route('/trans/bulk', methods=['POST'])
+def ajoutetransactions_bulk():
+    """
+    Ajouter un lot de transactions en une seule fois
+    ---
+    tags:
+      - Transactions
+    requestBody:
+      required: true
+      content:
+        application/json:
+          schema:
+            type: object
+            required:
+              - transactions
+            properties:
+              transactions:
+                type: array
+                description: Transactions au même format que /trans/addd
+                items:
+                  type: object
+                  properties:
+                    montantFCFA:
+                      type: number
+                      example: 150000
+                    tauxConv:
+                      type: number
+                      example: 950
+                    fournisseursIds:
+                      type: array
+                      items:
+                        type: integer
+                      example: [1, 3]
+                    fournisseurId:
+                      type: integer
+                      example: 2
+                    dateTransaction:
+                      type: string
+                      format: date-time
+                      description: Date de la transaction (date du serveur si absente)
+                      example: "2025-05-05T12:30:00"
+    responses:
+      201:
+        description: Toutes les transactions ont été ajoutées
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                message:
+                  type: string
+                  example: 2 transactions ajoutées
+                ids:
+                  type: array
+                  items:
+                    type: integer
+                  example: [41, 42]
+      400:
+        description: >
+          Lot invalide ; aucune transaction n'est ajoutée et "erreurs" liste
+          les lignes refusées avec leur index et le motif
+      500:
+        description: Erreur interne du serveur
+    """
+
+    try:
+        data = request.get_json(silent=True) or {}
+        lignes = data.get('transactions')
+
+        if not isinstance(lignes, list) or not lignes:
+            return jsonify({'message': 'Aucune transaction fournie'}), 400
+        if len(lignes) > TRANSACTIONS_BULK_MAX:
+            return jsonify({'message': f'Au plus {TRANSACTIONS_BULK_MAX} transactions par lot'}), 400
+
+        # Tous les fournisseurs référencés, en une seule requête
+        ids_demandes = set()
+        for ligne in lignes:
+            try:
+                ids_demandes.update(_ids_fournisseurs_bulk(ligne))
+            except ValueError:
+                continue  # Ligne refusée à la validation
+        fournisseurs = {f.id: f for f in Fournisseur.query.filter(Fournisseur.id.in_(ids_demandes))}
+
+        # Validation de toutes les lignes avant toute écriture
+        erreurs = []
+        valides = []
+        for index, ligne in enumerate(lignes):
+            try:
+                valides.append(_valider_transaction_bulk(ligne, fournisseurs))
+            except ValueError as e:
+                erreurs.append({'index': index, 'message': str(e)})
+
+        if erreurs:
+            return jsonify({'message': 'Lot invalide, aucune transaction ajoutée', 'erreurs': erreurs}), 400
+
+        # Date du serveur de base pour les lignes sans date, comme /trans/addd
+        maintenant = db.session.query(func.current_timestamp()).scalar()
+        for valide in valides:
+            if valide['date_transaction'] is None:
+                valide['date_transaction'] = maintenant
+
+        # INSERT multi-lignes avec RETURNING : un aller-retour par paquet de lignes
+        nouvelles = db.session.execute(
+            insert(Transaction).returning(
+                Transaction.id, Transaction.taux_convenu, Transaction.date_transaction, sort_by_parameter_order=True
+            ),
+            [{k: v for k, v in valide.items() if k != 'fournisseurs'} for valide in valides]
+        ).all()
+
+        db.session.execute(insert(TransactionFournisseur), [
+            {'transaction_id': nouvelle.id, 'fournisseur_id': fournisseur.id}
+            for nouvelle, valide in zip(nouvelles, valides)
+            for fournisseur in valide['fournisseurs']
+        ])
+
+        # Mise à jour du cumul journalier dans la même transaction
+        benefices.appliquer_transactions([
+            (nouvelle, valide['fournisseurs']) for nouvelle, valide in zip(nouvelles, valides)
+        ])
+
+        db.session.commit()
+
+        return jsonify({
+            'message': f'{len(nouvelles)} transactions ajoutées',
+            'ids': [nouvelle.id for nouvelle in nouvelles]
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Erreur serveur")
         return jsonify({'message': 'Erreur interne', 'error': str(e)}), 500
 
+
+def _valider_transaction_bulk(ligne, fournisseurs):
+    """Valide une ligne de /trans/bulk ; lève ValueError avec le motif du refus."""
+    if not isinstance(ligne, dict):
+        raise ValueError('Transaction invalide')
+
+    try:
+        montant_fcfa = float(ligne.get('montantFCFA', 0))
+        taux_conv = float(ligne.get('tauxConv', 0))
+    except (TypeError, ValueError):
+        raise ValueError('Données invalides')
+
+    if montant_fcfa <= 0 or taux_conv <= 0:
+        raise ValueError('Données invalides')
+
+    fournisseurs_ligne = [fournisseurs.get(i) for i in _ids_fournisseurs_bulk(ligne)]
+    if None in fournisseurs_ligne:
+        raise ValueError('Un ou plusieurs fournisseurs sont introuvables')
+
+    date_transaction = None
+    if ligne.get('dateTransaction'):
+        try:
+            date_transaction = datetime.fromisoformat(ligne['dateTransaction'])
+        except (TypeError, ValueError):
+            raise ValueError('dateTransaction doit être une date ISO 8601')
+
+    return {
+        'montant_FCFA': montant_fcfa,
+        'taux_convenu': taux_conv,
+        'montant_USDT': round(montant_fcfa / taux_conv, 3),
+        'date_transaction': date_transaction,
+        'fournisseurs': fournisseurs_ligne,
+    }
+
+
+def _ids_fournisseurs_bulk(ligne):
+    """IDs fournisseurs d'une ligne de /trans/bulk, sans doublon.
+
+    Comme /trans/addd, "fournisseurId" seul est accepté et les IDs envoyés en
+    texte ("3") sont convertis en entiers ; lève ValueError sinon.
+    """
+    if not isinstance(ligne, dict):
+        raise ValueError('Transaction invalide')
+
+    fournisseurs_ids = ligne.get('fournisseursIds', [])
+    if not fournisseurs_ids and 'fournisseurId' in ligne:
+        fournisseurs_ids = [ligne['fournisseurId']]
+    if not isinstance(fournisseurs_ids, list) or not fournisseurs_ids:
+        raise ValueError('Aucun fournisseur sélectionné')
+
+    ids = []
+    for fournisseur_id in fournisseurs_ids:
+        try:
+            if isinstance(fournisseur_id, bool) or not isinstance(fournisseur_id, (int, str)):
+                raise ValueError
+            ids.append(int(fournisseur_id))
+        except ValueError:
+            raise ValueError('Un ou plusieurs fournisseurs sont introuvables')
+    return list(dict.fromkeys(ids))
+
+
 ###############################################
 #######  Get all TRANSACTION ##################
+# Taille des pages de /trans/alll
+TRANSACTIONS_PAGE_DEFAUT = 100
+TRANSACTIONS_PAGE_MAX = 1000
+
 @main.route('/trans/alll', methods=['GET'])
+@versions_tables.conditionnel('transactions', 'transaction_fournisseur', 'fournisseurs')
 def getAlltransactions():
     """
-    Récupérer toutes les transactions
+    Récupérer les transactions page par page (pagination par curseur)
     ---
     tags:
       - Transactions
+    parameters:
+      - name: limit
+        in: query
+        required: false
+        schema:
+          type: integer
+          default: 100
+          maximum: 1000
+        description: Nombre maximal de transactions par page
+      - name: after
+        in: query
+        required: false
+        schema:
+          type: string
+        description: Curseur renvoyé dans next_cursor par la page précédente
     responses:
       200:
-        description: Liste de toutes les transactions
+        description: Page de transactions triées par date (sans date en dernier) puis ID
         content:
           application/json:
             schema:
-              type: array
-              items:
-                type: object
-                properties:
-                  id:
-                    type: integer
-                    example: 1
-                  montantFCFA:
-                    type: number
-                    example: 200000
-                  tauxConv:
-                    type: number
-                    example: 950
-                  montantUSDT:
-                    type: number
-                    example: 210.53
-                  dateTransaction:
-                    type: string
-                    format: date-time
-                    example: "2025-05-05T14:30:00"
-                  fournisseurs:
-                    type: array
-                    items:
-                      type: object
-                      properties:
-                        id:
-                          type: integer
-                          example: 2
-                        nom:
-                          type: string
-                          example: Binance Togo
+              type: object
+              properties:
+                transactions:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      id:
+                        type: integer
+                        example: 1
+                      montantFCFA:
+                        type: number
+                        example: 200000
+                      tauxConv:
+                        type: number
+                        example: 950
+                      montantUSDT:
+                        type: number
+                        example: 210.53
+                      dateTransaction:
+                        type: string
+                        format: date-time
+                        nullable: true
+                        example: "2025-05-05T14:30:00"
+                      fournisseurs:
+                        type: array
+                        items:
+                          type: object
+                          properties:
+                            id:
+                              type: integer
+                              example: 2
+                            nom:
+                              type: string
+                              example: Binance Togo
+                next_cursor:
+                  type: string
+                  nullable: true
+                  description: Curseur de la page suivante, null sur la dernière page
+      304:
+        description: Inchangé depuis l'ETag envoyé dans If-None-Match
+      400:
+        description: Paramètres de pagination invalides, ou curseur d'une transaction supprimée
       500:
         description: Erreur interne du serveur
     """
 
     try:
-        transactions = Transaction.query.all()
-        result = []
+        limit = request.args.get('limit', TRANSACTIONS_PAGE_DEFAUT, type=int)
+        if limit <= 0 or limit > TRANSACTIONS_PAGE_MAX:
+            return jsonify({'message': f'limit doit être compris entre 1 et {TRANSACTIONS_PAGE_MAX}'}), 400
 
-        for transaction in transactions:
-            fournisseurs = (
-                db.session.query(Fournisseur)
-                .join(TransactionFournisseur, Fournisseur.id == TransactionFournisseur.fournisseur_id)
-                .filter(TransactionFournisseur.transaction_id == transaction.id)
+        # Transactions datées puis sans date : chaque partie suit l'index (date_transaction, id)
+        datees = select(Transaction.id).where(Transaction.date_transaction.isnot(None))
+        sans_date = select(Transaction.id).where(Transaction.date_transaction.is_(None))
+
+        after = request.args.get('after')
+        if after:
+            try:
+                id_curseur = _decoder_curseur(after)
+            except ValueError:
+                return jsonify({'message': 'Curseur invalide'}), 400
+            curseur = db.session.execute(
+                select(Transaction.date_transaction).where(Transaction.id == id_curseur)
+            ).first()
+            if curseur is None:
+                return jsonify({'message': 'Curseur expiré : transaction supprimée, reprendre depuis la première page'}), 400
+            if curseur.date_transaction is None:
+                datees = None
+                sans_date = sans_date.where(Transaction.id > id_curseur)
+            else:
+                # Comparaison à la ligne stockée et non à une date Python : SQLite garde le
+                # texte écrit (avec ou sans microsecondes selon l'écrivain)
+                ligne_curseur = (
+                    select(Transaction.date_transaction, Transaction.id)
+                    .where(Transaction.id == id_curseur)
+                    .scalar_subquery()
+                )
+                datees = datees.where(tuple_(Transaction.date_transaction, Transaction.id) > ligne_curseur)
+
+        parties = [select(sans_date.order_by(Transaction.id).limit(limit + 1).subquery())]
+        if datees is not None:
+            parties.insert(0, select(
+                datees.order_by(Transaction.date_transaction, Transaction.id).limit(limit + 1).subquery()
+            ))
+        transactions = (
+            Transaction.query
+            .filter(Transaction.id.in_(union_all(*parties)))
+            .order_by(Transaction.date_transaction.asc().nulls_last(), Transaction.id.asc())
+            .limit(limit + 1)
+            .all()
+        )
+        page_suivante = len(transactions) > limit
+        transactions = transactions[:limit]
+
+        # Fournisseurs de toute la page en une seule requête
+        fournisseurs_par_transaction = {t.id: [] for t in transactions}
+        if transactions:
+            liens = (
+                db.session.query(TransactionFournisseur.transaction_id, Fournisseur.id, Fournisseur.nom)
+                .join(Fournisseur, Fournisseur.id == TransactionFournisseur.fournisseur_id)
+                .filter(TransactionFournisseur.transaction_id.in_(fournisseurs_par_transaction))
                 .all()
             )
-            
+            for transaction_id, fournisseur_id, nom in liens:
+                fournisseurs_par_transaction[transaction_id].append({'id': fournisseur_id, 'nom': nom})
+
+        result = []
+        for transaction in transactions:
             result.append({
                 'id': transaction.id,
                 'montantFCFA': transaction.montant_FCFA,
                 'tauxConv': transaction.taux_convenu,
                 'montantUSDT': transaction.montant_USDT,
-                'dateTransaction': transaction.date_transaction.isoformat(),
-                'fournisseurs': [{'id': f.id, 'nom': f.nom} for f in fournisseurs]
+                'dateTransaction': transaction.date_transaction.isoformat() if transaction.date_transaction else None,
+                'fournisseurs': fournisseurs_par_transaction[transaction.id]
             })
 
-        return jsonify(result), 200
+        next_cursor = _encoder_curseur(transactions[-1]) if page_suivante else None
+
+        return jsonify({'transactions': result, 'next_cursor': next_cursor}), 200
     
     except Exception as e:
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
         return jsonify({'message': 'Erreur interne', 'error': str(e)}), 500
 
 
+def _encoder_curseur(transaction):
+    """Curseur opaque (base64 url) : ID de la dernière transaction d'une page."""
+    brut = json.dumps([transaction.id])
+    return base64.urlsafe_b64encode(brut.encode()).decode()
+
+
+def _decoder_curseur(curseur):
+    """Inverse de _encoder_curseur ; lève ValueError si le curseur est invalide.
+
+    Les anciens curseurs [date, id] restent acceptés : seul l'ID est utilisé.
+    """
+    try:
+        valeurs = json.loads(base64.urlsafe_b64decode(curseur.encode()))
+        return int(valeurs[-1])
+    except (TypeError, ValueError, IndexError, KeyError, binascii.Error) as e:
+        raise ValueError("Curseur invalide") from e
+
+
 @main.route('/tran/<int:transaction_id>', methods=['GET'])
+@versions_tables.conditionnel('transactions', 'transaction_fournisseur', 'fournisseurs', 'beneficiaires')
 def getTransactionById(transaction_id):
     """
     Récupérer une transaction par son ID
@@ -1102,6 +1838,8 @@ def getTransactionById(transaction_id):
                             commissionUSDT:
                               type: number
                               example: 10.0
+      304:
+        description: Inchangé depuis l'ETag envoyé dans If-None-Match
       404:
         description: Transaction non trouvée
       500:
@@ -1114,10 +1852,12 @@ def getTransactionById(transaction_id):
         if not transaction:
             return jsonify({'message': 'Transaction non trouvée'}), 404
         
+        # Bénéficiaires de tous les fournisseurs chargés en une seule requête
         fournisseurs = (
             db.session.query(Fournisseur)
             .join(TransactionFournisseur, Fournisseur.id == TransactionFournisseur.fournisseur_id)
             .filter(TransactionFournisseur.transaction_id == transaction.id)
+            .options(selectinload(Fournisseur.beneficiaires))
             .all()
         )
         
@@ -1143,7 +1883,7 @@ def getTransactionById(transaction_id):
         return jsonify(result), 200
     
     except Exception as e:
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
         return jsonify({'message': 'Erreur interne', 'error': str(e)}), 500
 
 
@@ -1203,6 +1943,9 @@ def supprimer_transaction(transaction_id):
         if not transaction:
             return jsonify({'message': 'Transaction introuvable'}), 404
 
+        # Retirer la transaction du cumul journalier avant de supprimer les liens
+        benefices.appliquer_transaction(transaction, transaction.fournisseurs, signe=-1)
+
         # Supprimer les entrées associées dans la table intermédiaire
         TransactionFournisseur.query.filter_by(transaction_id=transaction_id).delete()
 
@@ -1214,7 +1957,7 @@ def supprimer_transaction(transaction_id):
 
     except Exception as e:
         db.session.rollback()
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
         return jsonify({'message': 'Erreur interne', 'error': str(e)}), 500
 
 
@@ -1305,62 +2048,45 @@ def calculertransaction(transaction_id):
         if not transaction:
             return jsonify({'message': 'Transaction non trouvée'}), 404
 
-        # Récupérer les fournisseurs liés à cette transaction
+        # Récupérer les fournisseurs liés à cette transaction (et leurs bénéficiaires)
         fournisseurs = (
             db.session.query(Fournisseur)
             .join(TransactionFournisseur, Fournisseur.id == TransactionFournisseur.fournisseur_id)
             .filter(TransactionFournisseur.transaction_id == transaction.id)
+            .options(selectinload(Fournisseur.beneficiaires))
             .all()
         )
 
         if not fournisseurs:
             return jsonify({'message': 'Aucun fournisseur trouvé pour cette transaction'}), 404
 
+        # Calcul exact en Decimal (audit), sans troncature
+        resultats = calculs.repartitions(
+            [(transaction.taux_convenu, f, f.beneficiaires) for f in fournisseurs], mode=calculs.DECIMAL
+        )
+
         total_benefice_fournisseurs = Decimal(0)
         fournisseurs_list = []
         benefices_par_fournisseur = {}
 
-        for fournisseur in fournisseurs:
-            # Calcul du bénéfice spécifique à chaque fournisseur
-            benefice_par_USDT = Decimal(transaction.taux_convenu) - Decimal(fournisseur.taux_jour)
-            benefice_total = benefice_par_USDT * Decimal(fournisseur.quantite_USDT)
-            total_benefice_fournisseurs += benefice_total
+        for fournisseur, resultat in zip(fournisseurs, resultats):
+            total_benefice_fournisseurs += resultat.benefice_total
 
             # Stocker les informations du fournisseur
             fournisseurs_list.append({
                 'fournisseur': fournisseur.nom,
-                'benefice_par_USDT': str(benefice_par_USDT),
-                'benefice_total_FCFA': str(benefice_total)
+                'benefice_par_USDT': str(resultat.benefice_par_USDT),
+                'benefice_total_FCFA': str(resultat.benefice_total)
             })
 
-            # Gestion des bénéficiaires
-            beneficiaires_dict = {}
-
-            for beneficiaire in fournisseur.beneficiaires:
-                nom_beneficiaire = beneficiaire.nom
-                commission_USDT = Decimal(beneficiaire.commission_USDT)
-                
-                # Calcul du bénéfice pour ce bénéficiaire
-                benefice_beneficiaire = (benefice_total * commission_USDT) / Decimal(100)
-
-                if nom_beneficiaire not in beneficiaires_dict:
-                    beneficiaires_dict[nom_beneficiaire] = {
-                        'commission_USDT': str(commission_USDT),
-                        'benefice_FCFA': str(benefice_beneficiaire)
-                    }
-                else:
-                    # Si le bénéficiaire est déjà là, on additionne les bénéfices
-                    beneficiaires_dict[nom_beneficiaire]['benefice_FCFA'] = str(
-                        Decimal(beneficiaires_dict[nom_beneficiaire]['benefice_FCFA']) + benefice_beneficiaire
-                    )
-
-            # Calcul du bénéfice restant pour ce fournisseur
-            somme_benefices_beneficiaires = sum(Decimal(data['benefice_FCFA']) for data in beneficiaires_dict.values())
-            benefice_restant = benefice_total - somme_benefices_beneficiaires
-
             benefices_par_fournisseur[fournisseur.nom] = {
-                'benefices_par_beneficiaire': beneficiaires_dict,
-                'benefice_restant': str(benefice_restant)
+                'benefices_par_beneficiaire': {
+                    nom: {
+                        'commission_USDT': str(d['commission_USDT']),
+                        'benefice_FCFA': str(d['benefice_FCFA'])
+                    } for nom, d in resultat.beneficiaires.items()
+                },
+                'benefice_restant': str(resultat.benefice_restant)
             }
 
         response = {
@@ -1376,7 +2102,7 @@ def calculertransaction(transaction_id):
         return jsonify(response), 200
 
     except Exception as e:
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
         return jsonify({'message': 'Erreur lors de la récupération', 'error': str(e)}), 500
 
 
@@ -1467,60 +2193,37 @@ def calculer_transaction(transaction_id):
         if not transaction:
             return jsonify({'message': 'Transaction non trouvée'}), 404
 
-        # Récupérer les fournisseurs liés à cette transaction
+        # Récupérer les fournisseurs liés à cette transaction (et leurs bénéficiaires)
         fournisseurs = (
             db.session.query(Fournisseur)
             .join(TransactionFournisseur, Fournisseur.id == TransactionFournisseur.fournisseur_id)
             .filter(TransactionFournisseur.transaction_id == transaction.id)
+            .options(selectinload(Fournisseur.beneficiaires))
             .all()
         )
 
         if not fournisseurs:
             return jsonify({'message': 'Aucun fournisseur trouvé pour cette transaction'}), 404
 
+        resultats = calculs.repartitions([(transaction.taux_convenu, f, f.beneficiaires) for f in fournisseurs])
+
         total_benefice_fournisseurs = 0  # Stockage en entier
         fournisseurs_list = []
         benefices_par_fournisseur = {}
 
-        for fournisseur in fournisseurs:
-            # Calcul du bénéfice spécifique à chaque fournisseur
-            benefice_par_USDT = int(Decimal(transaction.taux_convenu) - Decimal(fournisseur.taux_jour))
-            benefice_total = int(benefice_par_USDT * Decimal(fournisseur.quantite_USDT))
-            total_benefice_fournisseurs += benefice_total
+        for fournisseur, resultat in zip(fournisseurs, resultats):
+            total_benefice_fournisseurs += resultat.benefice_total
 
             # Stocker les informations du fournisseur
             fournisseurs_list.append({
                 'fournisseur': fournisseur.nom,
-                'benefice_par_USDT': benefice_par_USDT,  # Stocké en entier
-                'benefice_total_FCFA': benefice_total  # Stocké en entier
+                'benefice_par_USDT': resultat.benefice_par_USDT,  # Stocké en entier
+                'benefice_total_FCFA': resultat.benefice_total  # Stocké en entier
             })
 
-            # Gestion des bénéficiaires
-            beneficiaires_dict = {}
-
-            for beneficiaire in fournisseur.beneficiaires:
-                nom_beneficiaire = beneficiaire.nom
-                commission_USDT = int(beneficiaire.commission_USDT)
-                
-                # Calcul du bénéfice pour ce bénéficiaire
-                benefice_beneficiaire = int((benefice_total * commission_USDT) // 100)  # Division forcée en entier
-
-                if nom_beneficiaire not in beneficiaires_dict:
-                    beneficiaires_dict[nom_beneficiaire] = {
-                        'commission_USDT': commission_USDT,
-                        'benefice_FCFA': benefice_beneficiaire
-                    }
-                else:
-                    # Si le bénéficiaire est déjà là, on additionne les bénéfices
-                    beneficiaires_dict[nom_beneficiaire]['benefice_FCFA'] += benefice_beneficiaire
-
-            # Calcul du bénéfice restant pour ce fournisseur
-            somme_benefices_beneficiaires = sum(data['benefice_FCFA'] for data in beneficiaires_dict.values())
-            benefice_restant = int(benefice_total - somme_benefices_beneficiaires)
-
             benefices_par_fournisseur[fournisseur.nom] = {
-                'benefices_par_beneficiaire': beneficiaires_dict,
-                'benefice_restant': benefice_restant
+                'benefices_par_beneficiaire': resultat.beneficiaires,
+                'benefice_restant': resultat.benefice_restant
             }
 
         response = {
@@ -1536,7 +2239,7 @@ def calculer_transaction(transaction_id):
         return jsonify(response), 200
 
     except Exception as e:
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
         return jsonify({'message': 'Erreur lors de la récupération', 'error': str(e)}), 500
 
 
@@ -1547,167 +2250,151 @@ def calculer_transaction(transaction_id):
 #########################################################################################
 ############## HISTORIQUE ################## HISTORIQUE ##################
 ############## HISTORIQUE ################## HISTORIQUE ##################
+def _date_debut_periode(periode):
+    """Date de début correspondant à une période (jour, semaine, mois, annee)."""
+    # Date actuelle
+    today = datetime.today().date()
+
+    # Définir la date de début en fonction de la période
+    if periode == "jour":
+        return today
+    elif periode == "semaine":
+        return today - timedelta(weeks=1)  # 7 jours avant
+    elif periode == "mois":
+        return today.replace(day=1)  # Début du mois
+    elif periode == "annee":
+        return today.replace(month=1, day=1)  # Début de l'année
+    return None  # Pas de filtre spécifique
+
+
 @main.route("/cal/perid", methods=["GET"])
 def get_all_transactions_periode():
 
 
     try:
         periode = request.args.get("periode")  # Paramètre pour filtrer (jour, semaine, mois, annee)
-        
-        # Date actuelle
-        today = datetime.today().date()
-
-        # Définir la date de début en fonction de la période
-        if periode == "jour":
-            start_date = today
-        elif periode == "semaine":
-            start_date = today - timedelta(weeks=1)  # 7 jours avant
-        elif periode == "mois":
-            start_date = today.replace(day=1)  # Début du mois
-        elif periode == "annee":
-            start_date = today.replace(month=1, day=1)  # Début de l'année
-        else:
-            start_date = None  # Pas de filtre spécifique
+        start_date = _date_debut_periode(periode)
 
-        # Récupération des transactions filtrées
+        # Récupération des transactions filtrées, avec fournisseurs et bénéficiaires
+        # chargés en lot (3 requêtes au total, quel que soit le nombre de transactions)
+        query = Transaction.query.options(
+            selectinload(Transaction.fournisseurs).selectinload(Fournisseur.beneficiaires)
+        )
         if start_date:
-            transactions = Transaction.query.filter(Transaction.date_transaction >= start_date).order_by(Transaction.id.asc()).all()
-        else:
-            transactions = Transaction.query.order_by(Transaction.id.asc()).all()
+            query = query.filter(Transaction.date_transaction >= start_date)
+        transactions = query.order_by(Transaction.id.asc()).all()
 
         if not transactions:
             return jsonify({"message": "Aucune transaction trouvée"}), 404
 
-        transactions_list = []
-
-        for transaction in transactions:
-            # Récupérer les fournisseurs liés à cette transaction
-            fournisseurs = (
-                db.session.query(Fournisseur)
-                .join(TransactionFournisseur, Fournisseur.id == TransactionFournisseur.fournisseur_id)
-                .filter(TransactionFournisseur.transaction_id == transaction.id)
-                .all()
-            )
-
-            if not fournisseurs:
-                continue  # Si aucun fournisseur, on passe à la transaction suivante
-
-            total_benefice_fournisseurs = 0
-            fournisseurs_list = []
-            benefices_par_fournisseur = {}
-
-            for fournisseur in fournisseurs:
-                # Calcul du bénéfice spécifique à chaque fournisseur
-                benefice_par_USDT = int(Decimal(transaction.taux_convenu) - Decimal(fournisseur.taux_jour))
-                benefice_total = int(benefice_par_USDT * Decimal(fournisseur.quantite_USDT))
-                total_benefice_fournisseurs += benefice_total
-
-                # Stocker les informations du fournisseur
-                fournisseurs_list.append({
-                    'fournisseur': fournisseur.nom,
-                    'benefice_par_USDT': benefice_par_USDT,
-                    'benefice_total_FCFA': benefice_total
-                })
-
-                # Gestion des bénéficiaires
-                beneficiaires_dict = {}
-
-                for beneficiaire in fournisseur.beneficiaires:
-                    nom_beneficiaire = beneficiaire.nom
-                    commission_USDT = int(beneficiaire.commission_USDT)
-                    
-                    # Calcul du bénéfice pour ce bénéficiaire
-                    benefice_beneficiaire = int((benefice_total * commission_USDT) // 100)
-
-                    if nom_beneficiaire not in beneficiaires_dict:
-                        beneficiaires_dict[nom_beneficiaire] = {
-                            'commission_USDT': commission_USDT,
-                            'benefice_FCFA': benefice_beneficiaire
-                        }
-                    else:
-                        # Si le bénéficiaire est déjà là, on additionne les bénéfices
-                        beneficiaires_dict[nom_beneficiaire]['benefice_FCFA'] += benefice_beneficiaire
-
-                # Calcul du bénéfice restant pour ce fournisseur
-                somme_benefices_beneficiaires = sum(data['benefice_FCFA'] for data in beneficiaires_dict.values())
-                benefice_restant = int(benefice_total - somme_benefices_beneficiaires)
-
-                benefices_par_fournisseur[fournisseur.nom] = {
-                    'benefices_par_beneficiaire': beneficiaires_dict,
-                    'benefice_restant': benefice_restant
-                }
-
-            # Ajouter les informations de la transaction
-            transactions_list.append({
-                "transaction_id": transaction.id,
-                "date_transaction": transaction.date_transaction.strftime("%Y-%m-%d"),
-                "taux_convenu": transaction.taux_convenu,
-                "montant_FCFA": transaction.montant_FCFA,
-                "montant_USDT": int(transaction.montant_USDT),  
-                "benefices_fournisseurs": fournisseurs_list,
-                "details_par_fournisseur": benefices_par_fournisseur,
-                "resume_global": {
-                    "benefice_total_fournisseurs": total_benefice_fournisseurs
-                }
-            })
+        transactions_list = calculs.historiques([
+            (transaction, [(f, f.beneficiaires) for f in transaction.fournisseurs])
+            for transaction in transactions
+            if transaction.fournisseurs  # Si aucun fournisseur, on passe à la transaction suivante
+        ])
 
         return jsonify({"transactions": transactions_list}), 200
 
     except Exception as e:
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
         return jsonify({"message": "Erreur lors de la récupération", "error": str(e)}), 500
 
 
 
 
+@main.route("/export/transactions", methods=["GET"])
+def exporter_transactions():
+    """
+    Exporter l'historique des transactions en flux (CSV ou NDJSON)
+    ---
+    tags:
+      - Historique
+    parameters:
+      - name: format
+        in: query
+        required: false
+        schema:
+          type: string
+          enum: [csv, ndjson]
+          default: csv
+        description: Format de l'export
+      - name: periode
+        in: query
+        required: false
+        schema:
+          type: string
+          enum: [jour, semaine, mois, annee]
+        description: Limiter l'export à une période (tout l'historique sinon)
+    responses:
+      200:
+        description: >
+          Flux des transactions avec la répartition des bénéfices par fournisseur
+          et par bénéficiaire (une ligne par bénéficiaire en CSV, une ligne par
+          transaction au format de /cal/perid en NDJSON)
+      400:
+        description: Format inconnu
+    """
+
+    format_export = request.args.get("format", "csv")
+    date_debut = _date_debut_periode(request.args.get("periode"))
+
+    if format_export == "csv":
+        generateur, mimetype = export.generer_csv(date_debut), "text/csv"
+    elif format_export == "ndjson":
+        generateur, mimetype = export.generer_ndjson(date_debut), "application/x-ndjson"
+    else:
+        return jsonify({"message": "Format inconnu (csv ou ndjson)"}), 400
+
+    nom_fichier = f"transactions_{datetime.today():%Y%m%d}.{format_export}"
+    return Response(
+        stream_with_context(generateur),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={nom_fichier}"},
+    )
+
+
+
+
 @main.route("/accc/last", methods=["GET"])
 def get_all_transactions():
     try:
         # Récupérer les 3 dernières transactions triées par date décroissante
-        transactions = Transaction.query.order_by(Transaction.date_transaction.desc()).limit(3).all()
+        transactions = (
+            Transaction.query.options(selectinload(Transaction.fournisseurs))
+            .order_by(Transaction.date_transaction.desc())
+            .limit(3)
+            .all()
+        )
 
         if not transactions:
             return jsonify({"message": "Aucune transaction trouvée"}), 404
 
-        transactions_list = []
-
-        for transaction in transactions:
-            # Récupérer les fournisseurs liés à cette transaction
-            fournisseurs = (
-                db.session.query(Fournisseur)
-                .join(TransactionFournisseur, Fournisseur.id == TransactionFournisseur.fournisseur_id)
-                .filter(TransactionFournisseur.transaction_id == transaction.id)
-                .all()
-            )
-
-            if not fournisseurs:
-                continue  # Si aucun fournisseur, on passe à la transaction suivante
+        # Si aucun fournisseur, on passe à la transaction suivante
+        transactions = [t for t in transactions if t.fournisseurs]
 
-            total_benefice_fournisseurs = 0
-            fournisseurs_list = []
+        # Seuls les bénéfices fournisseurs sont affichés : pas de bénéficiaires
+        _, benefices_totaux = calculs.marges(
+            [t.taux_convenu for t in transactions for f in t.fournisseurs],
+            [f.taux_jour for t in transactions for f in t.fournisseurs],
+            [f.quantite_USDT for t in transactions for f in t.fournisseurs],
+        )
+        benefices_totaux = iter(benefices_totaux.tolist())
 
-            for fournisseur in fournisseurs:
-                # Calcul du bénéfice spécifique à chaque fournisseur
-                benefice_par_USDT = int(Decimal(transaction.taux_convenu) - Decimal(fournisseur.taux_jour))
-                benefice_total = int(benefice_par_USDT * Decimal(fournisseur.quantite_USDT))
-                total_benefice_fournisseurs += benefice_total
+        transactions_list = []
 
-                # Stocker les informations du fournisseur
-                fournisseurs_list.append({
-                    'fournisseur': fournisseur.nom,
-                    'benefice_total_FCFA': benefice_total
-                })
+        for transaction in transactions:
+            total_benefice_fournisseurs = sum(next(benefices_totaux) for _ in transaction.fournisseurs)
 
             # Ajouter les informations de la transaction au format demandé
             transactions_list.append({
                 "date_transaction": transaction.date_transaction.strftime("%Y-%m-%d"),
                 "montant_FCFA": transaction.montant_FCFA,
-                "fournisseur": ", ".join([fournisseur['fournisseur'] for fournisseur in fournisseurs_list]),
+                "fournisseur": ", ".join([fournisseur.nom for fournisseur in transaction.fournisseurs]),
                 "benefice_total_FCFA": total_benefice_fournisseurs
             })
 
         return jsonify({"transactions": transactions_list}), 200
 
     except Exception as e:
-        print("🔥 Erreur serveur:", str(e))
+        logger.exception("Erreur serveur")
         return jsonify({"message": "Erreur lors de la récupération", "error": str(e)}), 500
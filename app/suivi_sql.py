@@ -0,0 +1,145 @@
+"""Suivi des requêtes SQL de chaque requête HTTP : nombre, durée et N+1.
+
+Les événements du moteur comptent les requêtes SQL exécutées pendant une
+requête HTTP et le temps passé en base. Quand une même forme de requête
+(texte SQL, listes ``IN`` ramenées à un seul paramètre) revient plus de
+``SQL_SEUIL_N_PLUS_1`` fois, un avertissement signale un N+1 probable.
+
+Avec ``SQL_ENTETES_DEBUG`` (par défaut en mode debug), chaque réponse porte
+``X-SQL-Requetes`` et ``X-SQL-Duree-ms``.
+
+``assert_max_requetes`` vérifie le nombre de requêtes d'un bloc de code
+(tests, ``flask verifier-requetes``).
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Listes de paramètres (IN (?, ?, ?)) et littéraux numériques
+_LISTES = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)")
+_NOMBRES = re.compile(r"\b\d+\b")
+
+
+class SuiviSQL:
+    """Requêtes SQL d'un bloc de code : nombre, durée totale, formes répétées."""
+
+    __slots__ = ("nombre", "duree", "formes")
+
+    def __init__(self):
+        self.nombre = 0
+        self.duree = 0.0
+        self.formes = Counter()
+
+    def ajouter(self, instruction, duree):
+        self.nombre += 1
+        self.duree += duree
+        self.formes[forme(instruction)] += 1
+
+    def repetees(self, seuil):
+        """Formes exécutées plus de ``seuil`` fois, des plus fréquentes aux moins fréquentes."""
+        return [(f, n) for f, n in self.formes.most_common() if n > seuil]
+
+
+def forme(instruction):
+    """Forme normalisée d'une instruction SQL, indépendante du nombre de paramètres."""
+    return _NOMBRES.sub("N", _LISTES.sub("(?)", " ".join(instruction.split())))
+
+
+def init_app(app):
+    app.config.setdefault("SQL_SEUIL_N_PLUS_1", 10)
+    app.before_request(_debut_requete)
+    app.after_request(_fin_requete)
+
+    if not event.contains(Engine, "before_cursor_execute", _debut_sql):
+        event.listen(Engine, "before_cursor_execute", _debut_sql)
+        event.listen(Engine, "after_cursor_execute", _fin_sql)
+        event.listen(Engine, "handle_error", _erreur_sql)
+
+
+def suivi_courant():
+    """``SuiviSQL`` de la requête HTTP en cours (``None`` hors requête)."""
+    return g.get("suivi_sql") if has_request_context() else None
+
+
+# Suivis ouverts par assert_max_requetes / compter_requetes, hors requête HTTP.
+# Propres au thread (et au contexte) : sous un serveur multithread, une requête
+# ne compte pas les instructions des autres
+_suivis_actifs = ContextVar("suivis_sql_actifs", default=())
+
+
+@contextmanager
+def compter_requetes():
+    """Compte les requêtes SQL exécutées dans le bloc ``with``."""
+    suivi = SuiviSQL()
+    jeton = _suivis_actifs.set((*_suivis_actifs.get(), suivi))
+    try:
+        yield suivi
+    finally:
+        _suivis_actifs.reset(jeton)
+
+
+@contextmanager
+def assert_max_requetes(maximum):
+    """Échoue (``AssertionError``) si le bloc exécute plus de ``maximum`` requêtes SQL.
+
+    Exemple::
+
+        with assert_max_requetes(3):
+            client.get("/trans/alll")
+    """
+    with compter_requetes() as suivi:
+        yield suivi
+    if suivi.nombre > maximum:
+        detail = "\n".join(f"  {n} x {f[:200]}" for f, n in suivi.formes.most_common(5))
+        raise AssertionError(f"{suivi.nombre} requêtes SQL exécutées (maximum {maximum}) :\n{detail}")
+
+
+def _debut_requete():
+    g.suivi_sql = SuiviSQL()
+
+
+def _fin_requete(response):
+    suivi = g.get("suivi_sql")
+    if suivi is None:
+        return response
+
+    seuil = current_app.config["SQL_SEUIL_N_PLUS_1"]
+    for instruction, nombre in suivi.repetees(seuil):
+        current_app.logger.warning(
+            "N+1 probable sur %s %s : %d exécutions de %s", request.method, request.path, nombre, instruction[:300]
+        )
+
+    entetes = current_app.config.get("SQL_ENTETES_DEBUG")
+    if entetes or (entetes is None and current_app.debug):
+        response.headers["X-SQL-Requetes"] = str(suivi.nombre)
+        response.headers["X-SQL-Duree-ms"] = f"{suivi.duree * 1000:.2f}"
+    return response
+
+
+def _debut_sql(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("suivi_sql_debuts", []).append(time.perf_counter())
+
+
+def _fin_sql(conn, cursor, statement, parameters, context, executemany):
+    debuts = conn.info.get("suivi_sql_debuts")
+    if not debuts:
+        return
+    duree = time.perf_counter() - debuts.pop()
+    suivi = suivi_courant()
+    if suivi is not None:
+        suivi.ajouter(statement, duree)
+    for suivi in _suivis_actifs.get():
+        suivi.ajouter(statement, duree)
+
+
+def _erreur_sql(contexte):
+    # after_cursor_execute n'est pas appelé quand l'exécution échoue
+    debuts = contexte.connection.info.get("suivi_sql_debuts") if contexte.connection is not None else None
+    if debuts:
+        debuts.pop()
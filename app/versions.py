@@ -0,0 +1,104 @@
+"""Versions par table et ETag des routes de lecture (``/all/fourn``, ``/trans/alll``, ...).
+
+Chaque table a une version, tag ``table-<nom>`` du cache applicatif (voir
+``app.cache``) partagé entre workers, changée après chaque commit qui l'a
+modifiée. Les tables
+modifiées sont relevées par les événements de session : flush des objets
+ORM et requêtes INSERT / UPDATE / DELETE exécutées par la session (insertions
+en masse, ``query.delete()``, upserts).
+
+L'ETag d'une réponse est calculé à partir des versions des tables qu'elle
+lit et de l'URL demandée : une requête ``If-None-Match`` correspondante reçoit
+un 304 sans requête SQL ni sérialisation.
+"""
+import functools
+import hashlib
+
+from flask import Response, make_response, request
+from sqlalchemy import event
+
+# Clé de session.info où sont relevées les tables modifiées par la transaction en cours
+_TABLES_MODIFIEES = "tables_modifiees"
+
+
+class VersionsTables:
+    """Versions partagées des tables et ETag calculés à partir de ces versions."""
+
+    def __init__(self):
+        self.cache = None
+
+    def init_app(self, app, db, cache):
+        self.cache = cache
+
+        if not event.contains(db.session, "after_flush", _relever_flush):
+            event.listen(db.session, "after_flush", _relever_flush)
+            event.listen(db.session, "do_orm_execute", _relever_execution)
+            event.listen(db.session, "after_commit", self._apres_commit)
+            event.listen(db.session, "after_rollback", _oublier)
+
+    def version(self, table):
+        """Version partagée courante de ``table``."""
+        return self.cache.versions((f"table-{table}",))[0]
+
+    def incrementer(self, *tables):
+        """Change la version de ``tables`` (appelé automatiquement après commit)."""
+        self.cache.invalider(*(f"table-{table}" for table in tables))
+
+    def etag(self, tables):
+        """ETag de l'URL courante pour les versions actuelles de ``tables``."""
+        empreinte = hashlib.sha1(request.full_path.encode())
+        versions = self.cache.versions(f"table-{table}" for table in tables)
+        for table, version in zip(tables, versions):
+            empreinte.update(f"\0{table}={version}".encode())
+        return empreinte.hexdigest()
+
+    def conditionnel(self, *tables):
+        """Décorateur de route : ETag faible et 304 si ``If-None-Match`` correspond.
+
+        Seules les réponses 200 reçoivent l'ETag.
+        """
+        def decorateur(vue):
+            @functools.wraps(vue)
+            def enveloppe(*args, **kwargs):
+                # Versions lues avant la requête SQL : une écriture concurrente
+                # donne au pire un ETag plus ancien que les données renvoyées
+                etag = self.etag(tables)
+                if request.if_none_match.contains_weak(etag):
+                    reponse = Response(status=304)
+                    reponse.set_etag(etag, weak=True)
+                    return reponse
+
+                reponse = make_response(vue(*args, **kwargs))
+                if reponse.status_code == 200:
+                    reponse.set_etag(etag, weak=True)
+                return reponse
+            return enveloppe
+        return decorateur
+
+    def _apres_commit(self, session):
+        tables = session.info.pop(_TABLES_MODIFIEES, None)
+        if tables:
+            self.incrementer(*sorted(tables))
+
+
+def _tables(session):
+    return session.info.setdefault(_TABLES_MODIFIEES, set())
+
+
+def _relever_flush(session, contexte):
+    tables = _tables(session)
+    for objet in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(objet, "__tablename__", None)
+        if table:
+            tables.add(table)
+
+
+def _relever_execution(etat):
+    if etat.is_insert or etat.is_update or etat.is_delete:
+        table = getattr(etat.statement, "table", None)
+        if getattr(table, "name", None):
+            _tables(etat.session).add(table.name)
+
+
+def _oublier(session):
+    session.info.pop(_TABLES_MODIFIEES, None)
@@ -0,0 +1,118 @@
+"""Microbenchmark du calcul des bénéfices : boucles ligne à ligne vs app.calculs.
+
+Usage :
+    python benchmarks/bench_calculs.py [--transactions 100000] [--repetitions 3]
+
+Les données sont synthétiques (aucune base nécessaire). Le script vérifie
+d'abord que les deux implémentations donnent les mêmes résultats, puis
+affiche le débit de chacune en transactions par seconde.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import calculs  # noqa: E402
+
+
+def generer(nb_transactions, graine=42):
+    rnd = random.Random(graine)
+    fournisseurs = []
+    for i in range(50):
+        beneficiaires = [
+            SimpleNamespace(nom=f"B{rnd.randint(0, 5)}", commission_USDT=Decimal(rnd.randint(0, 30000)) / 1000)
+            for _ in range(rnd.randint(0, 4))
+        ]
+        fournisseurs.append((
+            SimpleNamespace(nom=f"F{i}", taux_jour=rnd.randint(560, 640),
+                            quantite_USDT=Decimal(rnd.randint(1, 10_000_000)) / 1000),
+            beneficiaires,
+        ))
+    return [
+        (rnd.randint(550, 650), rnd.sample(fournisseurs, rnd.randint(1, 3)))
+        for _ in range(nb_transactions)
+    ]
+
+
+def boucle_par_ligne(transactions):
+    """Copie des anciennes boucles de /call/<id> et /cal/perid."""
+    resultats = []
+    for taux_convenu, fournisseurs in transactions:
+        for fournisseur, beneficiaires in fournisseurs:
+            benefice_par_USDT = int(Decimal(taux_convenu) - Decimal(fournisseur.taux_jour))
+            benefice_total = int(benefice_par_USDT * Decimal(fournisseur.quantite_USDT))
+
+            beneficiaires_dict = {}
+            for beneficiaire in beneficiaires:
+                commission_USDT = int(beneficiaire.commission_USDT)
+                benefice_beneficiaire = int((benefice_total * commission_USDT) // 100)
+                if beneficiaire.nom not in beneficiaires_dict:
+                    beneficiaires_dict[beneficiaire.nom] = {
+                        'commission_USDT': commission_USDT,
+                        'benefice_FCFA': benefice_beneficiaire
+                    }
+                else:
+                    beneficiaires_dict[beneficiaire.nom]['benefice_FCFA'] += benefice_beneficiaire
+
+            somme = sum(d['benefice_FCFA'] for d in beneficiaires_dict.values())
+            resultats.append(calculs.Repartition(
+                benefice_par_USDT, benefice_total, beneficiaires_dict, int(benefice_total - somme)
+            ))
+    return resultats
+
+
+def par_lot(transactions, mode=calculs.ENTIER):
+    return calculs.repartitions([
+        (taux_convenu, fournisseur, beneficiaires)
+        for taux_convenu, fournisseurs in transactions
+        for fournisseur, beneficiaires in fournisseurs
+    ], mode=mode)
+
+
+def marges_seules(transactions):
+    """Passe NumPy des bénéfices fournisseurs, sans dictionnaires de sortie (/accc/last)."""
+    lignes = [(taux_convenu, fournisseur) for taux_convenu, fournisseurs in transactions for fournisseur, _ in fournisseurs]
+    return calculs.marges(
+        [taux_convenu for taux_convenu, _ in lignes],
+        [fournisseur.taux_jour for _, fournisseur in lignes],
+        [fournisseur.quantite_USDT for _, fournisseur in lignes],
+    )
+
+
+def mesurer(fonction, transactions, repetitions):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction(transactions)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args()
+
+    transactions = generer(args.transactions)
+    if boucle_par_ligne(transactions) != par_lot(transactions):
+        sys.exit("❌ Les deux implémentations divergent")
+
+    print(f"{args.transactions} transactions, meilleur temps sur {args.repetitions} essais")
+    for nom, fonction in [
+        ("boucle par ligne (Decimal/int)", boucle_par_ligne),
+        ("calculs.ENTIER (marges NumPy)", par_lot),
+        ("calculs.DECIMAL (audit)", lambda t: par_lot(t, calculs.DECIMAL)),
+        ("calculs.marges (totaux seuls)", marges_seules),
+    ]:
+        duree = mesurer(fonction, transactions, args.repetitions)
+        print(f"  {nom:32s} {duree * 1000:9.1f} ms  {args.transactions / duree:12,.0f} transactions/s")
+
+
+if __name__ == "__main__":
+    main()
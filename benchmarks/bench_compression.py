@@ -0,0 +1,94 @@
+"""Benchmark de la compression des grosses réponses JSON (gzip, brotli).
+
+Usage :
+    python benchmarks/bench_compression.py [--transactions 100000] [--debit 2]
+
+Sur le jeu de données de ``bench_routes.py`` (même base SQLite, même graine),
+le corps de chaque route est compressé à plusieurs niveaux : taille, ratio,
+meilleur temps de compression et durée de transfert estimée à ``--debit``
+Mbit/s (réseau mobile lent). La route complète est ensuite mesurée sans
+compression, compressée, puis avec le corps compressé servi depuis le cache
+(routes avec ETag).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_routes import preparer  # noqa: E402
+
+ROUTES = [
+    "/trans/alll?limit=1000",
+    "/all/fourn",
+    "/cal/perid?periode=annee",
+]
+
+
+def meilleur_temps(fonction, repetitions):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--debit", type=float, default=2.0, help="débit du réseau simulé, en Mbit/s")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--fournisseurs", type=int, default=200)
+    parser.add_argument("--regenerer", action="store_true", help="recréer la base SQLite existante")
+    args = parser.parse_args()
+    args.sqlite = True
+
+    app = preparer(args.transactions, args)
+
+    from app import compression
+
+    niveaux = [(compression.GZIP, n) for n in (1, 6, 9)]
+    if compression.BROTLI in compression.encodages_disponibles():
+        niveaux += [(compression.BROTLI, n) for n in (1, 5, 9)]
+    else:
+        print("brotli n'est pas installé : gzip seul (pip install brotli)\n")
+
+    def transfert(octets):
+        return octets * 8 / (args.debit * 1e6)
+
+    client = app.test_client()
+    print(f"{args.transactions} transactions, transfert estimé à {args.debit:g} Mbit/s\n")
+    for route in ROUTES:
+        corps = client.get(route, headers={"Accept-Encoding": "identity"}).get_data()
+        print(f"{route}  {len(corps) / 1e6:.2f} Mo, transfert {transfert(len(corps)) * 1000:.0f} ms")
+        print(f"  {'encodage':<12}{'taille':>12}{'ratio':>8}{'compression':>14}{'transfert':>12}")
+        for encodage, niveau in niveaux:
+            compresse = compression.compresser(corps, encodage, niveau)
+            duree = meilleur_temps(lambda: compression.compresser(corps, encodage, niveau), args.repetitions)
+            print(
+                f"  {encodage + ':' + str(niveau):<12}{len(compresse) / 1e3:>10.1f}ko{len(corps) / len(compresse):>7.1f}x"
+                f"{duree * 1000:>12.1f}ms{transfert(len(compresse)) * 1000:>10.0f}ms"
+            )
+
+        meilleur = compression.encodages_disponibles()[0]
+        mesures = []
+        for libelle, entetes in (("sans", {"Accept-Encoding": "identity"}), (meilleur, {"Accept-Encoding": meilleur})):
+            if compression._corps_compresses is not None:
+                compression._corps_compresses = compression.CorpsCompresses(compression._corps_compresses.octets_max)
+            # Premier appel : compression ; suivants : corps compressé en cache si la route a un ETag
+            debut = time.perf_counter()
+            reponse = client.get(route, headers=entetes)
+            premier = time.perf_counter() - debut
+            suivants = meilleur_temps(lambda: client.get(route, headers=entetes).get_data(), args.repetitions)
+            mesures.append(
+                f"{libelle} {premier * 1000:.0f} ms / {suivants * 1000:.0f} ms"
+                f" ({len(reponse.get_data()) / 1e3:.0f} ko)"
+            )
+        print(f"  route (premier appel / suivants) : {', '.join(mesures)}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark du démarrage à froid d'un worker : imports, create_app, premières requêtes.
+
+Usage :
+    DATABASE_URL=postgresql://... python benchmarks/bench_demarrage.py [--repetitions 5]
+
+Chaque mesure est faite dans un nouvel interpréteur Python (comme un worker
+qui démarre), en mode normal puis en démarrage rapide. Sans DATABASE_URL, une
+base SQLite temporaire est utilisée : create_all y est presque gratuit,
+alors qu'il coûte plusieurs allers-retours sur PostgreSQL.
+
+Pour mesurer la spec pré-générée, lancer d'abord ``flask --app run generer-spec``.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Exécuté dans un interpréteur neuf ; affiche les durées en JSON
+SONDE = """
+import json, sys, time
+debut = time.perf_counter()
+from app import create_app
+imports = time.perf_counter()
+app = create_app(demarrage_rapide={rapide})
+construit = time.perf_counter()
+client = app.test_client()
+client.get("/total/fr")
+premiere_requete = time.perf_counter()
+client.get("/apispec_1.json")
+spec = time.perf_counter()
+print(json.dumps({{
+    "imports": imports - debut,
+    "create_app": construit - imports,
+    "premiere_requete": premiere_requete - construit,
+    "pret": premiere_requete - debut,
+    "spec": spec - premiere_requete,
+}}))
+"""
+
+
+def mesurer(rapide, environnement):
+    sortie = subprocess.run(
+        [sys.executable, "-c", SONDE.format(rapide=rapide)],
+        cwd=RACINE, env=environnement, capture_output=True, text=True, check=True,
+    )
+    return json.loads(sortie.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+
+    environnement = dict(os.environ)
+    if "DATABASE_URL" not in environnement:
+        base = os.path.join(tempfile.mkdtemp(), "demarrage.db")
+        environnement["DATABASE_URL"] = f"sqlite:///{base}"
+        # Schéma créé une fois, comme le ferait "flask db upgrade"
+        mesurer(False, environnement)
+
+    print(f"Base : {environnement['DATABASE_URL'].split('@')[-1]}, médiane de {args.repetitions} démarrages\n")
+    print(f"{'mode':<16}{'imports':>10}{'create_app':>12}{'1re requête':>13}{'prêt':>9}{'spec':>9}")
+    for libelle, rapide in (("normal", False), ("rapide", True)):
+        mesures = [mesurer(rapide, environnement) for _ in range(args.repetitions)]
+        mediane = {cle: statistics.median(m[cle] for m in mesures) * 1000 for cle in mesures[0]}
+        print(
+            f"{libelle:<16}{mediane['imports']:>8.0f}ms{mediane['create_app']:>10.0f}ms"
+            f"{mediane['premiere_requete']:>11.0f}ms{mediane['pret']:>7.0f}ms{mediane['spec']:>7.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
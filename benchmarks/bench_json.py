@@ -0,0 +1,91 @@
+"""Benchmark de la sérialisation JSON des réponses : fournisseur Flask (json) vs orjson.
+
+Usage :
+    python benchmarks/bench_json.py [--transactions 100000] [--repetitions 5]
+
+Les objets réellement passés à ``jsonify`` par ``/trans/alll`` et
+``/cal/perid`` sont capturés sur le jeu de données de ``bench_routes.py``
+(même base SQLite, même graine), puis sérialisés par chacun des deux
+fournisseurs : meilleur temps de ``app.json.response``. La durée complète de
+la route est mesurée dans les deux configurations.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_routes import preparer  # noqa: E402
+
+ROUTES = [
+    "/trans/alll",
+    "/trans/alll?limit=1000",
+    "/cal/perid?periode=mois",
+    "/cal/perid?periode=annee",
+]
+
+
+def meilleur_temps(fonction, repetitions):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--fournisseurs", type=int, default=200)
+    parser.add_argument("--regenerer", action="store_true", help="recréer la base SQLite existante")
+    args = parser.parse_args()
+    args.sqlite = True
+
+    app = preparer(args.transactions, args)
+
+    from flask.json.provider import DefaultJSONProvider
+
+    from app.json_rapide import FournisseurJSONRapide
+
+    standard = DefaultJSONProvider(app)
+    rapide = FournisseurJSONRapide(app)
+    rapide.decimales = app.config["JSON_DECIMALES"]
+
+    # Fournisseur qui garde l'objet passé à jsonify
+    class Capture(DefaultJSONProvider):
+        objet = None
+
+        def response(self, *a, **kw):
+            Capture.objet = self._prepare_response_obj(a, kw)
+            return super().response(*a, **kw)
+
+    client = app.test_client()
+    print(f"{args.transactions} transactions, meilleur temps sur {args.repetitions} essais\n")
+    print(f"{'route':<28}{'taille':>10}{'json':>12}{'orjson':>12}{'gain':>7}{'route json':>13}{'route orjson':>14}")
+    for route in ROUTES:
+        app.json = Capture(app)
+        client.get(route)
+        objet = Capture.objet
+
+        with app.app_context():
+            taille = len(standard.response(objet).get_data())
+            duree_json = meilleur_temps(lambda: standard.response(objet), args.repetitions)
+            duree_orjson = meilleur_temps(lambda: rapide.response(objet), args.repetitions)
+
+        app.json = standard
+        route_json = meilleur_temps(lambda: client.get(route).get_data(), args.repetitions)
+        app.json = rapide
+        route_orjson = meilleur_temps(lambda: client.get(route).get_data(), args.repetitions)
+
+        print(
+            f"{route:<28}{taille / 1e6:>8.1f}Mo{duree_json * 1000:>10.1f}ms{duree_orjson * 1000:>10.1f}ms"
+            f"{duree_json / duree_orjson:>6.1f}x{route_json * 1000:>11.0f}ms{route_orjson * 1000:>12.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
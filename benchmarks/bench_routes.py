@@ -0,0 +1,335 @@
+"""Benchmark des routes de lecture sur des jeux de données générés (1k, 100k, 1M transactions).
+
+Usage :
+    python benchmarks/bench_routes.py [--tailles 1000,100000,1000000] [--repetitions 30]
+    python benchmarks/bench_routes.py --tailles 1000 --comparer benchmarks/resultats/routes-<date>.json
+
+Pour chaque taille, une base est remplie de transactions synthétiques
+(graine fixe : mêmes données d'une exécution à l'autre), avec fournisseurs,
+bénéficiaires et 0 à 3 fournisseurs par transaction, étalées sur deux ans.
+Chaque route est appelée en boucle par le client de test Flask, dans un
+interpréteur neuf par taille : latences p50 / p95 / p99, débit séquentiel
+(un seul client), taille de réponse et nombre de requêtes SQL.
+
+Sans DATABASE_URL, chaque jeu est une base SQLite conservée dans le dossier
+temporaire et réutilisée tant que taille et graine sont les mêmes
+(``--regenerer`` pour la recréer ; 1M de transactions prend quelques minutes).
+Avec DATABASE_URL (PostgreSQL, chiffres représentatifs de la production), les
+tables sont vidées puis remplies : ``--ecraser`` est obligatoire.
+
+Les résultats sont écrits en JSON dans ``benchmarks/resultats/``. Avec
+``--comparer``, chaque p50 est comparé à celui d'une exécution précédente :
+code de sortie 1 si une route ralentit de plus de ``--tolerance``.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTATS = os.path.join(RACINE, "benchmarks", "resultats")
+sys.path.insert(0, RACINE)
+
+TAILLE_LOT = 10_000
+JOURS = 730
+
+# (nom, chemin) ; {id} est remplacé par des transactions tirées au hasard
+ROUTES = [
+    ("trans_alll", "/trans/alll"),
+    ("trans_alll_1000", "/trans/alll?limit=1000"),
+    ("tran_id", "/tran/{id}"),
+    ("cal_id", "/cal/{id}"),
+    ("call_id", "/call/{id}"),
+    ("cal_perid_jour", "/cal/perid?periode=jour"),
+    ("cal_perid_semaine", "/cal/perid?periode=semaine"),
+    ("cal_perid_mois", "/cal/perid?periode=mois"),
+    ("cal_perid_annee", "/cal/perid?periode=annee"),
+    ("cal_perid_tout", "/cal/perid"),
+    ("accc_last", "/accc/last"),
+    ("total_fr", "/total/fr"),
+    ("total_tr", "/total/tr"),
+    ("total_trs", "/total/trs"),
+    ("total_bn", "/total/bn"),
+    ("total_been", "/total/been"),
+    ("dashboard_summary", "/dashboard/summary"),
+]
+
+# Routes qui renvoient toutes les transactions : ignorées au-delà de cette taille
+LOURDES = {"cal_perid_tout": 100_000}
+
+
+# -- Génération des données ------------------------------------------------
+
+def remplir(taille, graine, nb_fournisseurs):
+    """Remplit la base de l'application courante (tables vidées au préalable)."""
+    from sqlalchemy import delete, insert
+
+    from app import db
+    from app.benefices import reconstruire
+    from app.models import BeneficeJournalier, Beneficiaire, Fournisseur, Transaction, TransactionFournisseur
+
+    rnd = random.Random(graine)
+    for modele in (BeneficeJournalier, TransactionFournisseur, Beneficiaire, Transaction, Fournisseur):
+        db.session.execute(delete(modele))
+
+    db.session.execute(insert(Fournisseur), [
+        {
+            "id": i,
+            "nom": f"Fournisseur {i}",
+            "taux_jour": rnd.randint(560, 640),
+            "quantite_USDT": Decimal(rnd.randint(1_000, 5_000_000)) / 1000,
+        }
+        for i in range(1, nb_fournisseurs + 1)
+    ])
+    beneficiaires = []
+    for fournisseur_id in range(1, nb_fournisseurs + 1):
+        for nom in rnd.sample(range(30), rnd.choice((0, 1, 1, 2, 2, 3, 4))):
+            beneficiaires.append({
+                "nom": f"Bénéficiaire {nom}",
+                "commission_USDT": Decimal(rnd.randint(500, 30_000)) / 1000,
+                "fournisseur_id": fournisseur_id,
+            })
+    if beneficiaires:
+        db.session.execute(insert(Beneficiaire), beneficiaires)
+
+    # Transactions étalées sur deux ans jusqu'à maintenant, ids croissants avec la date
+    maintenant = datetime.now().replace(microsecond=0)
+    pas = timedelta(days=JOURS) / taille
+    for debut in range(0, taille, TAILLE_LOT):
+        transactions, liens = [], []
+        for i in range(debut + 1, min(debut + TAILLE_LOT, taille) + 1):
+            taux_convenu = rnd.randint(550, 650)
+            montant_USDT = Decimal(rnd.randint(1_000, 2_000_000)) / 1000
+            transactions.append({
+                "id": i,
+                "montant_FCFA": int(montant_USDT * taux_convenu),
+                "taux_convenu": taux_convenu,
+                "montant_USDT": montant_USDT,
+                "date_transaction": maintenant - (taille - i) * pas,
+            })
+            # 0 à 3 fournisseurs par transaction, le plus souvent un seul
+            nombre = rnd.choices((0, 1, 2, 3), weights=(5, 60, 25, 10))[0]
+            for fournisseur_id in rnd.sample(range(1, nb_fournisseurs + 1), nombre):
+                liens.append({"transaction_id": i, "fournisseur_id": fournisseur_id})
+        db.session.execute(insert(Transaction), transactions)
+        if liens:
+            db.session.execute(insert(TransactionFournisseur), liens)
+
+    reconstruire()
+    db.session.commit()
+
+
+def preparer(taille, args):
+    """Application prête à mesurer sur le jeu de données de ``taille`` transactions."""
+    if not os.environ.get("DATABASE_URL") or args.sqlite:
+        fichier = os.path.join(tempfile.gettempdir(), f"crypto_bench_{taille}_{args.graine}_{args.fournisseurs}.db")
+        existe = os.path.exists(fichier) and not args.regenerer
+        if not existe and os.path.exists(fichier):
+            os.remove(fichier)
+        os.environ["DATABASE_URL"] = f"sqlite:///{fichier}"
+    else:
+        existe = False
+
+    from app import create_app, db
+
+    # create_all (mode normal) crée le schéma d'une base neuve
+    app = create_app(demarrage_rapide=False)
+    if not existe:
+        debut = time.perf_counter()
+        with app.app_context():
+            remplir(taille, args.graine, args.fournisseurs)
+        print(f"  {taille} transactions générées en {time.perf_counter() - debut:.1f} s", file=sys.stderr)
+    with app.app_context():
+        db.engine.dispose()
+    return app
+
+
+# -- Mesures ---------------------------------------------------------------
+
+def centile(valeurs_triees, p):
+    """Centile ``p`` (0-100) par rang le plus proche."""
+    rang = max(0, min(len(valeurs_triees) - 1, round(p / 100 * len(valeurs_triees) + 0.5) - 1))
+    return valeurs_triees[rang]
+
+
+def mesurer_route(client, chemin, ids, repetitions, budget):
+    from app.suivi_sql import compter_requetes
+
+    durees, statuts, tailles, requetes = [], set(), [], []
+    # Échauffement : premier appel (imports, plans de requête, cache du disque) non compté
+    client.get(chemin.format(id=ids[0]))
+    debut_route = time.perf_counter()
+    for i in range(repetitions):
+        url = chemin.format(id=ids[i % len(ids)])
+        with compter_requetes() as suivi:
+            debut = time.perf_counter()
+            reponse = client.get(url)
+            corps = reponse.get_data()
+            durees.append(time.perf_counter() - debut)
+        statuts.add(reponse.status_code)
+        tailles.append(len(corps))
+        requetes.append(suivi.nombre)
+        if time.perf_counter() - debut_route > budget:
+            break
+
+    triees = sorted(durees)
+    return {
+        "chemin": chemin,
+        "mesures": len(durees),
+        "statuts": sorted(statuts),
+        "p50_ms": round(centile(triees, 50) * 1000, 3),
+        "p95_ms": round(centile(triees, 95) * 1000, 3),
+        "p99_ms": round(centile(triees, 99) * 1000, 3),
+        "moyenne_ms": round(sum(durees) / len(durees) * 1000, 3),
+        "min_ms": round(triees[0] * 1000, 3),
+        "max_ms": round(triees[-1] * 1000, 3),
+        "debit_req_s": round(len(durees) / sum(durees), 2),
+        "taille_octets": round(sum(tailles) / len(tailles)),
+        "requetes_sql": max(requetes),
+    }
+
+
+def mesurer_taille(taille, args):
+    """Mesures de toutes les routes pour une taille (exécuté dans un interpréteur neuf)."""
+    app = preparer(taille, args)
+
+    from sqlalchemy import select
+
+    from app import db
+    from app.models import TransactionFournisseur
+
+    with app.app_context():
+        avec_fournisseurs = db.session.scalars(select(TransactionFournisseur.transaction_id).distinct()).all()
+        moteur = db.engine.url.get_backend_name()
+    ids = random.Random(args.graine).sample(avec_fournisseurs, min(len(avec_fournisseurs), 200))
+
+    client = app.test_client()
+    routes = {}
+    for nom, chemin in ROUTES:
+        if taille > LOURDES.get(nom, taille):
+            routes[nom] = {"chemin": chemin, "ignoree": f"plus de {LOURDES[nom]} transactions"}
+            continue
+        routes[nom] = mesurer_route(client, chemin, ids, args.repetitions, args.budget)
+        print(f"  {taille:>9} {nom:<20} p50 {routes[nom]['p50_ms']:>10.2f} ms", file=sys.stderr)
+
+    return {"transactions": taille, "moteur": moteur, "routes": routes}
+
+
+# -- Résultats ---------------------------------------------------------------
+
+def contexte():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RACINE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu": os.cpu_count(),
+    }
+
+
+def afficher(resultats):
+    for jeu in resultats["jeux"]:
+        print(f"\n{jeu['transactions']} transactions ({jeu['moteur']})")
+        print(f"  {'route':<20}{'p50':>11}{'p95':>11}{'p99':>11}{'req/s':>10}{'octets':>12}{'SQL':>5}  statuts")
+        for nom, r in jeu["routes"].items():
+            if "ignoree" in r:
+                print(f"  {nom:<20}  ignorée ({r['ignoree']})")
+                continue
+            print(
+                f"  {nom:<20}{r['p50_ms']:>9.2f}ms{r['p95_ms']:>9.2f}ms{r['p99_ms']:>9.2f}ms"
+                f"{r['debit_req_s']:>10.1f}{r['taille_octets']:>12}{r['requetes_sql']:>5}  {r['statuts']}"
+            )
+
+
+def comparer(resultats, fichier, tolerance):
+    """Affiche l'évolution des p50 et renvoie le nombre de régressions."""
+    with open(fichier) as f:
+        reference = {jeu["transactions"]: jeu["routes"] for jeu in json.load(f)["jeux"]}
+
+    regressions = 0
+    print(f"\nComparaison avec {fichier} (tolérance {tolerance:.0%})")
+    for jeu in resultats["jeux"]:
+        anciennes = reference.get(jeu["transactions"])
+        if anciennes is None:
+            continue
+        for nom, r in jeu["routes"].items():
+            ancienne = anciennes.get(nom)
+            if "p50_ms" not in r or not ancienne or "p50_ms" not in ancienne:
+                continue
+            ratio = r["p50_ms"] / ancienne["p50_ms"] if ancienne["p50_ms"] else 1.0
+            marque = "✅"
+            if ratio > 1 + tolerance:
+                marque = "❌"
+                regressions += 1
+            print(
+                f"  {marque} {jeu['transactions']:>9} {nom:<20} "
+                f"{ancienne['p50_ms']:>9.2f} -> {r['p50_ms']:>9.2f} ms ({ratio - 1:+.0%})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tailles", default="1000,100000,1000000",
+                        help="nombres de transactions, séparés par des virgules")
+    parser.add_argument("--repetitions", type=int, default=30, help="appels mesurés par route")
+    parser.add_argument("--budget", type=float, default=20.0,
+                        help="durée maximale des mesures d'une route (s), au moins un appel")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--fournisseurs", type=int, default=200)
+    parser.add_argument("--regenerer", action="store_true", help="recréer les bases SQLite existantes")
+    parser.add_argument("--sqlite", action="store_true", help="ignorer DATABASE_URL et utiliser SQLite")
+    parser.add_argument("--ecraser", action="store_true", help="autoriser à vider la base de DATABASE_URL")
+    parser.add_argument("--sortie", help="fichier JSON des résultats (défaut : benchmarks/resultats/routes-<date>.json)")
+    parser.add_argument("--comparer", metavar="FICHIER", help="résultats précédents à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="ralentissement toléré du p50 (0.2 : +20 %%)")
+    parser.add_argument("--une-taille", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.une_taille is not None:
+        # Processus enfant : mesures d'une taille, JSON sur la dernière ligne
+        print(json.dumps(mesurer_taille(args.une_taille, args)))
+        return
+
+    if os.environ.get("DATABASE_URL") and not args.sqlite and not args.ecraser:
+        sys.exit("❌ DATABASE_URL est définie : ses tables seront vidées. Relancer avec --ecraser (ou --sqlite).")
+
+    resultats = {**contexte(), "parametres": {
+        "repetitions": args.repetitions, "budget_s": args.budget,
+        "graine": args.graine, "fournisseurs": args.fournisseurs,
+    }, "jeux": []}
+    for taille in (int(t) for t in args.tailles.split(",")):
+        print(f"Jeu de {taille} transactions...", file=sys.stderr)
+        sortie = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--une-taille", str(taille)],
+            cwd=RACINE, stdout=subprocess.PIPE, text=True, check=True,
+        )
+        resultats["jeux"].append(json.loads(sortie.stdout.strip().splitlines()[-1]))
+
+    fichier = args.sortie or os.path.join(RESULTATS, f"routes-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(fichier)), exist_ok=True)
+    with open(fichier, "w") as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+
+    afficher(resultats)
+    print(f"\nRésultats : {fichier}")
+
+    if args.comparer and comparer(resultats, args.comparer, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
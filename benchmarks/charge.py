@@ -0,0 +1,340 @@
+"""Test de charge local : trafic mixte lectures / écritures à concurrence croissante.
+
+Usage :
+    python benchmarks/charge.py [--concurrences 1,4,16,32] [--duree 15] [--profil mixte]
+    python benchmarks/charge.py --url http://127.0.0.1:8000 --profil ecriture
+
+Sans ``--url``, le script génère une base (``--transactions``, mêmes données que
+``bench_routes.py``), démarre gunicorn (``gunicorn.conf.py``, ``wsgi:app``) sur
+un port local puis l'arrête à la fin. Sans DATABASE_URL, la base est un fichier
+SQLite temporaire : les écritures y sont sérialisées par un verrou global, les
+chiffres de capacité se mesurent sur PostgreSQL (``DATABASE_URL=... --ecraser``,
+tables vidées puis remplies).
+
+Chaque palier de concurrence dure ``--duree`` secondes (après ``--echauffement``) :
+N clients enchaînent des requêtes en keep-alive, tirées au hasard selon les
+poids du profil. Par palier et par scénario : débit, latences p50 / p95 / p99
+et taux d'erreur (statut >= 400 ou erreur réseau). La capacité retenue est le
+débit du dernier palier dont le p95 des écritures reste sous ``--seuil-p95`` ms
+avec moins de 1 % d'erreurs.
+
+Le générateur tourne sur la même machine, avec des threads Python : au-delà de
+quelques milliers de requêtes par seconde, c'est lui qui sature.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_routes import RACINE, RESULTATS, centile, contexte  # noqa: E402
+
+# Scénarios d'écriture, dont le p95 décide de la capacité
+ECRITURES = {"trans_addd", "update_fourn"}
+
+PROFILS = {
+    "mixte": "trans_alll=25,tran_id=20,accc_last=10,total_been=10,all_fourn=5,trans_addd=20,update_fourn=10",
+    "ecriture": "trans_addd=70,update_fourn=30",
+    "lecture": "trans_alll=35,tran_id=30,accc_last=15,total_been=15,all_fourn=5",
+}
+
+# Seuil de taux d'erreur au-delà duquel un palier est considéré saturé
+ERREURS_MAX = 0.01
+
+
+class Etat:
+    """Identifiants connus du serveur, partagés par les clients."""
+
+    def __init__(self, fournisseurs, transactions):
+        self.fournisseurs = fournisseurs
+        self.transactions = transactions
+        self._verrou = threading.Lock()
+
+    def ajouter_transaction(self, transaction_id):
+        with self._verrou:
+            self.transactions.append(transaction_id)
+
+
+def requete(scenario, etat, rnd):
+    """``(méthode, chemin, corps)`` d'un appel du scénario."""
+    if scenario == "trans_alll":
+        return "GET", "/trans/alll", None
+    if scenario == "tran_id":
+        return "GET", f"/tran/{rnd.choice(etat.transactions)}", None
+    if scenario == "accc_last":
+        return "GET", "/accc/last", None
+    if scenario == "total_been":
+        return "GET", "/total/been", None
+    if scenario == "all_fourn":
+        return "GET", "/all/fourn", None
+    if scenario == "trans_addd":
+        taux_conv = rnd.randint(550, 650)
+        return "POST", "/trans/addd", {
+            "montantFCFA": rnd.randint(10_000, 2_000_000),
+            "tauxConv": taux_conv,
+            "fournisseursIds": rnd.sample(etat.fournisseurs, rnd.choices((1, 2, 3), weights=(60, 25, 10))[0]),
+        }
+    if scenario == "update_fourn":
+        return "PUT", f"/update/fourn/{rnd.choice(etat.fournisseurs)}", {
+            "taux_jour": rnd.randint(560, 640),
+            "quantite_USDT": rnd.randint(1_000, 5_000_000) / 1000,
+        }
+    raise ValueError(f"Scénario inconnu : {scenario}")
+
+
+def lire_profil(texte):
+    profil = {}
+    for element in PROFILS.get(texte, texte).split(","):
+        nom, _, poids = element.partition("=")
+        profil[nom.strip()] = float(poids or 1)
+    for nom in profil:
+        requete(nom, Etat([1], [1]), random.Random())  # scénario inconnu : ValueError
+    return profil
+
+
+# -- Serveur local -----------------------------------------------------------
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def demarrer_serveur(args):
+    """Génère la base, lance gunicorn et renvoie ``(processus, url)``."""
+    from bench_routes import remplir
+
+    dossier = tempfile.mkdtemp(prefix="crypto_charge_")
+    if not os.environ.get("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(dossier, 'charge.db')}"
+
+    from app import create_app
+
+    app = create_app(demarrage_rapide=False)
+    debut = time.perf_counter()
+    with app.app_context():
+        remplir(args.transactions, args.graine, args.fournisseurs)
+    print(f"{args.transactions} transactions générées en {time.perf_counter() - debut:.1f} s", file=sys.stderr)
+
+    port = port_libre()
+    environnement = {
+        **os.environ,
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_ACCESS_LOG": os.path.join(dossier, "acces.log"),
+        "METRIQUES_DIR": os.path.join(dossier, "metriques"),
+        "CACHE_VERSION_DIR": os.path.join(dossier, "cache"),
+    }
+    for option, variable in (("workers", "GUNICORN_WORKERS"), ("threads", "GUNICORN_THREADS")):
+        if getattr(args, option):
+            environnement[variable] = str(getattr(args, option))
+
+    journal = open(os.path.join(dossier, "gunicorn.log"), "w")
+    serveur = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        cwd=RACINE, env=environnement, stdout=journal, stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{port}"
+    limite = time.monotonic() + 60
+    while True:
+        try:
+            connexion = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connexion.request("GET", "/total/fr")
+            connexion.getresponse().read()
+            connexion.close()
+            break
+        except OSError:
+            if serveur.poll() is not None or time.monotonic() > limite:
+                sys.exit(f"❌ gunicorn n'a pas démarré, voir {journal.name}")
+            time.sleep(0.2)
+    print(f"gunicorn démarré sur {url} (journaux : {dossier})", file=sys.stderr)
+    return serveur, url
+
+
+# -- Génération de charge ------------------------------------------------------
+
+def etat_initial(hote, port):
+    connexion = http.client.HTTPConnection(hote, port, timeout=30)
+    connexion.request("GET", "/all/fourn")
+    fournisseurs = [f["id"] for f in json.loads(connexion.getresponse().read())["fournisseurs"]]
+    connexion.request("GET", "/trans/alll?limit=1000")
+    transactions = [t["id"] for t in json.loads(connexion.getresponse().read())["transactions"]]
+    connexion.close()
+    if not fournisseurs or not transactions:
+        sys.exit("❌ Le serveur n'a ni fournisseurs ni transactions : rien à charger")
+    return Etat(fournisseurs, transactions)
+
+
+def client(hote, port, profil, etat, graine, debut_mesure, fin, resultats):
+    """Boucle d'un client ; ``resultats`` reçoit ``(scenario, duree, erreur)`` après ``debut_mesure``."""
+    rnd = random.Random(graine)
+    noms, poids = list(profil), list(profil.values())
+    connexion = http.client.HTTPConnection(hote, port, timeout=30)
+    while (maintenant := time.monotonic()) < fin:
+        scenario = rnd.choices(noms, weights=poids)[0]
+        methode, chemin, corps = requete(scenario, etat, rnd)
+        entetes = {"Content-Type": "application/json"} if corps is not None else {}
+        debut = time.perf_counter()
+        erreur = None
+        try:
+            connexion.request(methode, chemin, body=json.dumps(corps) if corps is not None else None, headers=entetes)
+            reponse = connexion.getresponse()
+            contenu = reponse.read()
+            if reponse.status >= 400:
+                erreur = str(reponse.status)
+            elif scenario == "trans_addd":
+                etat.ajouter_transaction(json.loads(contenu)["transaction"]["id"])
+            if reponse.getheader("Connection", "").lower() == "close":
+                connexion.close()
+        except (OSError, http.client.HTTPException) as e:
+            erreur = type(e).__name__
+            connexion.close()
+            connexion = http.client.HTTPConnection(hote, port, timeout=30)
+        if maintenant >= debut_mesure:
+            resultats.append((scenario, time.perf_counter() - debut, erreur))
+    connexion.close()
+
+
+def palier(hote, port, profil, etat, concurrence, args):
+    """Mesures d'un palier de concurrence."""
+    debut_mesure = time.monotonic() + args.echauffement
+    fin = debut_mesure + args.duree
+    resultats = [[] for _ in range(concurrence)]
+    clients = [
+        threading.Thread(target=client, args=(hote, port, profil, etat, args.graine * 1000 + i, debut_mesure, fin, resultats[i]))
+        for i in range(concurrence)
+    ]
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+
+    par_scenario = {}
+    for scenario, duree, erreur in (r for liste in resultats for r in liste):
+        par_scenario.setdefault(scenario, []).append((duree, erreur))
+    par_scenario["ecritures"] = [m for nom in ECRITURES for m in par_scenario.get(nom, [])]
+    par_scenario["total"] = [m for nom in profil for m in par_scenario.get(nom, [])]
+
+    return {"concurrence": concurrence, "scenarios": {
+        nom: statistiques(par_scenario[nom], args.duree)
+        for nom in (*profil, "ecritures", "total") if par_scenario.get(nom)
+    }}
+
+
+def statistiques(mesures, duree):
+    durees = sorted(d for d, _ in mesures)
+    erreurs = {}
+    for _, erreur in mesures:
+        if erreur is not None:
+            erreurs[erreur] = erreurs.get(erreur, 0) + 1
+    return {
+        "requetes": len(mesures),
+        "debit_req_s": round(len(mesures) / duree, 2),
+        "p50_ms": round(centile(durees, 50) * 1000, 3),
+        "p95_ms": round(centile(durees, 95) * 1000, 3),
+        "p99_ms": round(centile(durees, 99) * 1000, 3),
+        "taux_erreur": round(sum(erreurs.values()) / len(mesures), 4),
+        "erreurs": erreurs,
+    }
+
+
+def capacite(paliers, seuil_p95):
+    """Dernier palier dont les écritures (ou à défaut tout le trafic) tiennent le seuil."""
+    retenu = None
+    for p in paliers:
+        reference = p["scenarios"].get("ecritures") or p["scenarios"]["total"]
+        if reference["p95_ms"] > seuil_p95 or p["scenarios"]["total"]["taux_erreur"] > ERREURS_MAX:
+            break
+        retenu = p
+    return retenu
+
+
+def afficher(paliers):
+    for p in paliers:
+        print(f"\n{p['concurrence']} client(s)")
+        print(f"  {'scénario':<14}{'req/s':>9}{'p50':>11}{'p95':>11}{'p99':>11}{'erreurs':>9}")
+        for nom, s in p["scenarios"].items():
+            print(
+                f"  {nom:<14}{s['debit_req_s']:>9.1f}{s['p50_ms']:>9.1f}ms{s['p95_ms']:>9.1f}ms"
+                f"{s['p99_ms']:>9.1f}ms{s['taux_erreur']:>9.1%}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="serveur déjà démarré (sinon gunicorn est lancé localement)")
+    parser.add_argument("--profil", default="mixte",
+                        help=f"{', '.join(PROFILS)} ou poids explicites : trans_addd=70,update_fourn=30")
+    parser.add_argument("--concurrences", default="1,4,16,32", help="paliers de clients simultanés")
+    parser.add_argument("--duree", type=float, default=15.0, help="durée mesurée de chaque palier (s)")
+    parser.add_argument("--echauffement", type=float, default=2.0, help="début de palier non mesuré (s)")
+    parser.add_argument("--seuil-p95", type=float, default=500.0, help="p95 maximal des écritures (ms)")
+    parser.add_argument("--transactions", type=int, default=10_000, help="taille de la base générée")
+    parser.add_argument("--fournisseurs", type=int, default=200)
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--workers", type=int, help="GUNICORN_WORKERS du serveur local")
+    parser.add_argument("--threads", type=int, help="GUNICORN_THREADS du serveur local")
+    parser.add_argument("--ecraser", action="store_true", help="autoriser à vider la base de DATABASE_URL")
+    parser.add_argument("--sortie", help="fichier JSON des résultats (défaut : benchmarks/resultats/charge-<date>.json)")
+    args = parser.parse_args()
+
+    profil = lire_profil(args.profil)
+    serveur = None
+    if args.url:
+        url = args.url
+    else:
+        if os.environ.get("DATABASE_URL") and not args.ecraser:
+            sys.exit("❌ DATABASE_URL est définie : ses tables seront vidées. Relancer avec --ecraser.")
+        serveur, url = demarrer_serveur(args)
+
+    try:
+        adresse = urlsplit(url)
+        hote, port = adresse.hostname, adresse.port or 80
+        etat = etat_initial(hote, port)
+        paliers = []
+        for concurrence in (int(c) for c in args.concurrences.split(",")):
+            print(f"Palier de {concurrence} client(s)...", file=sys.stderr)
+            paliers.append(palier(hote, port, profil, etat, concurrence, args))
+    finally:
+        if serveur is not None:
+            serveur.send_signal(signal.SIGTERM)
+            serveur.wait(timeout=60)
+
+    retenu = capacite(paliers, args.seuil_p95)
+    resultats = {**contexte(), "parametres": {
+        "url": args.url or "local", "profil": profil, "duree_s": args.duree, "seuil_p95_ms": args.seuil_p95,
+        "transactions": None if args.url else args.transactions,
+        "workers": args.workers, "threads": args.threads,
+    }, "paliers": paliers, "capacite": retenu and {
+        "concurrence": retenu["concurrence"],
+        "debit_req_s": retenu["scenarios"]["total"]["debit_req_s"],
+        "ecritures_req_s": retenu["scenarios"].get("ecritures", {}).get("debit_req_s"),
+    }}
+
+    fichier = args.sortie or os.path.join(RESULTATS, f"charge-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(fichier)), exist_ok=True)
+    with open(fichier, "w") as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+
+    afficher(paliers)
+    if retenu is None:
+        print(f"\n❌ Seuil dépassé dès le premier palier (p95 écritures > {args.seuil_p95:.0f} ms ou erreurs > 1 %)")
+    else:
+        c = resultats["capacite"]
+        ecritures = f", dont {c['ecritures_req_s']:.1f} écritures/s" if c["ecritures_req_s"] is not None else ""
+        print(f"\nCapacité sous le seuil : {c['debit_req_s']:.1f} req/s{ecritures} à {c['concurrence']} client(s)")
+    print(f"Résultats : {fichier}")
+
+
+if __name__ == "__main__":
+    main()
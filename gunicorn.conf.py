@@ -0,0 +1,63 @@
+# Configuration gunicorn de production : gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Tous les réglages se surchargent par variables d'environnement (voir README).
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+# Processus et threads : workers x threads requêtes traitées en parallèle
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+
+# L'application est construite une seule fois dans le maître puis partagée par
+# fork : démarrage plus rapide et mémoire partagée entre workers
+preload_app = True
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+# Délai laissé aux requêtes en cours lors d'un arrêt ou d'un rechargement
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Recyclage progressif des workers (fuites mémoire), décalé pour ne pas tous
+# les redémarrer en même temps
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+
+# Métriques /metrics additionnées sur tous les workers (voir app/metriques.py) ;
+# défini avant le chargement de l'application par le maître
+os.environ.setdefault("METRIQUES_DIR", os.path.join(tempfile.gettempdir(), f"crypto_metriques_{bind.rsplit(':', 1)[-1]}"))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # Les compteurs repartent de zéro à chaque démarrage du serveur
+    shutil.rmtree(os.environ["METRIQUES_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["METRIQUES_DIR"], exist_ok=True)
+
+
+def post_fork(server, worker):
+    # Avec preload_app, le maître a pu ouvrir des connexions (create_all, ...) :
+    # le worker les oublie sans les fermer et ouvre ses propres connexions.
+    if not server.cfg.preload_app:
+        return
+    from app import db
+
+    # Application déjà chargée par le maître (quel que soit le module donné à gunicorn)
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Compteurs du worker terminé (recyclage max_requests, arrêt) reportés dans
+    # le cumul des workers morts : son fichier n'est plus relu par /metrics
+    from app.metriques import marquer_processus_mort
+
+    marquer_processus_mort(os.environ["METRIQUES_DIR"], worker.pid)
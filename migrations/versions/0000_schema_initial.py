@@ -0,0 +1,82 @@
+"""Schéma initial
+
+Crée les tables d'origine de l'application (users, transactions,
+fournisseurs, beneficiaires, transaction_fournisseur), sans les index et
+colonnes ajoutés par les migrations suivantes : "flask db upgrade" construit
+ainsi une base vide sans passer par db.create_all(). Les tables déjà
+présentes (base créée par db.create_all()) sont ignorées.
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-18 11:50:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('password', sa.String(length=200), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'transactions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('montant_FCFA', sa.Integer(), nullable=False),
+        sa.Column('taux_convenu', sa.Integer(), nullable=False),
+        sa.Column('montant_USDT', sa.Numeric(precision=10, scale=3), nullable=False),
+        sa.Column('date_transaction', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'fournisseurs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nom', sa.String(length=100), nullable=False),
+        sa.Column('taux_jour', sa.Integer(), nullable=False),
+        sa.Column('quantite_USDT', sa.Numeric(precision=10, scale=3), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('nom'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'beneficiaires',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nom', sa.String(length=100), nullable=False),
+        sa.Column('commission_USDT', sa.Numeric(precision=10, scale=3), nullable=False),
+        sa.Column('fournisseur_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['fournisseur_id'], ['fournisseurs.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'transaction_fournisseur',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('transaction_id', sa.Integer(), nullable=False),
+        sa.Column('fournisseur_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['fournisseur_id'], ['fournisseurs.id']),
+        sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('transaction_fournisseur')
+    op.drop_table('beneficiaires')
+    op.drop_table('fournisseurs')
+    op.drop_table('transactions')
+    op.drop_table('users')
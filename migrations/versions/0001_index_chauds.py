@@ -0,0 +1,46 @@
+"""Index des filtres les plus fréquents
+
+Ajoute les index manquants sur les clés étrangères de transaction_fournisseur
+et de beneficiaires, ainsi que l'index (date_transaction, id) des filtres par
+période et de la pagination de /trans/alll.
+
+Sur PostgreSQL les index sont créés avec CREATE INDEX CONCURRENTLY : les
+tables restent accessibles en lecture et en écriture pendant la migration.
+Les index déjà présents (base créée par db.create_all()) sont ignorés.
+
+Vérification des plans d'exécution après migration : flask verifier-index
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = '0000'
+branch_labels = None
+depends_on = None
+
+
+INDEX = [
+    ('ix_transaction_fournisseur_transaction_id', 'transaction_fournisseur', ['transaction_id']),
+    ('ix_transaction_fournisseur_fournisseur_id', 'transaction_fournisseur', ['fournisseur_id']),
+    ('ix_beneficiaires_fournisseur_id', 'beneficiaires', ['fournisseur_id']),
+    ('ix_transactions_date_id', 'transactions', ['date_transaction', 'id']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY est interdit dans une transaction : bloc en autocommit
+    with op.get_context().autocommit_block():
+        for nom, table, colonnes in INDEX:
+            op.create_index(nom, table, colonnes, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for nom, table, _ in reversed(INDEX):
+            op.drop_index(nom, table_name=table, if_exists=True, postgresql_concurrently=True)
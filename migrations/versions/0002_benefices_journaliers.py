@@ -0,0 +1,41 @@
+"""Table de cumul journalier des bénéfices
+
+Crée benefices_journaliers (voir app/benefices.py) si elle n'existe pas
+encore. Après la migration d'une base existante, remplir la table avec :
+flask reconstruire-benefices
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'benefices_journaliers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('jour', sa.Date(), nullable=False),
+        sa.Column('fournisseur_id', sa.Integer(), nullable=False),
+        sa.Column('beneficiaire_nom', sa.String(length=100), nullable=False),
+        sa.Column('volume_USDT', sa.Numeric(precision=14, scale=3), nullable=False),
+        sa.Column('benefice_FCFA', sa.BigInteger(), nullable=False),
+        sa.Column('part_FCFA', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['fournisseur_id'], ['fournisseurs.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('jour', 'fournisseur_id', 'beneficiaire_nom', name='uq_benefices_journaliers_cle'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('benefices_journaliers')
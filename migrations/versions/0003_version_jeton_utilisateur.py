@@ -0,0 +1,32 @@
+"""Version des jetons d'accès des utilisateurs
+
+Ajoute users.token_version (voir app/jetons.py) : les jetons JWT portent la
+version courante de leur utilisateur et sont refusés dès qu'elle change
+(changement de mot de passe). Les utilisateurs existants démarrent à 0.
+La colonne déjà présente (base créée par db.create_all()) est conservée.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    colonnes = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('users')}
+    if 'token_version' not in colonnes:
+        # Valeur par défaut côté serveur : ajout sans réécriture ligne à ligne sur PostgreSQL
+        op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    op.drop_column('users', 'token_version')
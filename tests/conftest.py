@@ -0,0 +1,35 @@
+"""Fixtures partagées : application sur une base SQLite temporaire."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Config lue par create_app : base, versions du cache et hachage propres au test
+    monkeypatch.setattr(config.Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'crypto.db'}")
+    monkeypatch.setattr(config.Config, "CACHE_BACKEND", "memoire")
+    monkeypatch.setattr(config.Config, "CACHE_VERSION_DIR", str(tmp_path / "versions"))
+    monkeypatch.setattr(config.Config, "HACHAGE_PROCESSUS", 0)
+    monkeypatch.setattr(config.Config, "METRIQUES_DIR", None)
+    monkeypatch.setattr(config.Config, "JOURNAL_NIVEAU", "WARNING")
+
+    from app import create_app, db
+
+    application = create_app()
+    application.config["TESTING"] = True
+    yield application
+
+    with application.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
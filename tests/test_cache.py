@@ -0,0 +1,314 @@
+"""Backends du cache applicatif (app/cache.py) : mémoire et Redis.
+
+Le backend Redis se connecte par ``redis.Redis.from_url`` à un serveur local
+(``ServeurRESP``) qui implémente les commandes utilisées, pipeline compris.
+"""
+import math
+import os
+import shutil
+import socketserver
+import threading
+
+import pytest
+
+from app import cache as module_cache
+from app.cache import BackendCache, BackendMemoire, BackendRedis, Cache
+
+
+class Horloge:
+    """Temps monotone avancé à la main."""
+
+    def __init__(self):
+        self.maintenant = 1000.0
+
+    def __call__(self):
+        return self.maintenant
+
+    def avancer(self, secondes):
+        self.maintenant += secondes
+
+
+class ServeurRESP(socketserver.ThreadingTCPServer):
+    """Serveur local minimal parlant le protocole Redis (RESP3, celui de redis-py), en mémoire.
+
+    Commandes : HELLO, GET, SET (EX, NX), MGET, TTL, FLUSHALL et PING ; les
+    expirations suivent ``horloge``.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, horloge):
+        super().__init__(("127.0.0.1", 0), ClientRESP)
+        self.horloge = horloge
+        self.donnees = {}
+        self.verrou = threading.Lock()
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def executer(self, commande, *arguments):
+        """Réponse à ``commande`` : bytes, int, str (statut), list, dict, None ou ValueError."""
+        with self.verrou:
+            if commande == b"HELLO":
+                return {"server": "redis", "version": "7.0.0", "proto": 3}
+            if commande == b"PING":
+                return "PONG"
+            if commande == b"GET":
+                return self._lire(arguments[0])
+            if commande == b"MGET":
+                return [self._lire(cle) for cle in arguments]
+            if commande == b"SET":
+                cle, valeur, *options = arguments
+                options = [option.upper() for option in options]
+                if b"NX" in options and self._lire(cle) is not None:
+                    return None
+                expiration = None
+                if b"EX" in options:
+                    expiration = self.horloge() + int(options[options.index(b"EX") + 1])
+                self.donnees[cle] = (valeur, expiration)
+                return "OK"
+            if commande == b"TTL":
+                if self._lire(arguments[0]) is None:
+                    return -2
+                expiration = self.donnees[arguments[0]][1]
+                return -1 if expiration is None else math.ceil(expiration - self.horloge())
+            if commande == b"FLUSHALL":
+                self.donnees.clear()
+                return "OK"
+            return ValueError(f"ERR unknown command '{commande.decode()}'")
+
+    def _lire(self, cle):
+        valeur, expiration = self.donnees.get(cle, (None, None))
+        if expiration is not None and expiration <= self.horloge():
+            del self.donnees[cle]
+            return None
+        return valeur
+
+
+class ClientRESP(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            ligne = self.rfile.readline()
+            if not ligne:
+                return
+            arguments = []
+            for _ in range(int(ligne[1:])):  # "*<n>" puis n chaînes "$<longueur>"
+                longueur = int(self.rfile.readline()[1:])
+                arguments.append(self.rfile.read(longueur + 2)[:-2])
+            self.wfile.write(encoder_resp(self.server.executer(arguments[0].upper(), *arguments[1:])))
+
+
+def encoder_resp(reponse):
+    if reponse is None:
+        return b"_\r\n"
+    if isinstance(reponse, ValueError):
+        return f"-{reponse}\r\n".encode()
+    if isinstance(reponse, str):
+        return f"+{reponse}\r\n".encode()
+    if isinstance(reponse, int):
+        return f":{reponse}\r\n".encode()
+    if isinstance(reponse, dict):
+        return f"%{len(reponse)}\r\n".encode() + b"".join(
+            encoder_resp(cle) + encoder_resp(valeur) for cle, valeur in reponse.items()
+        )
+    if isinstance(reponse, list):
+        return f"*{len(reponse)}\r\n".encode() + b"".join(encoder_resp(element) for element in reponse)
+    return b"$%d\r\n%s\r\n" % (len(reponse), reponse)
+
+
+@pytest.fixture
+def horloge(monkeypatch):
+    horloge = Horloge()
+    monkeypatch.setattr(module_cache.time, "monotonic", horloge)
+    return horloge
+
+
+@pytest.fixture
+def serveur_redis(horloge):
+    pytest.importorskip("redis")
+    serveur = ServeurRESP(horloge)
+    thread = threading.Thread(target=serveur.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield serveur
+    serveur.shutdown()
+    serveur.server_close()
+
+
+@pytest.fixture
+def backend_redis(serveur_redis):
+    backend = BackendRedis(url=serveur_redis.url, prefixe="test:", duree_vie=60)
+    yield backend
+    backend.client.close()
+
+
+@pytest.fixture(params=["memoire", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memoire":
+        return BackendMemoire(taille_max=3, duree_vie=60, dossier=str(tmp_path))
+    return request.getfixturevalue("backend_redis")
+
+
+def test_backend_abstrait():
+    with pytest.raises(TypeError):
+        BackendCache(duree_vie=60)
+
+
+def test_get_set(backend):
+    assert backend.get("a") is None
+    backend.set("a", {"valeur": [1, 2]})
+    assert backend.get("a") == {"valeur": [1, 2]}
+
+
+def test_none_pas_mis_en_cache(backend):
+    backend.set("a", None)
+    assert backend.get("a") is None
+
+
+def test_expiration(backend, horloge):
+    backend.set("a", 1)
+    backend.set("b", 2, duree_vie=120)
+    horloge.avancer(61)
+    assert backend.get("a") is None
+    assert backend.get("b") == 2
+
+
+def test_invalidation_par_tag(backend):
+    backend.set("a", 1, tags=("fournisseurs",))
+    backend.set("b", 2, tags=("taux",))
+    backend.set("c", 3, tags=("fournisseurs", "taux"))
+
+    versions = backend.versions(["fournisseurs", "taux"])
+    backend.invalider_tag("fournisseurs")
+
+    assert backend.get("a") is None
+    assert backend.get("b") == 2
+    assert backend.get("c") is None
+    assert backend.versions(["fournisseurs", "taux"])[0] != versions[0]
+    assert backend.versions(["fournisseurs", "taux"])[1] == versions[1]
+
+
+def test_versions_lues_avant_construction(backend):
+    # Entrée construite pendant une écriture concurrente : périmée dès sa mise en cache
+    versions = backend.versions(["fournisseurs"])
+    backend.invalider_tag("fournisseurs")
+    backend.set("a", 1, tags=("fournisseurs",), versions=versions)
+    assert backend.get("a") is None
+
+
+def test_compteurs(backend):
+    backend.get("a")
+    backend.set("a", 1)
+    backend.get("a")
+    backend.get("a")
+
+    stats = backend.stats()
+    assert stats["backend"] == backend.nom
+    assert (stats["succes"], stats["echecs"]) == (2, 1)
+    assert stats["taux_succes"] == pytest.approx(2 / 3, abs=1e-4)
+
+
+def test_compteurs_vides(backend):
+    assert backend.stats()["taux_succes"] is None
+
+
+def test_memoire_eviction_lru(tmp_path):
+    backend = BackendMemoire(taille_max=2, duree_vie=60, dossier=str(tmp_path))
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")  # "a" devient la plus récente
+    backend.set("c", 3)
+
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+
+
+def test_memoire_invalidation_entre_workers(tmp_path):
+    # Deux workers de la même machine partagent le dossier des versions
+    worker_1 = BackendMemoire(dossier=str(tmp_path))
+    worker_2 = BackendMemoire(dossier=str(tmp_path))
+    worker_2.set("a", 1, tags=("fournisseurs",))
+
+    worker_1.invalider_tag("fournisseurs")
+
+    assert worker_2.get("a") is None
+
+
+def test_redis_prefixe_et_expiration_serveur(serveur_redis, horloge):
+    backend = BackendRedis(url=serveur_redis.url, prefixe="crypto:", duree_vie=30)
+    backend.set("a", 1, tags=("fournisseurs",))
+    backend.invalider_tag("fournisseurs")
+
+    assert set(serveur_redis.donnees) == {b"crypto:cle:a", b"crypto:tag:fournisseurs"}
+    assert backend.client.ttl("crypto:cle:a") == 30
+    assert backend.client.ttl("crypto:tag:fournisseurs") == -1
+    horloge.avancer(30)
+    assert backend.client.ttl("crypto:cle:a") == -2
+    backend.client.close()
+
+
+def test_redis_version_creee_une_fois(serveur_redis):
+    # Deux workers lisent un tag absent : le premier SET NX l'emporte, le second le relit
+    worker_1 = BackendRedis(url=serveur_redis.url, prefixe="test:")
+    worker_2 = BackendRedis(url=serveur_redis.url, prefixe="test:")
+
+    versions = worker_1.versions(["fournisseurs", "taux"])
+
+    assert worker_2.versions(["fournisseurs", "taux"]) == versions
+    assert len(set(versions)) == 2
+    worker_1.client.close()
+    worker_2.client.close()
+
+
+def vider_versions(backend):
+    """Perte du magasin des versions : dossier effacé ou serveur Redis vidé."""
+    if backend.nom == "memoire":
+        shutil.rmtree(backend.dossier)
+        os.makedirs(backend.dossier)
+    else:
+        backend.client.flushall()
+
+
+def test_versions_magasin_vide(backend):
+    # Une version perdue est remplacée par une valeur jamais servie, pas par une valeur initiale fixe
+    versions = backend.versions(["fournisseurs", "taux"])
+    assert backend.versions(["fournisseurs", "taux"]) == versions
+
+    vider_versions(backend)
+
+    nouvelles = backend.versions(["fournisseurs", "taux"])
+    assert nouvelles[0] != versions[0] and nouvelles[1] != versions[1]
+    assert backend.versions(["fournisseurs", "taux"]) == nouvelles
+
+
+def test_versions_magasin_vide_entree_perimee(backend):
+    backend.set("a", 1, tags=("fournisseurs",))
+    vider_versions(backend)
+    assert backend.get("a") is None
+
+
+def test_cache_lire_construit_une_fois(backend):
+    cache = Cache()
+    cache.backend = backend
+    appels = []
+
+    def construire():
+        appels.append(1)
+        return {"n": len(appels)}
+
+    assert cache.lire("a", construire) == {"n": 1}
+    assert cache.lire("a", construire) == {"n": 1}
+    cache.invalider("a")
+    assert cache.lire("a", construire) == {"n": 2}
+
+
+def test_route_cache_stats(client):
+    client.get("/all/fourn")
+    client.get("/all/fourn")
+
+    stats = client.get("/cache/stats").get_json()
+    assert stats["backend"] == "memoire"
+    assert (stats["succes"], stats["echecs"]) == (1, 1)
+    assert stats["jetons"]["backend"] == "memoire"
@@ -0,0 +1,27 @@
+"""Recalcul des hachages de mot de passe à la connexion (app/hachage.py)."""
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from app.hachage import Hacheur
+
+
+def hacheur(methode):
+    app = Flask(__name__)
+    app.config.update(HACHAGE_METHODE=methode, HACHAGE_PROCESSUS=0)
+    hacheur = Hacheur()
+    hacheur.init_app(app)
+    return hacheur
+
+
+# "scrypt" est complété par werkzeug en "scrypt:32768:8:1" dans le hachage
+@pytest.mark.parametrize("methode", ["scrypt", "scrypt:16384:8:1", "pbkdf2:sha256:1000"])
+def test_hachage_de_la_methode_pas_a_rehacher(methode):
+    h = hacheur(methode)
+    assert not h.a_rehacher(h.hacher("secret"))
+
+
+def test_ancienne_methode_a_rehacher():
+    h = hacheur("scrypt")
+    assert h.a_rehacher(generate_password_hash("secret", "pbkdf2:sha256:1000"))
+    assert h.a_rehacher(generate_password_hash("secret", "scrypt:16384:8:1"))
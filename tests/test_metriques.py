@@ -0,0 +1,28 @@
+"""Cumul des métriques entre workers (app/metriques.py)."""
+import os
+
+from app.metriques import FICHIER_MORTS, Metriques, marquer_processus_mort
+
+
+def worker(dossier, pid):
+    metriques = Metriques()
+    metriques.dossier = str(dossier)
+    metriques._fichier = os.path.join(str(dossier), f"{pid}-abcd1234.json")
+    return metriques
+
+
+def test_worker_mort_reporte_dans_le_cumul(tmp_path):
+    vivant, mort_1, mort_2 = worker(tmp_path, 10), worker(tmp_path, 11), worker(tmp_path, 12)
+    for metriques, n in ((vivant, 1), (mort_1, 2), (mort_2, 4)):
+        metriques.incrementer("http_requetes_total", {"route": "/x", "methode": "GET", "statut": "200"}, n)
+        metriques.observer("http_duree_requete_secondes", {"route": "/x", "methode": "GET"}, 0.25 * n)
+        metriques.ecrire()
+    avant = vivant.exposer()
+
+    marquer_processus_mort(str(tmp_path), 11)
+    marquer_processus_mort(str(tmp_path), 12)
+    marquer_processus_mort(str(tmp_path), 99)  # aucun fichier : rien à faire
+
+    assert sorted(os.listdir(tmp_path)) == ["10-abcd1234.json", FICHIER_MORTS]
+    assert vivant.exposer() == avant
+    assert 'http_requetes_total{methode="GET",route="/x",statut="200"} 7' in avant
@@ -0,0 +1,90 @@
+"""Pagination par curseur de /trans/alll.
+
+Sur SQLite, les dates sont stockées en texte : "YYYY-MM-DD HH:MM:SS" pour
+le défaut de la colonne (/trans/addd), avec microsecondes pour les dates
+envoyées par SQLAlchemy (/trans/bulk). Le parcours page par page ne doit
+sauter ni répéter aucune transaction.
+"""
+import base64
+import json
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models import Fournisseur, Transaction
+
+
+@pytest.fixture
+def fournisseur_id(app):
+    with app.app_context():
+        fournisseur = Fournisseur(nom="Binance Togo", taux_jour=600, quantite_USDT=Decimal("1000"))
+        db.session.add(fournisseur)
+        db.session.commit()
+        return fournisseur.id
+
+
+@pytest.fixture
+def transactions(app, client, fournisseur_id):
+    """Transactions partageant la même seconde, écrites par /trans/addd et /trans/bulk, et une sans date."""
+    dates = []
+    for i in range(3):
+        reponse = client.post("/trans/addd", json={"montantFCFA": 100_000 + i, "tauxConv": 610, "fournisseurId": fournisseur_id})
+        assert reponse.status_code == 201
+        dates.append(reponse.get_json()["transaction"]["dateTransaction"])
+
+    lignes = [{"montantFCFA": 200_000 + i, "tauxConv": 610, "fournisseurId": fournisseur_id} for i in range(3)]
+    lignes += [
+        {"montantFCFA": 300_000 + i, "tauxConv": 610, "fournisseurId": fournisseur_id, "dateTransaction": dates[0]}
+        for i in range(3)
+    ]
+    reponse = client.post("/trans/bulk", json={"transactions": lignes})
+    assert reponse.status_code == 201
+
+    with app.app_context():
+        db.session.add(Transaction(montant_FCFA=400_000, taux_convenu=610, montant_USDT=Decimal("655.738")))
+        db.session.flush()
+        db.session.query(Transaction).filter(Transaction.montant_FCFA == 400_000).update({"date_transaction": None})
+        db.session.commit()
+        return [t.id for t in Transaction.query.all()]
+
+
+def parcourir(client, limit):
+    ids = []
+    curseur = None
+    while True:
+        reponse = client.get("/trans/alll", query_string={"limit": limit, **({"after": curseur} if curseur else {})})
+        assert reponse.status_code == 200
+        page = reponse.get_json()
+        assert len(page["transactions"]) <= limit
+        ids += [t["id"] for t in page["transactions"]]
+        curseur = page["next_cursor"]
+        if curseur is None:
+            return ids
+
+
+@pytest.mark.parametrize("limit", [1, 2, 4])
+def test_parcours_complet(client, transactions, limit):
+    complet = [t["id"] for t in client.get("/trans/alll").get_json()["transactions"]]
+
+    assert sorted(complet) == sorted(transactions)
+    assert parcourir(client, limit) == complet
+    assert complet[-1] == max(transactions)  # Transaction sans date en dernier
+
+
+def test_curseur_transaction_supprimee(client, transactions):
+    curseur = client.get("/trans/alll", query_string={"limit": 1}).get_json()["next_cursor"]
+    premiere = client.get("/trans/alll", query_string={"limit": 1}).get_json()["transactions"][0]["id"]
+    assert client.delete(f"/trans/delete/{premiere}").status_code == 200
+
+    assert client.get("/trans/alll", query_string={"after": curseur}).status_code == 400
+
+
+def test_ancien_curseur_date_id(client, transactions):
+    # Curseurs [date, id] émis avant le passage à l'ID seul
+    premiere = client.get("/trans/alll", query_string={"limit": 1}).get_json()["transactions"][0]
+    ancien = base64.urlsafe_b64encode(json.dumps([premiere["dateTransaction"], premiere["id"]]).encode()).decode()
+
+    reponse = client.get("/trans/alll", query_string={"after": ancien})
+    assert reponse.status_code == 200
+    assert premiere["id"] not in [t["id"] for t in reponse.get_json()["transactions"]]
@@ -0,0 +1,76 @@
+"""Budgets de requêtes SQL par route (app/commands.py, BUDGETS_REQUETES).
+
+Un N+1 réintroduit sur une route fait échouer ``assert_max_requetes`` : les
+données contiennent plusieurs transactions, chacune liée à plusieurs
+fournisseurs ayant plusieurs bénéficiaires.
+"""
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from app import benefices, db
+from app.commands import BUDGETS_REQUETES
+from app.models import Beneficiaire, Fournisseur, Transaction, TransactionFournisseur
+from app.suivi_sql import assert_max_requetes, compter_requetes
+
+
+@pytest.fixture
+def transaction_id(app):
+    """Crée 5 fournisseurs et 30 transactions ; renvoie l'ID d'une transaction à 3 fournisseurs."""
+    with app.app_context():
+        fournisseurs = []
+        for i in range(5):
+            fournisseur = Fournisseur(nom=f"F{i}", taux_jour=600 + i, quantite_USDT=Decimal("100.5") * (i + 1))
+            db.session.add(fournisseur)
+            db.session.flush()
+            for j in range(3):
+                db.session.add(Beneficiaire(nom=f"B{j}", commission_USDT=Decimal(5 + j), fournisseur_id=fournisseur.id))
+            fournisseurs.append(fournisseur)
+
+        maintenant = datetime.now()
+        for k in range(30):
+            transaction = Transaction(
+                montant_FCFA=100_000 + k, taux_convenu=610 + k % 7, montant_USDT=Decimal("160.25"),
+                date_transaction=maintenant - timedelta(minutes=k),
+            )
+            db.session.add(transaction)
+            db.session.flush()
+            for fournisseur in fournisseurs[k % 3:k % 3 + 3]:
+                db.session.add(TransactionFournisseur(transaction_id=transaction.id, fournisseur_id=fournisseur.id))
+        benefices.reconstruire()
+        db.session.commit()
+        return transaction.id
+
+
+@pytest.mark.parametrize("route", BUDGETS_REQUETES)
+def test_budget_requetes(app, client, transaction_id, route):
+    with app.app_context():
+        with assert_max_requetes(BUDGETS_REQUETES[route]):
+            reponse = client.get(route.format(id=transaction_id))
+            reponse.get_data()  # Les exports ne s'exécutent qu'à la lecture du corps
+    assert reponse.status_code == 200
+
+
+def test_compteurs_propres_au_thread(app):
+    # Deux threads comptent en même temps : chacun ne voit que ses instructions
+    depart = threading.Barrier(2)
+    nombres = {}
+
+    def compter(nom, n):
+        with app.app_context(), compter_requetes() as suivi:
+            depart.wait()
+            for _ in range(n):
+                db.session.execute(text("SELECT 1"))
+            depart.wait()
+        nombres[nom] = suivi.nombre
+
+    threads = [threading.Thread(target=compter, args=(nom, n)) for nom, n in (("a", 3), ("b", 5))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert nombres == {"a": 3, "b": 5}
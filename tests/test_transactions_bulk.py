@@ -0,0 +1,46 @@
+"""Ajout en masse /trans/bulk : mêmes règles de validation que /trans/addd."""
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models import Fournisseur, TransactionFournisseur
+
+
+@pytest.fixture
+def fournisseur_id(app):
+    with app.app_context():
+        fournisseur = Fournisseur(nom="Binance Togo", taux_jour=600, quantite_USDT=Decimal("1000"))
+        db.session.add(fournisseur)
+        db.session.commit()
+        return fournisseur.id
+
+
+def test_id_fournisseur_texte(app, client, fournisseur_id):
+    # /trans/addd accepte l'ID en texte : /trans/bulk aussi
+    ligne = {"montantFCFA": 150_000, "tauxConv": 610, "fournisseurId": str(fournisseur_id)}
+    assert client.post("/trans/addd", json=ligne).status_code == 201
+
+    reponse = client.post("/trans/bulk", json={"transactions": [
+        ligne,
+        {"montantFCFA": 200_000, "tauxConv": 610, "fournisseursIds": [str(fournisseur_id), fournisseur_id]},
+    ]})
+
+    assert reponse.status_code == 201
+    with app.app_context():
+        for transaction_id in reponse.get_json()["ids"]:
+            liens = TransactionFournisseur.query.filter_by(transaction_id=transaction_id).all()
+            assert [lien.fournisseur_id for lien in liens] == [fournisseur_id]
+
+
+@pytest.mark.parametrize("valeur", ["abc", "999", 1.5, None, True])
+def test_id_fournisseur_invalide(client, fournisseur_id, valeur):
+    ligne = {"montantFCFA": 150_000, "tauxConv": 610, "fournisseursIds": [fournisseur_id, valeur]}
+
+    assert client.post("/trans/addd", json=ligne).status_code == 404
+    reponse = client.post("/trans/bulk", json={"transactions": [ligne]})
+
+    assert reponse.status_code == 400
+    assert reponse.get_json()["erreurs"] == [
+        {"index": 0, "message": "Un ou plusieurs fournisseurs sont introuvables"}
+    ]
@@ -0,0 +1,24 @@
+"""ETag des routes de lecture (app/versions.py)."""
+import os
+import shutil
+from decimal import Decimal
+
+from app import db
+from app.models import Fournisseur
+
+
+def test_etag_change_apres_perte_des_versions(app, client):
+    with app.app_context():
+        db.session.add(Fournisseur(nom="Binance Togo", taux_jour=600, quantite_USDT=Decimal("1000")))
+        db.session.commit()
+
+    etag = client.get("/all/fourn").headers["ETag"]
+    assert client.get("/all/fourn", headers={"If-None-Match": etag}).status_code == 304
+
+    # Dossier des versions effacé (redémarrage de la machine, nettoyage de /tmp)
+    shutil.rmtree(app.config["CACHE_VERSION_DIR"])
+    os.makedirs(app.config["CACHE_VERSION_DIR"])
+
+    reponse = client.get("/all/fourn", headers={"If-None-Match": etag})
+    assert reponse.status_code == 200
+    assert reponse.headers["ETag"] != etag
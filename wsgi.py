@@ -0,0 +1,9 @@
+# Point d'entrée WSGI de production (gunicorn -c gunicorn.conf.py wsgi:app).
+# run.py reste réservé au serveur de développement.
+import os
+
+from app import create_app
+
+# Démarrage rapide par défaut : schéma appliqué par "flask db upgrade" au
+# déploiement, pas au démarrage de chaque worker (DEMARRAGE_RAPIDE=0 pour désactiver)
+app = create_app(demarrage_rapide=os.environ.get("DEMARRAGE_RAPIDE", "1").strip().lower() not in ("0", "false", "no", "non", "off"))